@@ -0,0 +1,411 @@
+"""Speed benchmarks of the engine and the players with stored baselines.
+
+    python -m benchmarks.benchmarks                  # run and compare with benchmarks/baseline.json
+    python -m benchmarks.benchmarks --save --runs 3  # run three times and store the results as the new baseline
+    python -m benchmarks.benchmarks -k play/ -t 0.1  # only matching benchmarks, fail above +10%
+
+Every speed benchmark times a fixed, seeded workload. The best of ``--repeat`` rounds is kept as the time per operation
+(a game for the whole-game benchmarks), which is far less noisy than the mean, and the best of ``--runs`` such
+measurements is reported. A benchmark regresses when it is slower than its baseline by more than its tolerance; the
+run then exits with status 1. ``--save`` stores with every baseline a tolerance of twice the spread between the
+runs, at least ``DEFAULT_TOLERANCE``, so noisy benchmarks get a wider margin; ``--tolerance`` overrides them all.
+Baselines are only comparable on the machine that recorded them. Memory benchmarks report the bytes allocated per live object (e.g. a
+game in mid-play) measured with tracemalloc and regress the same way when they grow by more than their tolerance, at
+least ``MEMORY_TOLERANCE``.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from enums import CardColor, EngineType, PlayerType
+from game.batch_runner import play_games
+from game.game_manager import GameManager, game_rng
+from game.state_encoder import StateEncoder
+from models.cards import Organ, Virus, Medicine, OrganThief, Transplant, Contagion, MedicalError, LatexGlove
+from models.deck import Deck
+from players import PlayerFactory
+from players.neat_player import neat_config
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_TOLERANCE = 0.25
+MEMORY_TOLERANCE = 0.05  # allocations of the seeded workloads barely vary between runs
+NUM_GENOME_MUTATIONS = 30
+
+
+class Benchmark:
+    """``setup()`` builds the workload and returns ``(run, num_ops)``: ``run()`` performs ``num_ops`` operations
+    and may return the number of turns they took (whole games only)."""
+
+    def __init__(self, name: str, setup: Callable[[], Tuple[Callable[[], Optional[int]], int]], unit: str = 'op'):
+        self.name = name
+        self.setup = setup
+        self.unit = unit
+
+
+def measure(benchmark: Benchmark, repeat: int = 5, min_time: float = 0.2) -> Dict[str, float]:
+    run, num_ops = benchmark.setup()
+    rounds = 1
+    while True:  # run the workload enough times per round to last at least min_time
+        start = time.perf_counter()
+        for _ in range(rounds):
+            num_turns = run()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or min_time <= 0:
+            break
+        rounds *= 2
+    best = elapsed / rounds
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            run()
+        best = min(best, (time.perf_counter() - start) / rounds)
+
+    result = {'seconds_per_op': best / num_ops, f'{benchmark.unit}s_per_second': num_ops / best}
+    if num_turns is not None:
+        result['turns_per_second'] = num_turns / best
+    return result
+
+
+class MemoryBenchmark:
+    """``setup()`` builds and returns ``num_ops`` live objects, their memory is reported per object."""
+
+    def __init__(self, name: str, setup: Callable[[int], list], num_ops: int = 200, unit: str = 'game'):
+        self.name = name
+        self.setup = setup
+        self.num_ops = num_ops
+        self.unit = unit
+
+
+def measure_memory(benchmark: MemoryBenchmark) -> Dict[str, float]:
+    benchmark.setup(1)  # warm up caches (zobrist keys, interned names, shared cards) outside of the measurement
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        objects = benchmark.setup(benchmark.num_ops)
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del objects
+    return {f'bytes_per_{benchmark.unit}': (after - before) / benchmark.num_ops}
+
+
+def _genome(key: int):
+    rng_state = random.getstate()  # neat-python mutates with the global random module
+    random.seed(key)
+    genome = neat_config.genome_type(key)
+    genome.configure_new(neat_config.genome_config)
+    for _ in range(NUM_GENOME_MUTATIONS):
+        genome.mutate(neat_config.genome_config)
+    random.setstate(rng_state)
+    return genome
+
+
+def _advanced_games(player_type: PlayerType, num_games: int = 8, num_turns: int = 12, **kwargs) -> List[GameManager]:
+    """Games of four players of a type played for a few turns, each about to be played by one of them."""
+    games = []
+    for game_index in range(num_games):
+        player_factory = PlayerFactory()
+        for seat in range(4):
+            player_factory.add_player(player_type, f"{player_type}#{seat + 1}", **kwargs)
+        game = GameManager(player_factory, rng=game_rng(7, game_index))
+        for _ in range(num_turns):
+            if game.play_turn():
+                break
+        game.state.complete_hand(game.state.get_current_player())
+        games.append(game)
+    return games
+
+
+# whole games
+
+def game_benchmark(seating: List[PlayerType], num_games: int, engine: EngineType = EngineType.OBJECT) -> Benchmark:
+    def setup():
+        player_kwargs = {
+            PlayerType.NEAT_AI: {'genome': _genome(0), 'compiled': True},
+            PlayerType.ISMCTS_AI: {'iterations': 100},
+        }
+
+        def run():
+            return play_games(seating, 0, num_games, base_seed=11, engine=engine,
+                              player_kwargs=player_kwargs).total_turns
+        return run, num_games
+
+    name = f"game/{engine}/{'-'.join(seating)}"
+    return Benchmark(name, setup, unit='game')
+
+
+# microbenchmarks
+
+def encode_benchmark(cached: bool) -> Benchmark:
+    def setup():
+        states = [game.state for game in _advanced_games(PlayerType.RANDOM)]
+
+        def run():
+            for state in states:
+                if not cached:
+                    state.encoder = StateEncoder(state.num_players)
+                state.get_state_array_view()
+        return run, len(states)
+
+    return Benchmark(f"encode/{'cached' if cached else 'full'}", setup)
+
+
+def deck_benchmark() -> Benchmark:
+    def setup():
+        deck = Deck(random.Random(0))
+        num_draws = 10 * len(deck.cards)
+
+        def run():
+            # draws every card ten times, so the workload includes ten refills of the deck from the discard pile
+            for _ in range(num_draws):
+                deck.discard(deck.draw_card())
+        return run, num_draws
+
+    return Benchmark('deck/draw-discard-refill', setup)
+
+
+def _card_play_position():
+    player_factory = PlayerFactory()
+    player1 = player_factory.add_player(PlayerType.RANDOM, "Player1")
+    player2 = player_factory.add_player(PlayerType.RANDOM, "Player2")
+    state = GameManager(player_factory, rng=game_rng(0, 0)).state
+    state.current_player_index = 0
+    infected_organ = Organ(CardColor.RED)
+    infected_organ.add_virus(Virus(CardColor.RED))
+    player1.body = [infected_organ, Organ(CardColor.GREEN)]
+    vaccinated_organ = Organ(CardColor.YELLOW)
+    vaccinated_organ.add_medicine(Medicine(CardColor.YELLOW))
+    player2.body = [Organ(CardColor.BLUE), vaccinated_organ, Organ(CardColor.WILD)]
+    player2.hand = [Organ(CardColor.RED), Virus(CardColor.GREEN), Medicine(CardColor.BLUE)]
+    return state, player1
+
+
+def card_play_benchmark(card_type: type, *args) -> Benchmark:
+    """``GameState.make_move`` and ``unmake_move`` of every legal play of a card in a fixed position."""
+    def setup():
+        state, player = _card_play_position()
+        card = card_type(*args)
+        player.hand = [card]
+        plays = state.legal_plays()
+        assert plays, f"{card} cannot be played in the benchmark position"
+
+        def run():
+            for play_card, moves in plays:
+                state.unmake_move(state.make_move(player, play_card, moves))
+        return run, len(plays)
+
+    name = f"play/{card_type.__name__}{''.join(f'-{arg}' for arg in args)}"
+    return Benchmark(name, setup)
+
+
+def strategy_benchmark() -> Benchmark:
+    def setup():
+        states = [(game.state.get_current_player(), game.state)
+                  for game in _advanced_games(PlayerType.STRATEGY_BASED_AI)]
+
+        def run():
+            for player, state in states:
+                player.prepare_moves(state)
+        return run, len(states)
+
+    return Benchmark('strategy/prepare_moves', setup)
+
+
+def neat_benchmark(compiled: bool) -> Benchmark:
+    def setup():
+        genome = _genome(1)
+        games = _advanced_games(PlayerType.NEAT_AI, genome=genome, config=neat_config, compiled=compiled)
+        decisions = []
+        for game in games:
+            player = game.state.get_current_player()
+            decisions.append((player, game.state, player.hand[0]))
+
+        def run():
+            # one network pass (the cached output is dropped) and every decision made from it
+            for player, state, card in decisions:
+                player._activation_key = None
+                player.decide_action(state)
+                player.decide_card_to_play_index(state)
+                player.decide_opponent(state, card)
+                player.decide_organ_color(state)
+                player.decide_cards_to_discard_indices(state)
+        return run, len(decisions)
+
+    return Benchmark(f"neat/decisions/{'compiled' if compiled else 'neat-python'}", setup)
+
+
+# memory
+
+def live_game_memory_benchmark(player_type: PlayerType, engine: EngineType = EngineType.OBJECT,
+                               num_turns: int = 12) -> MemoryBenchmark:
+    """Games of four players in mid-game, as many of them are held by search trees or lockstep batches."""
+    def setup(num_games):
+        games = []
+        for game_index in range(num_games):
+            player_factory = PlayerFactory()
+            for seat in range(4):
+                player_factory.add_player(player_type, f"{player_type}#{seat + 1}")
+            game = GameManager(player_factory, engine=engine, rng=game_rng(7, game_index))
+            play_turn = game.play_turn if engine == EngineType.OBJECT else game.play_compact_turn
+            for _ in range(num_turns):
+                if play_turn():
+                    break
+            games.append(game)
+        return games
+
+    return MemoryBenchmark(f"memory/live-game/{engine}/{player_type}", setup)
+
+
+def get_benchmarks() -> List[Union[Benchmark, MemoryBenchmark]]:
+    seatings = [
+        ([PlayerType.RANDOM] * 4, 200),
+        ([PlayerType.RULE_BASED_AI] + [PlayerType.RANDOM] * 3, 100),
+        ([PlayerType.STRATEGY_BASED_AI] + [PlayerType.RANDOM] * 3, 100),
+        ([PlayerType.NEAT_AI] + [PlayerType.RANDOM] * 3, 100),
+        ([PlayerType.ISMCTS_AI] + [PlayerType.RANDOM] * 3, 2),
+    ]
+    benchmarks = [game_benchmark(seating, num_games) for seating, num_games in seatings]
+    benchmarks.append(game_benchmark([PlayerType.RANDOM] * 4, 400, engine=EngineType.COMPACT))
+    benchmarks += [
+        encode_benchmark(cached=True),
+        encode_benchmark(cached=False),
+        deck_benchmark(),
+        card_play_benchmark(Organ, CardColor.BLUE),
+        card_play_benchmark(Virus, CardColor.BLUE),
+        card_play_benchmark(Virus, CardColor.WILD),
+        card_play_benchmark(Medicine, CardColor.RED),
+        card_play_benchmark(Medicine, CardColor.GREEN),
+        card_play_benchmark(OrganThief),
+        card_play_benchmark(Transplant),
+        card_play_benchmark(Contagion),
+        card_play_benchmark(MedicalError),
+        card_play_benchmark(LatexGlove),
+        strategy_benchmark(),
+        neat_benchmark(compiled=False),
+        neat_benchmark(compiled=True),
+        live_game_memory_benchmark(PlayerType.RANDOM),
+        live_game_memory_benchmark(PlayerType.STRATEGY_BASED_AI),
+        live_game_memory_benchmark(PlayerType.RANDOM, EngineType.COMPACT),
+    ]
+    return benchmarks
+
+
+def _metric(result: Dict[str, float]) -> str:
+    return 'seconds_per_op' if 'seconds_per_op' in result else next(iter(result))
+
+
+def best_of_runs(runs: List[Dict[str, float]]) -> Dict[str, float]:
+    """The fastest (or smallest) of several measurements of a benchmark, with the spread between them as the
+    ``tolerance`` to store in a baseline: twice the relative difference between the worst and the best run, at least
+    ``DEFAULT_TOLERANCE`` (``MEMORY_TOLERANCE`` for memory benchmarks)."""
+    metric = _metric(runs[0])
+    min_tolerance = DEFAULT_TOLERANCE if metric == 'seconds_per_op' else MEMORY_TOLERANCE
+    values = [run[metric] for run in runs]
+    best = dict(min(runs, key=lambda run: run[metric]))
+    spread = max(values) / min(values) - 1 if min(values) > 0 else 0.
+    best['tolerance'] = round(max(min_tolerance, 2 * spread), 2)
+    return best
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: Optional[float] = None) -> List[str]:
+    """Print every result next to its baseline and return the names of the benchmarks that regressed.
+
+    Speed benchmarks are compared by their time per operation, memory benchmarks by their bytes per object, each
+    against the ``tolerance`` stored with its baseline unless ``tolerance`` is given.
+    """
+    regressions = []
+    print(f"{'benchmark':<48} {'cost/op':>12} {'baseline':>12} {'change':>8} {'limit':>6}")
+    for name, result in results.items():
+        metric = _metric(result)
+        format_value = _format_time if metric == 'seconds_per_op' else _format_size
+        value = result[metric]
+        line = f"{name:<48} {format_value(value):>12}"
+        if name in baseline and metric in baseline[name]:
+            baseline_value = baseline[name][metric]
+            change = value / baseline_value - 1
+            limit = baseline[name].get('tolerance', DEFAULT_TOLERANCE) if tolerance is None else tolerance
+            line += f" {format_value(baseline_value):>12} {change:>+8.1%} {limit:>+6.0%}"
+            if change > limit:
+                regressions.append(name)
+                line += "  REGRESSION"
+        rates = [f"{value:,.0f} {key.replace('_per_second', '')}/s" for key, value in result.items()
+                 if key.endswith('_per_second') and key != 'ops_per_second']
+        if rates:
+            line += f"  ({', '.join(rates)})"
+        print(line)
+    return regressions
+
+
+def _format_size(num_bytes: float) -> str:
+    for unit, scale in (('MiB', 1 << 20), ('KiB', 1 << 10)):
+        if num_bytes >= scale:
+            return f"{num_bytes / scale:.1f} {unit}"
+    return f"{num_bytes:.0f} B"
+
+
+def _format_time(seconds: float) -> str:
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the speed benchmarks and compare them with the baseline.")
+    parser.add_argument('-k', '--filter', default='', help="only run the benchmarks whose name contains this text")
+    parser.add_argument('-t', '--tolerance', type=float, default=None,
+                        help="allowed slowdown relative to the baseline for every benchmark (0.25 = 25%%), by "
+                             "default the tolerance stored with each baseline")
+    parser.add_argument('-r', '--repeat', type=int, default=5, help="timed rounds per benchmark, the best is kept")
+    parser.add_argument('--runs', type=int, default=1,
+                        help="measurements of the whole suite, the best is kept and their spread sets the tolerance "
+                             "saved with --save")
+    parser.add_argument('--min-time', type=float, default=0.2, help="minimum duration of a round in seconds")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="baseline file")
+    parser.add_argument('--save', action='store_true', help="store the results in the baseline file")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    runs = {}
+    for _ in range(args.runs):  # whole passes over the suite, so the spread includes drift between benchmarks
+        for benchmark in get_benchmarks():
+            if args.filter in benchmark.name:
+                if isinstance(benchmark, MemoryBenchmark):
+                    result = measure_memory(benchmark)
+                else:
+                    result = measure(benchmark, args.repeat, args.min_time)
+                runs.setdefault(benchmark.name, []).append(result)
+    results = {name: best_of_runs(measurements) for name, measurements in runs.items()}
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+    regressions = compare(results, baseline, args.tolerance)
+
+    if args.save:
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump({'machine': {'platform': platform.platform(), 'processor': platform.processor(),
+                                   'python': platform.python_version()},
+                       'results': baseline}, f, indent=2, sort_keys=True)
+        print(f"Saved {len(results)} results to {args.baseline}")
+    elif regressions:
+        print(f"{len(regressions)} benchmark(s) regressed beyond their tolerance: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
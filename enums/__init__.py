@@ -4,3 +4,7 @@ from .organ_states import OrganState
 from .player_types import PlayerType
 from .treatment_names import TreatmentName
 from .actions import Action
+from .engine_types import EngineType
+from .search_parallelism import SearchParallelism
+from .event_types import EventType
+from .table_modes import TableMode
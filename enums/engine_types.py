@@ -0,0 +1,6 @@
+from enum import StrEnum
+
+
+class EngineType(StrEnum):
+    OBJECT = "Object"
+    COMPACT = "Compact"
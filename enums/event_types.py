@@ -0,0 +1,14 @@
+from enum import StrEnum
+
+
+class EventType(StrEnum):
+    GAME_START = "GameStart"  # payload: None
+    GAME_OVER = "GameOver"  # winner
+    TURN_START = "TurnStart"  # current player
+    MOVE = "Move"  # move of a turn as a compact engine move tuple, None if the play failed
+    STATE = "State"  # state info dict (players' hands and bodies, deck, discard pile, observation vector)
+    NETWORK_OUTPUT = "NetworkOutput"  # output array of a NEAT network
+    NETWORK_SUBSET = "NetworkSubset"  # slice of the output array a decision is taken from
+    DECISION = "Decision"  # Action
+    CARD = "Card"  # card chosen to be played
+    CARD_PLAY_STATUS = "CardPlayStatus"  # True if at least one move of the played card succeeded
@@ -7,3 +7,4 @@ class PlayerType(StrEnum):
     NEAT_AI = "NEAT_AI"
     RULE_BASED_AI = "RuleBasedAI"
     STRATEGY_BASED_AI = "StrategyBasedAI"
+    ISMCTS_AI = "ISMCTS_AI"
@@ -0,0 +1,6 @@
+from enum import StrEnum
+
+
+class SearchParallelism(StrEnum):
+    ROOT = "Root"
+    LEAF = "Leaf"
@@ -0,0 +1,6 @@
+from enum import StrEnum
+
+
+class TableMode(StrEnum):
+    ROUND_ROBIN = "RoundRobin"
+    RANDOM = "Random"
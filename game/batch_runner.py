@@ -0,0 +1,164 @@
+import os
+import time
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
+from enums import PlayerType, EngineType
+from players import PlayerFactory
+from game.game_manager import GameManager, TurnLimitError, game_rng
+from game.dataset import DatasetRecorder, DatasetWriter
+from game.game_record import GameRecorder, GameRecordWriter
+from game.instrumentation import Instrumentation
+from game.results_sink import PlayedCardCounter, ResultsSink
+from interface import events
+from models.deck import DeckPool
+
+
+class BatchResult:
+    def __init__(self, seating: List[PlayerType]):
+        self.seating = list(seating)
+        self.wins = [0] * len(seating)
+        self.num_games = 0
+        self.num_errors = 0
+        self.total_turns = 0
+        self.min_turns: Optional[int] = None
+        self.max_turns: Optional[int] = None
+        self.cpu_time = 0.
+        self.wall_time = 0.
+
+    def add_game(self, winner_seat: int, num_turns: int) -> None:
+        self.wins[winner_seat] += 1
+        self.num_games += 1
+        self.total_turns += num_turns
+        self.min_turns = num_turns if self.min_turns is None else min(self.min_turns, num_turns)
+        self.max_turns = num_turns if self.max_turns is None else max(self.max_turns, num_turns)
+
+    def merge(self, other: 'BatchResult') -> None:
+        self.wins = [wins + other_wins for wins, other_wins in zip(self.wins, other.wins)]
+        self.num_games += other.num_games
+        self.num_errors += other.num_errors
+        self.total_turns += other.total_turns
+        for turns in (other.min_turns, other.max_turns):
+            if turns is not None:
+                self.min_turns = turns if self.min_turns is None else min(self.min_turns, turns)
+                self.max_turns = turns if self.max_turns is None else max(self.max_turns, turns)
+        self.cpu_time += other.cpu_time
+
+    @property
+    def mean_turns(self) -> float:
+        return self.total_turns / self.num_games if self.num_games else 0.
+
+    @property
+    def games_per_second(self) -> float:
+        return self.num_games / self.wall_time if self.wall_time else 0.
+
+    def win_rates(self) -> List[float]:
+        return [wins / self.num_games if self.num_games else 0. for wins in self.wins]
+
+    def seat_names(self) -> List[str]:
+        return [f"{player_type}#{seat + 1}" for seat, player_type in enumerate(self.seating)]
+
+
+def _player_factory(seating: List[PlayerType], player_kwargs: Dict[PlayerType, dict]) -> PlayerFactory:
+    player_factory = PlayerFactory()
+    for seat, player_type in enumerate(seating):
+        player_factory.add_player(player_type, f"{player_type}#{seat + 1}", **player_kwargs.get(player_type, {}))
+    return player_factory
+
+
+def play_games(seating: List[PlayerType], first_game: int, num_games: int, base_seed: int,
+               engine: EngineType = EngineType.OBJECT,
+               player_kwargs: Optional[Dict[PlayerType, dict]] = None, record_dir: Optional[str] = None,
+               results_dir: Optional[str] = None, dataset_dir: Optional[str] = None) -> BatchResult:
+    """Play a chunk of consecutive games; game ``i`` always uses the random stream ``game_rng(base_seed, i)``.
+
+    ``player_kwargs`` are passed to the constructors of the players of each type (e.g. the genome of NEAT players).
+    With ``record_dir`` the finished games are appended to game record shards in that directory, see
+    ``game.game_record``, and with ``results_dir`` one row per game (failed ones included) is written to the
+    columnar result chunks in that directory, see ``game.results_sink``. With ``dataset_dir`` every move is written as
+    a training record (observation, legal actions, chosen action, outcome) to dataset shards in that directory, see
+    ``game.dataset``. Without any of them (and without instrumentation or subscribers to ``interface.events``, e.g.
+    the presenter of ``main.py -v``) the games are played headless by ``GameManager.run_many``.
+    """
+    player_kwargs = player_kwargs or {}
+    result = BatchResult(seating)
+    start = time.process_time()
+    if (not record_dir and not results_dir and not dataset_dir and not Instrumentation.num_enabled
+            and not events.has_subscribers()):
+        # nothing listens to the games, so they are played headless by one game manager
+        outcomes = GameManager.run_many(_player_factory(seating, player_kwargs), num_games, base_seed, first_game,
+                                        engine)
+        for winner_seat, num_turns in zip(outcomes.winner_seats, outcomes.num_turns):
+            if winner_seat < 0:
+                result.num_errors += 1
+            else:
+                result.add_game(winner_seat, num_turns)
+        result.cpu_time = time.process_time() - start
+        return result
+    deck_pool = DeckPool()  # games are played one after the other, so one deck serves them all
+    chunk_name = f"{base_seed}-{first_game:012d}"
+    writer = GameRecordWriter(record_dir, prefix=f"games-{chunk_name}") if record_dir else None
+    sink = ResultsSink(results_dir, prefix=f"results-{chunk_name}") if results_dir else None
+    dataset = DatasetWriter(dataset_dir, prefix=f"dataset-{chunk_name}") if dataset_dir else None
+    with writer or nullcontext(), sink or nullcontext(), dataset or nullcontext():
+        for game_index in range(first_game, first_game + num_games):
+            player_factory = _player_factory(seating, player_kwargs)
+            game = GameManager(player_factory, engine=engine, rng=game_rng(base_seed, game_index), deck_pool=deck_pool)
+            recorder = GameRecorder(game, base_seed, game_index) if writer else None
+            counter = PlayedCardCounter(game) if sink else None
+            dataset_recorder = DatasetRecorder(game, game_index) if dataset else None
+            game_start = time.perf_counter()
+            winner_seat = None
+            try:
+                winner_seat = player_factory.players.index(game.run())
+            except TurnLimitError:
+                result.num_errors += 1
+                continue
+            finally:
+                if recorder:
+                    recorder.detach()
+                if sink:
+                    counter.detach()
+                    sink.add_game(game, counter, base_seed, game_index, seating, winner_seat,
+                                  time.perf_counter() - game_start)
+                if dataset:
+                    dataset_recorder.detach()
+                    dataset.write(dataset_recorder.game_records(winner_seat), base_seed, game_index, winner_seat)
+                game.release()
+            result.add_game(winner_seat, game.num_turns)
+            if writer:
+                writer.write(recorder.record(winner_seat))
+    result.cpu_time = time.process_time() - start
+    return result
+
+
+def run_batch(seating: List[PlayerType], num_games: int, num_workers: Optional[int] = None, base_seed: int = 0,
+              engine: EngineType = EngineType.OBJECT, chunk_size: Optional[int] = None,
+              first_game: int = 0, player_kwargs: Optional[Dict[PlayerType, dict]] = None,
+              record_dir: Optional[str] = None, results_dir: Optional[str] = None,
+              dataset_dir: Optional[str] = None) -> BatchResult:
+    """Play games ``first_game`` to ``first_game + num_games - 1`` with the given seating over a pool of workers.
+
+    Games are handed out in chunks (by default about eight chunks per worker) so the per-task overhead of the pool
+    stays small even when single games only take a fraction of a millisecond.
+    """
+    num_workers = num_workers or os.cpu_count() or 1
+    if chunk_size is None:
+        chunk_size = max(1, min(10_000, num_games // (num_workers * 8)))
+
+    result = BatchResult(seating)
+    start = time.perf_counter()
+    if num_workers == 1:
+        result.merge(play_games(seating, first_game, num_games, base_seed, engine, player_kwargs, record_dir,
+                                results_dir, dataset_dir))
+    else:
+        end_game = first_game + num_games
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            futures = [executor.submit(play_games, seating, chunk_start, min(chunk_size, end_game - chunk_start),
+                                       base_seed, engine, player_kwargs, record_dir, results_dir, dataset_dir)
+                       for chunk_start in range(first_game, end_game, chunk_size)]
+            for future in as_completed(futures):
+                result.merge(future.result())
+    result.wall_time = time.perf_counter() - start
+    return result
@@ -0,0 +1,490 @@
+import random
+from typing import List, Optional, Tuple
+
+from enums import Action, CardColor, CardType, OrganState, TreatmentName
+from game.game_constants import GameConstants
+from models.move import Move
+
+# Every card is stored as a small integer "face code". Identical cards (e.g. the five red organs) share a code,
+# so the whole game fits into a handful of bytearrays instead of a graph of Card/Organ objects.
+COLORS = list(CardColor)
+TREATMENTS = list(TreatmentName)
+NUM_COLORS = len(COLORS)
+WILD = COLORS.index(CardColor.WILD)
+
+ORGAN, VIRUS, MEDICINE, TREATMENT = range(4)
+TREATMENT_BASE = 3 * NUM_COLORS
+NUM_FACES = TREATMENT_BASE + len(TREATMENTS)
+
+TRANSPLANT = TREATMENT_BASE + TREATMENTS.index(TreatmentName.TRANSPLANT)
+ORGAN_THIEF = TREATMENT_BASE + TREATMENTS.index(TreatmentName.ORGAN_THIEF)
+CONTAGION = TREATMENT_BASE + TREATMENTS.index(TreatmentName.CONTAGION)
+LATEX_GLOVE = TREATMENT_BASE + TREATMENTS.index(TreatmentName.LATEX_GLOVE)
+MEDICAL_ERROR = TREATMENT_BASE + TREATMENTS.index(TreatmentName.MEDICAL_ERROR)
+
+FACE_KIND = bytes([code // NUM_COLORS if code < TREATMENT_BASE else TREATMENT for code in range(NUM_FACES)])
+FACE_COLOR = bytes([code % NUM_COLORS if code < TREATMENT_BASE else WILD for code in range(NUM_FACES)])
+
+EMPTY = 0xFF
+INFECTED = int(OrganState.INFECTED)
+HEALTHY = int(OrganState.HEALTHY)
+VACCINATED = int(OrganState.VACCINATED)
+IMMUNISED = int(OrganState.IMMUNISED)
+
+PLAY = 0
+DISCARD = 1
+
+
+def face_code(kind: int, color: CardColor) -> int:
+    return kind * NUM_COLORS + COLORS.index(color)
+
+
+def treatment_code(name: TreatmentName) -> int:
+    return TREATMENT_BASE + TREATMENTS.index(name)
+
+
+CARD_TYPE_KINDS = {CardType.ORGAN: ORGAN, CardType.VIRUS: VIRUS, CardType.MEDICINE: MEDICINE}
+
+
+def card_code(card: 'Card') -> int:
+    """Face code of an object engine card (organs by their original color)."""
+    if card.type == CardType.TREATMENT:
+        return treatment_code(card.name)
+    color = card.original_color if card.type == CardType.ORGAN else card.color
+    return face_code(CARD_TYPE_KINDS[card.type], color)
+
+
+def _slot(organ) -> int:
+    return COLORS.index(organ.original_color)
+
+
+def _organ_in_slot(player: 'BasePlayer', slot: int) -> 'Organ':
+    return next(organ for organ in player.body if _slot(organ) == slot)
+
+
+def object_move_key(game_state: 'GameState', history_entry: tuple) -> tuple:
+    """Move key (a compact move with the face codes of the cards instead of their hand indices, discards sorted) of a
+    play/discard of the object engine recorded in ``GameState.move_history``."""
+    _, action, played, moves = history_entry
+    if action == Action.DISCARD:
+        return DISCARD, tuple(sorted(card_code(card) for card in played))
+
+    code = card_code(played)
+    kind = FACE_KIND[code]
+    players = game_state.players
+    move = moves[0]
+    if kind == MEDICINE:
+        return PLAY, code, _slot(move.player_organ)
+    if kind == VIRUS or code == ORGAN_THIEF:
+        return PLAY, code, players.index(move.opponent), _slot(move.opponent_organ)
+    if code == TRANSPLANT:
+        return PLAY, code, players.index(move.opponent), _slot(move.opponent_organ), _slot(move.player_organ)
+    if code == CONTAGION:
+        return PLAY, code, tuple((_slot(move.player_organ), players.index(move.opponent), _slot(move.opponent_organ))
+                                 for move in moves)
+    if code == MEDICAL_ERROR:
+        return PLAY, code, players.index(move.opponent)
+    return PLAY, code
+
+
+def object_compact_move(game_state: 'GameState', hand: List['Card'], history_entry: tuple) -> tuple:
+    """Compact move of a play/discard recorded in ``GameState.move_history``, ``hand`` being the hand before it."""
+    _, action, played, _ = history_entry
+    if action == Action.DISCARD:
+        return DISCARD, tuple(sorted(hand.index(card) for card in played))
+    return (PLAY, hand.index(played)) + object_move_key(game_state, history_entry)[2:]
+
+
+def object_play(game_state: 'GameState', player: 'BasePlayer', key: tuple,
+                card: 'Card' = None) -> Tuple['Card', List[Move]]:
+    """The card of ``player`` (the first one with the face of the key unless given) and the moves that make the play
+    of a move key, see ``object_move_key``."""
+    code = key[1]
+    if card is None:
+        card = next(card for card in player.hand if card_code(card) == code)
+    organ = _organ_in_slot
+    players = game_state.players
+    kind = FACE_KIND[code]
+    if kind == MEDICINE:
+        return card, [Move(player_organ=organ(player, key[2]))]
+    if kind == VIRUS or code == ORGAN_THIEF:
+        opponent = players[key[2]]
+        return card, [Move(opponent=opponent, opponent_organ=organ(opponent, key[3]))]
+    if code == TRANSPLANT:
+        opponent = players[key[2]]
+        return card, [Move(opponent=opponent, player_organ=organ(player, key[4]),
+                           opponent_organ=organ(opponent, key[3]))]
+    if code == CONTAGION:
+        return card, [Move(opponent=players[target], player_organ=organ(player, slot),
+                           opponent_organ=organ(players[target], target_slot))
+                      for slot, target, target_slot in key[2]]
+    if code == MEDICAL_ERROR:
+        return card, [Move(opponent=players[key[2]])]
+    return card, [Move()]
+
+
+def _build_deck_codes() -> bytes:
+    # same composition and order as Deck._create_cards
+    codes = []
+    for kind, num_wild, num_colored in ((ORGAN, GameConstants.NUM_WILD_ORGANS, GameConstants.NUM_COLORED_ORGANS),
+                                        (VIRUS, GameConstants.NUM_WILD_VIRUSES, GameConstants.NUM_COLORED_VIRUSES),
+                                        (MEDICINE, GameConstants.NUM_WILD_MEDICINES, GameConstants.NUM_COLORED_MEDICINES)):
+        codes += [face_code(kind, CardColor.WILD)] * num_wild
+        for color in (CardColor.RED, CardColor.GREEN, CardColor.BLUE, CardColor.YELLOW):
+            codes += [face_code(kind, color)] * num_colored
+    codes += [CONTAGION] * GameConstants.NUM_CONTAGIONS
+    codes += [ORGAN_THIEF] * GameConstants.NUM_ORGAN_THIEVES
+    codes += [TRANSPLANT] * GameConstants.NUM_TRANSPLANTS
+    codes += [LATEX_GLOVE] * GameConstants.NUM_LATEX_GLOVES
+    codes += [MEDICAL_ERROR] * GameConstants.NUM_MEDICAL_ERRORS
+    return bytes(codes)
+
+
+DECK_CODES = _build_deck_codes()
+
+DISCARD_MOVES = [
+    [(DISCARD, tuple(i for i in range(hand_size) if mask >> i & 1)) for mask in range(1, 1 << hand_size)]
+    for hand_size in range(GameConstants.HAND_SIZE + 1)
+]
+
+
+def color_matches(card_color: int, organ_color: int, body_mask: int) -> bool:
+    """Whether a virus/medicine of ``card_color`` can go on an organ of ``organ_color`` in a body of ``body_mask``."""
+    if organ_color == WILD:
+        # cannot turn wild organ into a color that is already in the body
+        return card_color == WILD or not body_mask >> card_color & 1
+    return card_color == WILD or card_color == organ_color
+
+
+class CompactGameState:
+    """Array-backed game state for high-throughput simulation.
+
+    Each player's body has one slot per original organ color (a body never holds two organs of the same original
+    color), so organ ``slot`` of player ``p`` lives at index ``p * NUM_COLORS + slot`` of the flat arrays:
+
+    * ``states`` - ``OrganState`` value of the organ, ``0`` when the slot is empty,
+    * ``colors`` - current color of the organ (differs from the slot only for a recolored wild organ),
+    * ``attached`` - two face codes per slot holding the viruses/medicines lying on the organ.
+
+    Moves are plain tuples, see ``legal_moves``. The rules follow ``Card.play`` and the organ ``TRANSITIONS`` of the
+    object engine.
+    """
+
+    def __init__(self, num_players: int, rng: Optional[random.Random] = None):
+        self.num_players = num_players
+        self.deck = bytearray(DECK_CODES)
+        self.discard_pile = bytearray()
+        self.hands = [bytearray() for _ in range(num_players)]
+        self.states = bytearray(num_players * NUM_COLORS)
+        self.colors = bytearray(range(NUM_COLORS)) * num_players
+        self.attached = bytearray([EMPTY]) * (2 * num_players * NUM_COLORS)
+        self.reset(rng if rng is not None else random.Random())
+
+    def reset(self, rng: random.Random) -> None:
+        """Start a new game in place, shuffled by ``rng`` exactly like a new state."""
+        num_players = self.num_players
+        self.rng = rng
+        self.deck[:] = DECK_CODES
+        rng.shuffle(self.deck)
+        del self.discard_pile[:]
+        for hand in self.hands:
+            del hand[:]
+        self.states[:] = bytes(num_players * NUM_COLORS)
+        self.colors[:] = bytes(range(NUM_COLORS)) * num_players
+        self.attached[:] = bytes([EMPTY]) * (2 * num_players * NUM_COLORS)
+        self.current_player_index = rng.randint(0, num_players - 1)
+
+    @classmethod
+    def from_game_state(cls, game_state: 'GameState') -> 'CompactGameState':
+        """Exact compact copy of an object engine state, including the hidden hands and the deck order."""
+        state = cls.__new__(cls)
+        state.num_players = game_state.num_players
+        state.rng = game_state.rng
+        state.deck = bytearray(card_code(card) for card in game_state.deck.cards)
+        state.discard_pile = bytearray(card_code(card) for card in game_state.deck.discard_pile)
+        state.hands = [bytearray(card_code(card) for card in player.hand) for player in game_state.players]
+        state.states = bytearray(state.num_players * NUM_COLORS)
+        state.colors = bytearray(range(NUM_COLORS)) * state.num_players
+        state.attached = bytearray([EMPTY]) * (2 * state.num_players * NUM_COLORS)
+        for player_index, player in enumerate(game_state.players):
+            for organ in player.body:
+                i = player_index * NUM_COLORS + COLORS.index(organ.original_color)
+                state.states[i] = organ.state
+                state.colors[i] = COLORS.index(organ.color)
+                for j, card in enumerate(organ.viruses + organ.medicines):
+                    state.attached[2 * i + j] = card_code(card)
+        state.current_player_index = game_state.current_player_index
+        return state
+
+    def copy(self) -> 'CompactGameState':
+        state = CompactGameState.__new__(CompactGameState)
+        state.num_players = self.num_players
+        state.rng = self.rng
+        state.deck = self.deck[:]
+        state.discard_pile = self.discard_pile[:]
+        state.hands = [hand[:] for hand in self.hands]
+        state.states = self.states[:]
+        state.colors = self.colors[:]
+        state.attached = self.attached[:]
+        state.current_player_index = self.current_player_index
+        return state
+
+    def to_bytes(self) -> bytes:
+        """The whole state in a couple hundred bytes, cheap to send to worker processes (the rng is not included)."""
+        header = bytes([self.num_players, self.current_player_index, len(self.deck), len(self.discard_pile),
+                        *(len(hand) for hand in self.hands)])
+        return b"".join((header, self.deck, self.discard_pile, *self.hands, self.states, self.colors, self.attached))
+
+    @classmethod
+    def from_bytes(cls, data: bytes, rng: Optional[random.Random] = None) -> 'CompactGameState':
+        state = cls.__new__(cls)
+        num_players = state.num_players = data[0]
+        state.rng = rng if rng is not None else random.Random()
+        state.current_player_index = data[1]
+        start = 4 + num_players
+        sizes = [data[2], data[3], *data[4:start], num_players * NUM_COLORS, num_players * NUM_COLORS,
+                 2 * num_players * NUM_COLORS]
+        parts = []
+        for size in sizes:
+            parts.append(bytearray(data[start:start + size]))
+            start += size
+        state.deck, state.discard_pile = parts[:2]
+        state.hands = parts[2:2 + num_players]
+        state.states, state.colors, state.attached = parts[2 + num_players:]
+        return state
+
+    def next_player(self) -> None:
+        self.current_player_index = (self.current_player_index + 1) % self.num_players
+
+    def draw_card(self) -> int:
+        if not self.deck:
+            self.deck = self.discard_pile[::-1]
+            self.discard_pile = bytearray()
+        return self.deck.pop()
+
+    def complete_hand(self, player_index: int) -> None:
+        hand = self.hands[player_index]
+        while len(hand) < GameConstants.HAND_SIZE and (self.deck or self.discard_pile):
+            hand.append(self.draw_card())
+
+    def color_mask(self, player_index: int) -> int:
+        mask = 0
+        base = player_index * NUM_COLORS
+        states = self.states
+        colors = self.colors
+        for i in range(base, base + NUM_COLORS):
+            if states[i]:
+                mask |= 1 << colors[i]
+        return mask
+
+    def check_win_condition(self, player_index: int) -> bool:
+        base = player_index * NUM_COLORS
+        healthy_organs = 0
+        for state in self.states[base:base + NUM_COLORS]:
+            if state >= HEALTHY:
+                healthy_organs += 1
+        return healthy_organs >= GameConstants.NUM_HEALTHY_ORGANS_TO_WIN
+
+    def can_infect(self, virus_color: int, target_index: int, slot: int) -> bool:
+        i = target_index * NUM_COLORS + slot
+        return (0 < self.states[i] < IMMUNISED
+                and color_matches(virus_color, self.colors[i], self.color_mask(target_index)))
+
+    def legal_moves(self) -> list[tuple]:
+        """Enumerate the moves of the current player: every discard followed by every ``legal_plays`` move."""
+        return DISCARD_MOVES[len(self.hands[self.current_player_index])] + self.legal_plays()
+
+    def legal_plays(self) -> list[tuple]:
+        """Enumerate the card plays of the current player.
+
+        * ``(PLAY, hand_index)`` - organ, latex glove
+        * ``(PLAY, hand_index, slot)`` - medicine on own organ
+        * ``(PLAY, hand_index, target, target_slot)`` - virus, organ thief
+        * ``(PLAY, hand_index, target, target_slot, slot)`` - transplant
+        * ``(PLAY, hand_index, target)`` - medical error
+        * ``(PLAY, hand_index, ((slot, target, target_slot), ...))`` - contagion, one transfer per move
+        """
+        player_index = self.current_player_index
+        states = self.states
+        colors = self.colors
+        base = player_index * NUM_COLORS
+        masks = [self.color_mask(i) for i in range(self.num_players)]
+        own_mask = masks[player_index]
+        opponents = [i for i in range(self.num_players) if i != player_index]
+        # (target, slot, color) of every opponent organ that is not immunised
+        targets = [(target, slot, colors[target * NUM_COLORS + slot])
+                   for target in opponents
+                   for slot in range(NUM_COLORS)
+                   if 0 < states[target * NUM_COLORS + slot] < IMMUNISED]
+        moves = []
+
+        for hand_index, code in enumerate(self.hands[player_index]):
+            kind = FACE_KIND[code]
+            color = FACE_COLOR[code]
+            if kind == ORGAN:
+                if not own_mask >> color & 1 and not states[base + color]:
+                    moves.append((PLAY, hand_index))
+            elif kind == MEDICINE:
+                moves += [(PLAY, hand_index, slot) for slot in range(NUM_COLORS)
+                          if 0 < states[base + slot] < IMMUNISED
+                          and color_matches(color, colors[base + slot], own_mask)]
+            elif kind == VIRUS:
+                moves += [(PLAY, hand_index, target, slot)
+                          for target, slot, organ_color in targets
+                          if color_matches(color, organ_color, masks[target])]
+            elif code == ORGAN_THIEF:
+                moves += [(PLAY, hand_index, target, slot)
+                          for target, slot, organ_color in targets
+                          if not own_mask >> organ_color & 1 and not states[base + slot]]
+            elif code == TRANSPLANT:
+                own_organs = [(slot, colors[base + slot]) for slot in range(NUM_COLORS)
+                              if 0 < states[base + slot] < IMMUNISED]
+                # after the swap neither body may hold two organs of the same color
+                moves += [(PLAY, hand_index, target, target_slot, slot)
+                          for target, target_slot, organ_color in targets
+                          for slot, own_color in own_organs
+                          if not (own_mask & ~(1 << own_color)) >> organ_color & 1
+                          and not (masks[target] & ~(1 << organ_color)) >> own_color & 1
+                          and (slot == target_slot or not states[base + target_slot]
+                               and not states[target * NUM_COLORS + slot])]
+            elif code == CONTAGION:
+                for slot in range(NUM_COLORS):
+                    if states[base + slot] == INFECTED:
+                        virus_color = FACE_COLOR[self.attached[2 * (base + slot)]]
+                        moves += [(PLAY, hand_index, ((slot, target, target_slot),))
+                                  for target, target_slot, organ_color in targets
+                                  if color_matches(virus_color, organ_color, masks[target])]
+            elif code == MEDICAL_ERROR:
+                # a swap that moves some organ
+                moves += [(PLAY, hand_index, target) for target in opponents if own_mask or masks[target]]
+            elif code == LATEX_GLOVE:
+                moves.append((PLAY, hand_index))
+        return moves
+
+    def apply_move(self, move: tuple) -> None:
+        player_index = self.current_player_index
+        hand = self.hands[player_index]
+        if move[0] == DISCARD:
+            for hand_index in sorted(move[1], reverse=True):
+                self.discard_pile.append(hand[hand_index])
+                del hand[hand_index]
+            return
+
+        hand_index = move[1]
+        code = hand[hand_index]
+        kind = FACE_KIND[code]
+        if kind == ORGAN:
+            i = player_index * NUM_COLORS + FACE_COLOR[code]
+            self.states[i] = HEALTHY
+            self.colors[i] = FACE_COLOR[code]
+        elif kind == MEDICINE:
+            self._apply_medicine(code, player_index * NUM_COLORS + move[2])
+        elif kind == VIRUS:
+            self._apply_virus(code, move[2] * NUM_COLORS + move[3])
+        elif code == ORGAN_THIEF:
+            self._move_organ(move[2], player_index, move[3])
+            self.discard_pile.append(code)
+        elif code == TRANSPLANT:
+            target, target_slot, slot = move[2], move[3], move[4]
+            if slot == target_slot:
+                self._swap_organs(player_index, target, slot)
+            else:
+                self._move_organ(target, player_index, target_slot)
+                self._move_organ(player_index, target, slot)
+            self.discard_pile.append(code)
+        elif code == CONTAGION:
+            for slot, target, target_slot in move[2]:
+                i = player_index * NUM_COLORS + slot
+                virus = self.attached[2 * i]
+                if self.states[i] != INFECTED or not self.can_infect(FACE_COLOR[virus], target, target_slot):
+                    continue
+                self._clear_attached(i)
+                self.states[i] = HEALTHY
+                self.colors[i] = slot
+                self._apply_virus(virus, target * NUM_COLORS + target_slot)
+            self.discard_pile.append(code)
+        elif code == MEDICAL_ERROR:
+            self._swap_bodies(player_index, move[2])
+            self.discard_pile.append(code)
+        elif code == LATEX_GLOVE:
+            for target in range(self.num_players):
+                if target != player_index:
+                    target_hand = self.hands[target]
+                    self.discard_pile += target_hand[::-1]
+                    target_hand.clear()
+            self.discard_pile.append(code)
+        del hand[hand_index]
+
+    def _apply_virus(self, virus: int, i: int) -> None:
+        state = self.states[i]
+        if state == HEALTHY:
+            self.states[i] = INFECTED
+            self.attached[2 * i] = virus
+            if self.colors[i] == WILD:
+                self.colors[i] = FACE_COLOR[virus]
+        elif state == INFECTED:
+            self.discard_pile.append(self.attached[2 * i])
+            self.discard_pile.append(ORGAN * NUM_COLORS + i % NUM_COLORS)
+            self.discard_pile.append(virus)
+            self._clear_attached(i)
+            self.states[i] = 0
+            self.colors[i] = i % NUM_COLORS
+        elif state == VACCINATED:
+            self.discard_pile.append(self.attached[2 * i])
+            self.discard_pile.append(virus)
+            self._clear_attached(i)
+            self.states[i] = HEALTHY
+            self.colors[i] = i % NUM_COLORS
+        else:
+            raise ValueError('Virus cannot be applied on immunised organ')
+
+    def _apply_medicine(self, medicine: int, i: int) -> None:
+        state = self.states[i]
+        if state == HEALTHY:
+            self.states[i] = VACCINATED
+            self.attached[2 * i] = medicine
+            if self.colors[i] == WILD:
+                self.colors[i] = FACE_COLOR[medicine]
+        elif state == INFECTED:
+            self.discard_pile.append(self.attached[2 * i])
+            self.discard_pile.append(medicine)
+            self._clear_attached(i)
+            self.states[i] = HEALTHY
+            self.colors[i] = i % NUM_COLORS
+        elif state == VACCINATED:
+            self.states[i] = IMMUNISED
+            self.attached[2 * i + 1] = medicine
+        else:
+            raise ValueError('Medicine cannot be applied on immunised organ')
+
+    def _clear_attached(self, i: int) -> None:
+        self.attached[2 * i] = EMPTY
+        self.attached[2 * i + 1] = EMPTY
+
+    def _move_organ(self, source_index: int, target_index: int, slot: int) -> None:
+        source = source_index * NUM_COLORS + slot
+        target = target_index * NUM_COLORS + slot
+        if self.states[target]:
+            raise ValueError
+        self.states[target] = self.states[source]
+        self.colors[target] = self.colors[source]
+        self.attached[2 * target:2 * target + 2] = self.attached[2 * source:2 * source + 2]
+        self.states[source] = 0
+        self.colors[source] = slot
+        self._clear_attached(source)
+
+    def _swap_organs(self, first_index: int, second_index: int, slot: int) -> None:
+        first = first_index * NUM_COLORS + slot
+        second = second_index * NUM_COLORS + slot
+        for array, i, j in ((self.states, first, second), (self.colors, first, second)):
+            array[i], array[j] = array[j], array[i]
+        first_attached = slice(2 * first, 2 * first + 2)
+        second_attached = slice(2 * second, 2 * second + 2)
+        self.attached[first_attached], self.attached[second_attached] = \
+            self.attached[second_attached], self.attached[first_attached]
+
+    def _swap_bodies(self, first_index: int, second_index: int) -> None:
+        for array, width in ((self.states, NUM_COLORS), (self.colors, NUM_COLORS), (self.attached, 2 * NUM_COLORS)):
+            first = slice(first_index * width, (first_index + 1) * width)
+            second = slice(second_index * width, (second_index + 1) * width)
+            array[first], array[second] = array[second], array[first]
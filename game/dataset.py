@@ -0,0 +1,234 @@
+import os
+from bisect import bisect_right
+from glob import escape, glob
+from typing import Iterator, Optional
+
+import numpy as np
+
+from enums import EngineType, EventType
+from game.compact_game_state import CompactGameState
+from game.game_constants import GameConstants
+from game.state_encoder import StateEncoder
+from game.vector_game_state import HAND_SIZE, action_index, num_actions
+
+# A dataset is a directory of shards written by DatasetWriters. A shard holds the fixed-width records of whole games
+# in <prefix>-<n>.records.npy (a structured array, see record_dtype) and one row per game in <prefix>-<n>.games.npy,
+# pointing to the records of the game. Actions use the layout of VectorGameState: play indices, then
+# num_play_actions + the bit mask of the discarded hand cards.
+RECORDS_SUFFIX = '.records.npy'
+GAMES_SUFFIX = '.games.npy'
+PARTIAL_SUFFIX = '.partial'
+DEFAULT_SHARD_ROWS = 1 << 15
+PASS = -1  # action of a play the rules rejected (the card stayed in the hand)
+
+GAME_DTYPE = np.dtype([
+    ('base_seed', np.int64),
+    ('game_index', np.int64),
+    ('start', np.int64),  # first record of the game in its shard
+    ('num_records', np.int32),
+    ('winner_seat', np.int8),  # -1 when the game failed
+])
+
+
+def record_dtype(num_players: int) -> np.dtype:
+    """One move of a game: the observation of the moving player before the move, its legal actions and its choice."""
+    return np.dtype([
+        ('game_index', np.int64),
+        ('turn', np.uint16),
+        ('seat', np.uint8),
+        ('winner_seat', np.int8),  # -1 when the game failed
+        ('action', np.int16),  # PASS for a rejected play
+        ('observation', np.float32, (StateEncoder(num_players).num_inputs,)),  # get_state_array_for_ai
+        ('legal_mask', np.uint8, ((num_actions(num_players) + 7) // 8,)),  # bits of the legal actions, little endian
+    ])
+
+
+class DatasetRecorder:
+    """Collects the records of a game from its event bus while it is played (object engine only, the observations
+    are the ones of ``GameState.get_state_array_for_ai``).
+
+    The legal actions come from the compact copy of the position, so they are the plays of
+    ``CompactGameState.legal_plays`` and every non-empty discard. Both engines apply the same rules, so the action of
+    every accepted play is in the mask (a contagion spreading several viruses as the action of its first transfer).
+    """
+
+    def __init__(self, game: 'GameManager', game_index: int):
+        if game.engine != EngineType.OBJECT:
+            raise ValueError("Datasets need the observations of the object engine")
+        self.game = game
+        self.game_index = game_index
+        self.num_players = len(game.config.players)
+        self.num_play_actions = num_actions(self.num_players) - (1 << HAND_SIZE)
+        self.records = np.zeros(256, record_dtype(self.num_players))  # grows with the game
+        self.num_records = 0
+        self._hand = b''
+        game.events.subscribe(EventType.TURN_START, self.on_turn_start)
+        game.events.subscribe(EventType.MOVE, self.on_move)
+
+    def on_turn_start(self, player: 'BasePlayer') -> None:
+        if not player.hand:  # no move this turn
+            return
+        if self.num_records == len(self.records):
+            self.records = np.concatenate([self.records, np.zeros_like(self.records)])
+        state = self.game.state
+        compact = CompactGameState.from_game_state(state)
+        seat = state.current_player_index
+        self._hand = compact.hands[seat]
+        legal = np.zeros(num_actions(self.num_players), bool)
+        legal[[action_index(move, self._hand, self.num_players) for move in compact.legal_plays()]] = True
+        legal[self.num_play_actions + 1:self.num_play_actions + (1 << len(self._hand))] = True
+
+        record = self.records[self.num_records]
+        record['turn'] = self.game.num_turns
+        record['seat'] = seat
+        record['observation'] = np.frombuffer(state.get_state_array_view(), np.float32)
+        record['legal_mask'] = np.packbits(legal, bitorder='little')
+
+    def on_move(self, move: Optional[tuple]) -> None:
+        self.records[self.num_records]['action'] = (PASS if move is None
+                                                    else action_index(move, self._hand, self.num_players))
+        self.num_records += 1
+
+    def detach(self) -> None:
+        self.game.events.unsubscribe(EventType.TURN_START, self.on_turn_start)
+        self.game.events.unsubscribe(EventType.MOVE, self.on_move)
+
+    def game_records(self, winner_seat: Optional[int]) -> np.ndarray:
+        records = self.records[:self.num_records]
+        records['game_index'] = self.game_index
+        records['winner_seat'] = -1 if winner_seat is None else winner_seat
+        return records
+
+
+class DatasetWriter:
+    """Buffers the records of whole games and writes them in shards of at most ``shard_rows`` records (a single
+    longer game gets a shard of its own) to ``directory``.
+
+    Shards are written under temporary names and renamed when complete, the games table first, so readers never see
+    partial shards. The buffers have a fixed size, so the memory of a writer does not grow with the dataset. A new
+    writer never touches existing shards, it starts the next one.
+    """
+
+    def __init__(self, directory: str, prefix: str = 'dataset', shard_rows: int = DEFAULT_SHARD_ROWS):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.prefix = prefix
+        self.shard_rows = shard_rows
+        self.num_records = 0
+        self.num_games = 0
+        self._shard_number = len(glob(os.path.join(escape(directory), f'{escape(prefix)}-*{RECORDS_SUFFIX}')))
+        self._records = None  # allocated with the dtype of the first game
+        self._games = np.zeros(shard_rows, GAME_DTYPE)
+        self._num_buffered = 0
+        self._num_buffered_games = 0
+
+    def write(self, records: np.ndarray, base_seed: int, game_index: int, winner_seat: Optional[int]) -> None:
+        if self._records is None:
+            self._records = np.zeros(self.shard_rows, records.dtype)
+        if self._num_buffered + len(records) > self.shard_rows or self._num_buffered_games == self.shard_rows:
+            self.flush()
+        game = self._games[self._num_buffered_games]
+        game['base_seed'] = base_seed
+        game['game_index'] = game_index
+        game['start'] = self._num_buffered
+        game['num_records'] = len(records)
+        game['winner_seat'] = -1 if winner_seat is None else winner_seat
+        self._num_buffered_games += 1
+        if len(records) > self.shard_rows:
+            self._save(records)
+        else:
+            self._records[self._num_buffered:self._num_buffered + len(records)] = records
+            self._num_buffered += len(records)
+        self.num_records += len(records)
+        self.num_games += 1
+
+    def flush(self) -> None:
+        if self._num_buffered_games:
+            self._save(self._records[:self._num_buffered])
+
+    def _save(self, records: np.ndarray) -> None:
+        path = os.path.join(self.directory, f'{self.prefix}-{self._shard_number:05d}')
+        self._shard_number += 1
+        for suffix, array in ((GAMES_SUFFIX, self._games[:self._num_buffered_games]), (RECORDS_SUFFIX, records)):
+            with open(path + suffix + PARTIAL_SUFFIX, 'wb') as f:
+                np.save(f, array)
+            os.rename(path + suffix + PARTIAL_SUFFIX, path + suffix)
+        self._num_buffered = 0
+        self._num_buffered_games = 0
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self) -> 'DatasetWriter':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class Dataset:
+    """The shards written to ``directory`` by dataset writers, memory mapped.
+
+    Opening a dataset reads the array headers only, records are read when they are accessed, so training code can
+    stream through any number of shards::
+
+        dataset = Dataset('dataset')
+        for records in dataset.shards():
+            observations, legal = records['observation'], dataset.legal_masks(records)
+            values = dataset.outcomes(records)
+    """
+
+    def __init__(self, directory: str):
+        self.paths = sorted(path[:-len(RECORDS_SUFFIX)]
+                            for path in glob(os.path.join(escape(directory), f'*{RECORDS_SUFFIX}')))
+        self._records = [np.load(path + RECORDS_SUFFIX, mmap_mode='r') for path in self.paths]
+        self._games = [np.load(path + GAMES_SUFFIX, mmap_mode='r') for path in self.paths]
+        self._first_records = list(np.cumsum([0] + [len(records) for records in self._records[:-1]]))
+        self._first_games = list(np.cumsum([0] + [len(games) for games in self._games[:-1]]))
+        self.num_players = None
+        if self._records:
+            self.num_players = next(num_players for num_players in range(GameConstants.MIN_PLAYERS,
+                                                                         GameConstants.MAX_PLAYERS + 1)
+                                    if record_dtype(num_players) == self._records[0].dtype)
+
+    def __len__(self) -> int:
+        return sum(len(records) for records in self._records)
+
+    @property
+    def num_games(self) -> int:
+        return sum(len(games) for games in self._games)
+
+    def __getitem__(self, i: int) -> np.void:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("dataset record index out of range")
+        shard = bisect_right(self._first_records, i) - 1
+        return self._records[shard][i - self._first_records[shard]]
+
+    def shards(self) -> Iterator[np.ndarray]:
+        """The memory-mapped records of one shard after the other."""
+        yield from self._records
+
+    def games(self) -> Iterator[tuple]:
+        """``(game, records)`` of every game, ``game`` being its row of ``GAME_DTYPE``."""
+        for records, games in zip(self._records, self._games):
+            for game in games:
+                yield game, records[game['start']:game['start'] + game['num_records']]
+
+    def game(self, i: int) -> np.ndarray:
+        """The records of the ``i``-th game."""
+        shard = bisect_right(self._first_games, i) - 1
+        game = self._games[shard][i - self._first_games[shard]]
+        return self._records[shard][game['start']:game['start'] + game['num_records']]
+
+    def legal_masks(self, records: np.ndarray) -> np.ndarray:
+        """Unpacked legal actions of ``records``, one boolean per action."""
+        return np.unpackbits(records['legal_mask'], axis=-1, count=num_actions(self.num_players),
+                             bitorder='little').astype(bool)
+
+    @staticmethod
+    def outcomes(records: np.ndarray) -> np.ndarray:
+        """Final outcome for the moving player of ``records``: 1 won, -1 lost, 0 the game failed."""
+        winner_seats = records['winner_seat']
+        return np.where(winner_seats < 0, 0, np.where(winner_seats == records['seat'], 1, -1)).astype(np.float32)
@@ -6,6 +6,7 @@ class GameConstants:
     MAX_PLAYERS: int = 6
     HAND_SIZE: int = 3
     NUM_HEALTHY_ORGANS_TO_WIN: int = 4
+    MAX_TURNS: int = 10_000
 
     NUM_COLORED_ORGANS: int = 5
     NUM_COLORED_VIRUSES: int = 4
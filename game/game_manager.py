@@ -1,48 +1,194 @@
+import random
+from array import array
+from typing import List, Optional
+
 from players import PlayerFactory
-from enums import OrganState
+from enums import EngineType, EventType
 from players import BasePlayer
 from game.game_constants import GameConstants
 from game.game_state import GameState
-from interface import presenter
+from game.compact_game_state import CompactGameState, object_compact_move
+from models.deck import DeckPool
+from interface import EventBus, events as default_events
+
+
+def game_rng(base_seed: int, game_index: int) -> random.Random:
+    """Random stream of game ``game_index`` of a run seeded with ``base_seed``.
+
+    The seed is a string, which ``random.Random`` hashes with sha512, so streams of different games are independent
+    and do not depend on ``PYTHONHASHSEED`` - any game of a run can be replayed alone from its index.
+    """
+    return random.Random(f"{base_seed}:{game_index}")
+
+
+class TurnLimitError(RuntimeError):
+    """A game did not finish within ``GameConstants.MAX_TURNS`` turns."""
+
+
+class GameOutcomes:
+    """Winner seat (-1 for a failed game) and number of turns of every game played by ``GameManager.run_many``."""
+
+    def __init__(self, num_players: int):
+        self.num_players = num_players
+        self.winner_seats = array('b')
+        self.num_turns = array('I')
+
+    def add(self, winner_seat: int, num_turns: int) -> None:
+        self.winner_seats.append(winner_seat)
+        self.num_turns.append(num_turns)
+
+    def __len__(self) -> int:
+        return len(self.winner_seats)
+
+    @property
+    def num_errors(self) -> int:
+        return self.winner_seats.count(-1)
+
+    def wins(self) -> List[int]:
+        return [self.winner_seats.count(seat) for seat in range(self.num_players)]
 
 
 class GameManager:
-    def __init__(self, player_factory: PlayerFactory) -> None:
+    def __init__(self, player_factory: PlayerFactory, engine: EngineType = EngineType.OBJECT,
+                 rng: Optional[random.Random] = None, events: Optional['EventBus'] = None,
+                 deck_pool: Optional[DeckPool] = None) -> None:
         if not player_factory.is_valid():
             raise ValueError("The game configuration is invalid!")
         self.config = player_factory
-        self.state = GameState(player_factory.players)
+        self.engine = engine
+        self.num_turns = 0
+        # one stream drives the deck, the starting player and every random decision of the game
+        self.rng = rng if rng is not None else random.Random()
+        # game events (turns, decisions, states) for presenters, loggers and recorders
+        self.events = events if events is not None else default_events
+        for player in player_factory.players:
+            player.rng = self.rng
+        self.deck_pool = deck_pool
+        if engine == EngineType.OBJECT:
+            deck = deck_pool.acquire(self.rng) if deck_pool is not None else None
+            self.state = GameState(player_factory.players, self.rng, self.events, deck)
+        elif engine == EngineType.COMPACT:
+            unsupported = [str(player) for player in player_factory.players if not player.supports_compact_engine]
+            if unsupported:
+                raise ValueError(f"Players not supported by the compact engine: {', '.join(unsupported)}")
+            self.state = CompactGameState(len(player_factory.players), self.rng)
+        else:
+            raise ValueError(f"Unknown engine type: {engine}")
 
-    def run(self) -> BasePlayer:
-        presenter.print_game_start()
+    def run(self, headless: bool = False) -> BasePlayer:
+        """Play the game to its end and return the winner. A ``headless`` game publishes no events of its own."""
+        if not headless:
+            self.events.emit(EventType.GAME_START)
+        play_turn = self.play_turn if self.engine == EngineType.OBJECT else self.play_compact_turn
         winner = None
-        turn_counter = 0
-        max_turns = 10_000
         while not winner:
-            winner = self.play_turn()
-            turn_counter += 1
-            if turn_counter > max_turns:
-                raise RuntimeError(f"Game did not finish after {max_turns} turns")
-        self.presenter.print_game_over(winner)
+            winner = play_turn(headless)
+            self.num_turns += 1
+            if self.num_turns > GameConstants.MAX_TURNS:
+                raise TurnLimitError(f"Game did not finish after {GameConstants.MAX_TURNS} turns")
+        if not headless:
+            self.events.emit(EventType.GAME_OVER, winner)
         return winner
 
+    @classmethod
+    def run_many(cls, player_factory: PlayerFactory, num_games: int, base_seed: int = 0, first_game: int = 0,
+                 engine: EngineType = EngineType.OBJECT) -> GameOutcomes:
+        """Play games ``first_game`` to ``first_game + num_games - 1`` of the seating of ``player_factory`` headless.
+
+        Game ``i`` is the game ``run`` plays with the stream ``game_rng(base_seed, i)``, played by ``run`` itself
+        headless, but the players, the deck and the state are reset in place between games, and no events are
+        published - not even the players' own ``DECISION``/``CARD`` events, which go to a bus nobody listens to. Games hitting the turn limit count as
+        errors.
+        """
+        outcomes = GameOutcomes(len(player_factory.players))
+        if not num_games:
+            return outcomes
+        game = cls(player_factory, engine, game_rng(base_seed, first_game), EventBus(), DeckPool())
+        players = player_factory.players
+        for game_index in range(first_game, first_game + num_games):
+            if game_index != first_game:
+                game.reset(game_rng(base_seed, game_index))
+            try:
+                winner_seat = players.index(game.run(headless=True))
+            except TurnLimitError:
+                winner_seat = -1
+            outcomes.add(winner_seat, game.num_turns)
+        game.release()
+        return outcomes
+
+    def reset(self, rng: random.Random) -> None:
+        """Start a new game of the same players in place, as if the game manager was created with ``rng``."""
+        self.rng = rng
+        self.num_turns = 0
+        for player in self.config.players:
+            player.reset()
+            player.rng = rng
+        if self.engine == EngineType.OBJECT:
+            deck = self.state.deck
+            if self.deck_pool is not None:
+                self.deck_pool.release(deck)
+                deck = self.deck_pool.acquire(rng)
+            else:
+                deck.reset(rng)
+            self.state.reset(rng, deck)
+        else:
+            self.state.reset(rng)
+
+    def release(self) -> None:
+        """Return the deck to the pool of the game, after which the game state must not be used any more."""
+        if self.deck_pool is not None and self.engine == EngineType.OBJECT:
+            self.deck_pool.release(self.state.deck)
+            self.deck_pool = None
+
     def check_win_condition(self, player: BasePlayer) -> bool:
-        healthy_organs = [organ for organ in player.body if organ.state != OrganState.INFECTED]
-        return len(healthy_organs) >= GameConstants.NUM_HEALTHY_ORGANS_TO_WIN  # check if player has X healthy (or vaccinated or immunised) organs
+        return self.state.check_win_condition(player)
 
-    def play_turn(self) -> BasePlayer:
-        presenter.print_separator()
-        current_player = self.state.get_current_player()
-        presenter.print_state(self._compose_state_info(current_player))
+    def play_turn(self, headless: bool = False) -> BasePlayer:
+        events = self.events
+        state = self.state
+        current_player = state.get_current_player()
+        if not headless:
+            events.emit(EventType.TURN_START, current_player)
+            events.emit_lazy(EventType.STATE, self._compose_state_info, current_player)
 
         if current_player.hand:  # if latex glove card was played - skip first phase and complete hand right away
-            current_player.take_turn(self.state)
-            if self.check_win_condition(current_player):
-                self.presenter.print_state(self._compose_state_info(current_player))
+            if not headless and events.has_subscribers(EventType.MOVE):  # recorders need the hand before the move
+                hand, history_size = current_player.hand[:], len(state.move_history)
+                current_player.take_turn(state)
+                events.emit(EventType.MOVE, self._played_move(hand, history_size))
+            else:
+                current_player.take_turn(state)
+            if state.check_win_condition(current_player):
+                if not headless:
+                    events.emit_lazy(EventType.STATE, self._compose_state_info, current_player)
                 return current_player
 
-        self.state.complete_hand(current_player)
-        self.state.next_player()
+        state.complete_hand(current_player)
+        state.next_player()
+
+    def play_compact_turn(self, headless: bool = False) -> BasePlayer:
+        state = self.state
+        player_index = state.current_player_index
+        if state.hands[player_index]:
+            current_player = self.config.players[player_index]
+            if headless:
+                move = current_player.decide_compact_move(state)
+            else:
+                self.events.emit(EventType.TURN_START, current_player)
+                move = current_player.decide_compact_move(state)
+                self.events.emit(EventType.MOVE, move)
+            state.apply_move(move)
+            if state.check_win_condition(player_index):
+                return current_player
+
+        state.complete_hand(player_index)
+        state.next_player()
+
+    def _played_move(self, hand: List['Card'], history_size: int) -> Optional[tuple]:
+        history = self.state.move_history
+        if len(history) == history_size:  # the play failed, the card stays in the hand
+            return None
+        return object_compact_move(self.state, hand, history[history_size])
 
     def _compose_state_info(self, current_player: BasePlayer) -> dict:
         state_info = self.state.get_state_info()
@@ -0,0 +1,274 @@
+import mmap
+import os
+import struct
+from bisect import bisect_right
+from glob import escape, glob
+from typing import Iterator, List, Optional, Union
+
+from enums import EngineType, EventType, PlayerType
+from game.compact_game_state import CompactGameState, DISCARD, PLAY, card_code, object_play
+from game.game_constants import GameConstants
+from game.game_manager import GameManager, game_rng
+from game.game_state import GameState
+from interface.event_bus import EventBus
+from players import PlayerFactory
+
+# A record is a fixed header followed by the moves of the game, one per turn of a player holding cards (turns skipped
+# after a latex glove have no move). Moves are compact engine move tuples packed into bytes, the first byte being
+#   00 nnnn ii - play of hand card ii followed by its nnnn arguments, one byte each (target players and organ slots)
+#   01 nnnn ii - contagion from hand card ii followed by nnnn (slot, target, target slot) triples
+#   10 mmmmmm  - discard of the hand cards in the bit mask mmmmmm
+#   11111111   - pass (the play failed and the card stayed in the hand)
+# The seed and the moves are enough to replay a game: the deck and the starting player come from game_rng.
+RECORD_HEADER = struct.Struct('<qQBBBxI')  # base seed, game index, engine, players, winner seat, turns
+RECORD_END = struct.Struct('<Q')
+MAGIC = b'VIRUSGR1'
+DATA_SUFFIX = '.vgr'
+INDEX_SUFFIX = '.idx'
+DEFAULT_SHARD_SIZE = 64 << 20
+
+ENGINES = list(EngineType)
+PLAY_OP, CONTAGION_OP, DISCARD_OP = 0, 1, 2
+PASS = 0xFF
+
+
+def encode_move(move: Optional[tuple]) -> bytes:
+    if move is None:
+        return bytes((PASS,))
+    if move[0] == DISCARD:
+        return bytes((DISCARD_OP << 6 | sum(1 << hand_index for hand_index in move[1]),))
+    hand_index, args = move[1], move[2:]
+    if args and isinstance(args[0], tuple):
+        triples = args[0]
+        return bytes((CONTAGION_OP << 6 | len(triples) << 2 | hand_index, *(arg for triple in triples for arg in triple)))
+    return bytes((len(args) << 2 | hand_index, *args))
+
+
+def decode_moves(data: bytes) -> Iterator[Optional[tuple]]:
+    i = 0
+    while i < len(data):
+        op = data[i]
+        i += 1
+        if op == PASS:
+            yield None
+        elif op >> 6 == DISCARD_OP:
+            yield DISCARD, tuple(hand_index for hand_index in range(GameConstants.HAND_SIZE) if op >> hand_index & 1)
+        elif op >> 6 == CONTAGION_OP:
+            count = op >> 2 & 0xF
+            yield PLAY, op & 3, tuple(tuple(data[j:j + 3]) for j in range(i, i + 3 * count, 3))
+            i += 3 * count
+        else:
+            count = op >> 2 & 0xF
+            yield (PLAY, op & 3, *data[i:i + count])
+            i += count
+
+
+class GameRecord:
+    def __init__(self, base_seed: int, game_index: int, engine: EngineType, num_players: int, winner_seat: int,
+                 num_turns: int, moves: bytes):
+        self.base_seed = base_seed
+        self.game_index = game_index
+        self.engine = engine
+        self.num_players = num_players
+        self.winner_seat = winner_seat
+        self.num_turns = num_turns
+        self.moves_data = moves
+
+    def to_bytes(self) -> bytes:
+        return RECORD_HEADER.pack(self.base_seed, self.game_index, ENGINES.index(self.engine), self.num_players,
+                                  self.winner_seat, self.num_turns) + self.moves_data
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'GameRecord':
+        base_seed, game_index, engine, num_players, winner_seat, num_turns = RECORD_HEADER.unpack_from(data)
+        return cls(base_seed, game_index, ENGINES[engine], num_players, winner_seat, num_turns,
+                   bytes(data[RECORD_HEADER.size:]))
+
+    def moves(self) -> Iterator[Optional[tuple]]:
+        return decode_moves(self.moves_data)
+
+    def replay(self, num_turns: Optional[int] = None) -> Union[GameState, CompactGameState]:
+        """State of the game after ``num_turns`` turns (the final state by default) rebuilt from the seed and moves.
+
+        Players are stand-ins that never decide anything. Replaying a whole game checks that it ends with the
+        recorded winner after the recorded number of turns.
+        """
+        player_factory = PlayerFactory()
+        for seat in range(self.num_players):
+            player_factory.add_player(PlayerType.RANDOM, f"Player{seat + 1}")
+        game = GameManager(player_factory, engine=self.engine, rng=game_rng(self.base_seed, self.game_index),
+                           events=EventBus())
+        state = game.state
+        compact = self.engine == EngineType.COMPACT
+        moves = self.moves()
+        for turn in range(self.num_turns if num_turns is None else min(num_turns, self.num_turns)):
+            player_index = state.current_player_index
+            # the compact engine identifies players by their index
+            player = player_index if compact else state.players[player_index]
+            if state.hands[player_index] if compact else player.hand:
+                move = next(moves)
+                if compact:
+                    state.apply_move(move)
+                else:
+                    _apply_object_move(state, player, move)
+                if state.check_win_condition(player):
+                    if turn + 1 != self.num_turns or player_index != self.winner_seat:
+                        raise ValueError(f"Replay of game {self.game_index} diverged from the record at turn {turn}")
+                    return state
+            state.complete_hand(player)
+            state.next_player()
+        if num_turns is None:
+            raise ValueError(f"Replay of game {self.game_index} did not end in a win")
+        return state
+
+
+def _apply_object_move(state: GameState, player: 'BasePlayer', move: Optional[tuple]) -> None:
+    if move is None:
+        return
+    if move[0] == DISCARD:
+        player.discard_cards(state, list(move[1]))
+        return
+    card = player.hand[move[1]]
+    card, moves = object_play(state, player, (PLAY, card_code(card)) + move[2:], card)
+    player.play_card(state, card, moves)
+
+
+class GameRecorder:
+    """Collects the moves of a game from its event bus while it is played."""
+
+    def __init__(self, game: GameManager, base_seed: int, game_index: int):
+        self.game = game
+        self.base_seed = base_seed
+        self.game_index = game_index
+        self.moves = bytearray()
+        game.events.subscribe(EventType.MOVE, self.on_move)
+
+    def on_move(self, move: Optional[tuple]) -> None:
+        self.moves += encode_move(move)
+
+    def detach(self) -> None:
+        self.game.events.unsubscribe(EventType.MOVE, self.on_move)
+
+    def record(self, winner_seat: int) -> GameRecord:
+        return GameRecord(self.base_seed, self.game_index, self.game.engine, len(self.game.config.players),
+                          winner_seat, self.game.num_turns, bytes(self.moves))
+
+
+class GameRecordWriter:
+    """Appends records to shards ``<prefix>-<n>.vgr`` of about ``shard_size`` bytes in ``directory``.
+
+    Every shard has an index ``<prefix>-<n>.idx`` with the end offset of each record (little endian uint64), so
+    readers find any record without scanning. A new writer never touches existing shards, it starts the next one.
+    """
+
+    def __init__(self, directory: str, prefix: str = 'games', shard_size: int = DEFAULT_SHARD_SIZE):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.prefix = prefix
+        self.shard_size = shard_size
+        self.num_records = 0
+        self._shard_number = len(glob(os.path.join(escape(directory), f'{escape(prefix)}-*{DATA_SUFFIX}')))
+        self._data = None
+        self._index = None
+        self._size = 0
+
+    def write(self, record: GameRecord) -> None:
+        if self._data is None or self._size >= self.shard_size:
+            self._open_shard()
+        data = record.to_bytes()
+        self._data.write(data)
+        self._size += len(data)
+        self._index.write(RECORD_END.pack(self._size))
+        self.num_records += 1
+
+    def _open_shard(self) -> None:
+        self.close()
+        path = os.path.join(self.directory, f'{self.prefix}-{self._shard_number:05d}')
+        self._shard_number += 1
+        self._data = open(path + DATA_SUFFIX, 'wb')
+        self._index = open(path + INDEX_SUFFIX, 'wb')
+        self._data.write(MAGIC)
+        self._size = len(MAGIC)
+
+    def close(self) -> None:
+        if self._data is not None:
+            self._data.close()
+            self._index.close()
+            self._data = self._index = None
+
+    def __enter__(self) -> 'GameRecordWriter':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _map(path: str) -> mmap.mmap:
+    with open(path, 'rb') as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class GameRecordReader:
+    """Random access to every record of the shards in ``directory``.
+
+    Shards and their indexes are memory mapped, so opening a corpus reads nothing but the file sizes and a record
+    is only read when it is accessed::
+
+        with GameRecordReader('records') as records:
+            final_state = records[123].replay()
+            longest = max(records, key=lambda record: record.num_turns)
+    """
+
+    def __init__(self, directory: str):
+        self._shards: List[tuple] = []  # (data, index) memory maps
+        self._first_records = []  # number of records in the preceding shards
+        num_records = 0
+        for data_path in sorted(glob(os.path.join(escape(directory), f'*{DATA_SUFFIX}'))):
+            index_path = data_path[:-len(DATA_SUFFIX)] + INDEX_SUFFIX
+            num_shard_records = os.path.getsize(index_path) // RECORD_END.size
+            if not num_shard_records:
+                continue
+            data, index = _map(data_path), _map(index_path)
+            self._shards.append((data, index))
+            if data[:len(MAGIC)] != MAGIC:
+                self.close()
+                raise ValueError(f"{data_path} is not a game record shard")
+            self._first_records.append(num_records)
+            num_records += num_shard_records
+        self._num_records = num_records
+
+    def __len__(self) -> int:
+        return self._num_records
+
+    def __getitem__(self, i: int) -> GameRecord:
+        if i < 0:
+            i += self._num_records
+        if not 0 <= i < self._num_records:
+            raise IndexError("game record index out of range")
+        shard = bisect_right(self._first_records, i) - 1
+        data, index = self._shards[shard]
+        i -= self._first_records[shard]
+        start = RECORD_END.unpack_from(index, (i - 1) * RECORD_END.size)[0] if i else len(MAGIC)
+        end, = RECORD_END.unpack_from(index, i * RECORD_END.size)
+        return GameRecord.from_bytes(data[start:end])
+
+    def __iter__(self) -> Iterator[GameRecord]:
+        for i in range(self._num_records):
+            yield self[i]
+
+    def replay(self, i: int, num_turns: Optional[int] = None) -> Union[GameState, CompactGameState]:
+        return self[i].replay(num_turns)
+
+    def close(self) -> None:
+        for data, index in self._shards:
+            data.close()
+            index.close()
+        self._shards.clear()
+        self._first_records.clear()
+        self._num_records = 0
+
+    def __enter__(self) -> 'GameRecordReader':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
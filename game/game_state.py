@@ -1,17 +1,37 @@
 import random
+from array import array
 from collections import defaultdict
+from typing import Optional
 
 from game.game_constants import GameConstants
 from models.deck import Deck
-from enums import CardColor, TreatmentName, CardType, OrganState
+from models.undo_record import UndoRecord
+from game.state_encoder import StateEncoder
+from game.move_generator import legal_plays
+from game.zobrist import MASK, TURN_KEYS, SEAT_MULTIPLIERS
+from enums import OrganState
+from interface import events as default_events
 
 
 class GameState:
-    def __init__(self, players):
+    def __init__(self, players, rng: Optional[random.Random] = None, events: Optional['EventBus'] = None,
+                 deck: Optional[Deck] = None):
         self.players = players
         self.num_players = len(players)
-        self.deck = Deck()
-        self.current_player_index = random.randint(0, self.num_players - 1)
+        self.rng = rng if rng is not None else random.Random()
+        self.events = events if events is not None else default_events
+        # a deck reused from a finished game must have been reset with this game's rng
+        self.deck = deck if deck is not None else Deck(self.rng)
+        self.encoder = StateEncoder(self.num_players)
+        self.current_player_index = self.rng.randint(0, self.num_players - 1)
+        # (player, Action.PLAY, card, moves) for every played card, (player, Action.DISCARD, cards, None) for discards
+        self.move_history = []
+
+    def reset(self, rng: random.Random, deck: Deck) -> None:
+        """Start a new game in place with the players reset beforehand and ``deck`` shuffled by ``rng``."""
+        self.rng = rng
+        self.deck = deck
+        self.current_player_index = rng.randint(0, self.num_players - 1)
         self.move_history = []
 
     def get_current_player(self):
@@ -30,11 +50,69 @@ class GameState:
         opponents = [player for player in self.players if player != current_player]
         return opponents
 
+    def check_win_condition(self, player: 'BasePlayer') -> bool:
+        # check if player has X healthy (or vaccinated or immunised) organs, most bodies are too small to need a count
+        body = player.body
+        if len(body) < GameConstants.NUM_HEALTHY_ORGANS_TO_WIN:
+            return False
+        healthy_organs = 0
+        for organ in body:
+            if organ.state != OrganState.INFECTED:
+                healthy_organs += 1
+        return healthy_organs >= GameConstants.NUM_HEALTHY_ORGANS_TO_WIN
+
+    @property
+    def zobrist_hash(self) -> int:
+        """64 bit hash of the position: the contents of the deck, the discard pile, every hand and body (with the
+        organs' states, colors and attached cards) and the current player.
+
+        Only combines the hashes the deck, players and organs keep up to date on every change, so it costs a few
+        additions. Card order within the deck, discard pile and hands is not part of the position.
+        """
+        zobrist_hash = self.deck.zobrist_hash + TURN_KEYS[self.current_player_index]
+        for seat, player in enumerate(self.players):
+            zobrist_hash += SEAT_MULTIPLIERS[seat] * (player.hand_hash + player.body_hash)
+        return zobrist_hash & MASK
+
+    def legal_plays(self, player: 'BasePlayer' = None) -> list[tuple['Card', list['Move']]]:
+        return legal_plays(self, player)
+
+    def make_move(self, player: 'BasePlayer', card: 'Card', moves: list['Move']) -> UndoRecord:
+        """Play the card in place and return a record that lets ``unmake_move`` restore the exact prior state."""
+        record = UndoRecord(
+            num_successful_moves=0,
+            player_snapshots=[(p, p.snapshot()) for p in self.players],
+            organ_snapshots=[(organ, organ.color, organ.state, list(organ.viruses), list(organ.medicines))
+                             for p in self.players for organ in p.body],
+            discard_pile=self.deck.discard_pile,
+            discard_pile_size=len(self.deck.discard_pile),
+            move_history_size=len(self.move_history),
+        )
+        try:
+            record.num_successful_moves = player.play_card(self, card, moves)
+        except Exception:
+            self.unmake_move(record)
+            raise
+        return record
+
+    def unmake_move(self, record: UndoRecord) -> None:
+        for player, snapshot in record.player_snapshots:
+            player.restore(snapshot)
+        for organ, color, state, viruses, medicines in record.organ_snapshots:
+            organ.color = color
+            organ.state = state
+            organ.viruses[:] = viruses
+            organ.medicines[:] = medicines
+            organ.rehash()
+        self.deck.discard_pile = record.discard_pile
+        self.deck.truncate_discard_pile(record.discard_pile_size)
+        del self.move_history[record.move_history_size:]
+
     def complete_hand(self, player: 'BasePlayer') -> None:
         amount = 3 - len(player.hand)
         for _ in range(amount):
             drawn_card = self.deck.draw_card()
-            player.hand.append(drawn_card)
+            player.add_card_to_hand(drawn_card)
 
     def get_state_info(self):
         state = defaultdict()
@@ -50,40 +128,13 @@ class GameState:
         state['discard_pile'] = self.deck.discard_pile
         return state
 
-    def get_state_array_for_ai(self):
-        card_colors = list(CardColor)
-        treatments = list(TreatmentName)
-        organ_states = list(OrganState)
-        color_card_types = [CardType.ORGAN, CardType.MEDICINE, CardType.VIRUS]
-
-        BODY_INDEX = 0
-        PLAYER_INDEX = BODY_INDEX + (len(self.players) * len(OrganState) * len(CardColor))
-        COLOR_CARDS_INDEX = PLAYER_INDEX + len(self.players)
-        TREATMENTS_INDEX = COLOR_CARDS_INDEX + (len(CardColor) * len(color_card_types))
-        DECK_INDEX = TREATMENTS_INDEX + len(TreatmentName)
-        DISCARD_PILE_INDEX = DECK_INDEX + 1
-        num_inputs = DISCARD_PILE_INDEX + 1
-
-        state_array = [0.] * num_inputs
-        for player_id, player in enumerate(self.players):
-            for organ in player.body:
-                state_array[BODY_INDEX + (player_id * len(OrganState) * len(CardColor)) + (organ_states.index(organ.state) * len(CardColor)) + card_colors.index(organ.color)] = 1.
-
-        current_player = self.get_current_player()
-        current_player_id = self.get_player_index(current_player)
-        state_array[PLAYER_INDEX + current_player_id] = 1.
-
-        for card in current_player.hand:
-            if card.name in treatments:
-                state_array[TREATMENTS_INDEX + treatments.index(card.name)] = 1.
-            elif card.type in color_card_types:
-                state_array[COLOR_CARDS_INDEX + (color_card_types.index(card.type) * len(CardColor)) + card_colors.index(card.color)] = 1.
-            else:
-                raise ValueError
-
-        state_array[DECK_INDEX] = len(self.deck.cards) / GameConstants.NUM_TOTAL_CARDS
-        state_array[DISCARD_PILE_INDEX] = len(self.deck.discard_pile) / GameConstants.NUM_TOTAL_CARDS
-        return state_array
+    def get_state_array_for_ai(self) -> array:
+        """Observation of the current player, a copy that stays valid after the state changes."""
+        return array('f', self.encoder.encode(self))
+
+    def get_state_array_view(self) -> array:
+        """Observation of the current player without a copy: the buffer of the encoder, overwritten by later calls."""
+        return self.encoder.encode(self)
 
     def add_card_to_discard_pile(self, card):
         self.deck.discard(card)
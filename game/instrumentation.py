@@ -0,0 +1,105 @@
+import functools
+import inspect
+import time
+from typing import Dict, Iterator, List, Tuple
+
+from game.game_manager import GameManager
+from game.game_state import GameState
+from game.state_encoder import StateEncoder
+from models.cards import Card
+from players import BasePlayer
+
+
+def _subclasses(cls: type) -> Iterator[type]:
+    for subclass in cls.__subclasses__():
+        yield subclass
+        yield from _subclasses(subclass)
+
+
+def instrumented_methods() -> List[Tuple[type, str]]:
+    """The hot paths: the turn loop, hand completion, the observation encoder, every player's ``take_turn``,
+    ``decide_*`` methods and network activation, and ``play`` of every card type."""
+    methods = [(GameManager, 'play_turn'), (GameManager, 'play_compact_turn'), (GameState, 'complete_hand'),
+               (StateEncoder, 'encode')]
+    for cls in (BasePlayer, *_subclasses(BasePlayer)):
+        methods += [(cls, name) for name in cls.__dict__
+                    if name in ('take_turn', 'activate') or name.startswith('decide_')]
+    methods += [(cls, 'play') for cls in _subclasses(Card) if 'play' in cls.__dict__]
+    return [(cls, name) for cls, name in methods
+            if inspect.isfunction(cls.__dict__[name]) and not getattr(cls.__dict__[name], '__isabstractmethod__', False)]
+
+
+class Instrumentation:
+    """Cumulative wall time and call counts of the hot paths of the object engine and the players.
+
+    ``enable`` replaces the methods of ``instrumented_methods`` with timed wrappers on their classes and
+    ``disable`` puts the original functions back, so code runs untouched unless instrumentation is on. Times are
+    inclusive (``GameManager.play_turn`` contains the ``take_turn`` of the player). Only the current process is
+    measured, so batches have to be played with a single worker::
+
+        with Instrumentation() as instrumentation:
+            run_batch(seating, 1000, num_workers=1)
+        print(instrumentation.report())
+    """
+
+    num_enabled = 0  # instrumentations enabled in this process, headless batches play the timed turn loop then
+
+    def __init__(self):
+        self.timers: Dict[str, List] = {}  # "Class.method" -> [calls, seconds]
+        self.elapsed = 0.
+        self._patches = []
+        self._start = None
+
+    def enable(self) -> None:
+        if self._patches:
+            return
+        for cls, name in instrumented_methods():
+            function = cls.__dict__[name]
+            setattr(cls, name, self._timed(f"{cls.__name__}.{name}", function))
+            self._patches.append((cls, name, function))
+        Instrumentation.num_enabled += 1
+        self._start = time.perf_counter()
+
+    def disable(self) -> None:
+        if not self._patches:
+            return
+        for cls, name, function in reversed(self._patches):
+            setattr(cls, name, function)
+        self._patches.clear()
+        Instrumentation.num_enabled -= 1
+        self.elapsed += time.perf_counter() - self._start
+
+    def __enter__(self) -> 'Instrumentation':
+        self.enable()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.disable()
+
+    def _timed(self, key: str, function):
+        timer = self.timers.setdefault(key, [0, 0.])
+        perf_counter = time.perf_counter
+
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                timer[0] += 1
+                timer[1] += perf_counter() - start
+        return timed
+
+    def as_dict(self) -> Dict[str, Dict[str, float]]:
+        """``{"Class.method": {"calls": ..., "seconds": ...}}`` of every method called at least once."""
+        return {key: {'calls': calls, 'seconds': seconds} for key, (calls, seconds) in self.timers.items() if calls}
+
+    def report(self) -> str:
+        elapsed = self.elapsed + (time.perf_counter() - self._start if self._patches else 0.)
+        lines = [f"{'method':<52} {'calls':>10} {'total s':>10} {'mean us':>10} {'% of run':>9}"]
+        for key, timer in sorted(self.as_dict().items(), key=lambda item: item[1]['seconds'], reverse=True):
+            calls, seconds = timer['calls'], timer['seconds']
+            share = seconds / elapsed if elapsed else 0.
+            lines.append(f"{key:<52} {calls:>10} {seconds:>10.3f} {seconds / calls * 1e6:>10.1f} {share:>9.1%}")
+        lines.append(f"instrumented run: {elapsed:.3f} s")
+        return '\n'.join(lines)
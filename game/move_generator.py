@@ -0,0 +1,77 @@
+from typing import List, Tuple
+
+from enums import CardColor, CardType, OrganState, TreatmentName
+from game.compact_game_state import color_matches
+from models.move import Move
+
+COLOR_INDEX = {color: i for i, color in enumerate(CardColor)}
+
+
+def legal_plays(game_state: 'GameState', player: 'BasePlayer' = None) -> List[Tuple['Card', List[Move]]]:
+    """Enumerate every legal ``(card, moves)`` play of ``player`` (the current player by default).
+
+    Each pair can be passed to ``BasePlayer.play_card``/``GameState.make_move`` as is and every one of its moves
+    succeeds. The bodies are scanned once up front into lists of non immunised organs and the cards of the hand
+    only do bit tests against them and the players' ``organ_color_mask``. As in ``CompactGameState.legal_plays``:
+
+    * a wild organ cannot take the color of a virus/medicine already present in its body,
+    * an organ, a transplant or an organ thief never leaves two organs of the same color, nor of the same original
+      color, in a body,
+    * a medical error swaps with an opponent only if one of the two bodies holds an organ,
+    * a contagion moves one virus per play (a single move).
+    """
+    player = game_state.get_current_player() if player is None else player
+    opponents = [opponent for opponent in game_state.players if opponent is not player]
+    own_mask = player.organ_color_mask
+    own_slots = {organ.original_color for organ in player.body}
+    opponent_masks = {opponent: opponent.organ_color_mask for opponent in opponents}
+    own_organs = [(organ, COLOR_INDEX[organ.color]) for organ in player.body if organ.state < OrganState.IMMUNISED]
+    # (opponent, organ, color index) of every opponent organ that is not immunised
+    targets = [(opponent, organ, COLOR_INDEX[organ.color])
+               for opponent in opponents
+               for organ in opponent.body
+               if organ.state < OrganState.IMMUNISED]
+    plays = []
+
+    for card in player.hand:
+        if card.type == CardType.ORGAN:
+            if not own_mask >> COLOR_INDEX[card.color] & 1 and card.original_color not in own_slots:
+                plays.append((card, [Move()]))
+        elif card.type == CardType.MEDICINE:
+            color = COLOR_INDEX[card.color]
+            plays += [(card, [Move(player_organ=organ)])
+                      for organ, organ_color in own_organs
+                      if color_matches(color, organ_color, own_mask)]
+        elif card.type == CardType.VIRUS:
+            color = COLOR_INDEX[card.color]
+            plays += [(card, [Move(opponent=opponent, opponent_organ=organ)])
+                      for opponent, organ, organ_color in targets
+                      if color_matches(color, organ_color, opponent_masks[opponent])]
+        elif card.name == TreatmentName.ORGAN_THIEF:
+            plays += [(card, [Move(opponent=opponent, opponent_organ=organ)])
+                      for opponent, organ, organ_color in targets
+                      if not own_mask >> organ_color & 1 and organ.original_color not in own_slots]
+        elif card.name == TreatmentName.TRANSPLANT:
+            # after the swap neither body may hold two organs of the same color
+            plays += [(card, [Move(opponent=opponent, player_organ=own_organ, opponent_organ=organ)])
+                      for opponent, organ, organ_color in targets
+                      for own_organ, own_color in own_organs
+                      if not (own_mask & ~(1 << own_color)) >> organ_color & 1
+                      and not (opponent_masks[opponent] & ~(1 << organ_color)) >> own_color & 1
+                      and (organ.original_color == own_organ.original_color
+                           or organ.original_color not in own_slots
+                           and not any(opponent_organ.original_color == own_organ.original_color
+                                       for opponent_organ in opponent.body))]
+        elif card.name == TreatmentName.CONTAGION:
+            for infected_organ in player.body:
+                if infected_organ.state == OrganState.INFECTED:
+                    virus_color = COLOR_INDEX[infected_organ.viruses[0].color]
+                    plays += [(card, [Move(opponent=opponent, player_organ=infected_organ, opponent_organ=organ)])
+                              for opponent, organ, organ_color in targets
+                              if color_matches(virus_color, organ_color, opponent_masks[opponent])]
+        elif card.name == TreatmentName.MEDICAL_ERROR:
+            plays += [(card, [Move(opponent=opponent)])
+                      for opponent in opponents if own_mask or opponent_masks[opponent]]
+        elif card.name == TreatmentName.LATEX_GLOVE:
+            plays.append((card, [Move()]))
+    return plays
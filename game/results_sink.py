@@ -0,0 +1,177 @@
+import os
+from glob import escape, glob
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from enums import Action, CardType, EngineType, EventType, PlayerType, TreatmentName
+from game.compact_game_state import FACE_KIND, NUM_FACES, PLAY, TREATMENT, TREATMENT_BASE, card_code
+from game.game_constants import GameConstants
+
+PLAYER_TYPES = list(PlayerType)
+EMPTY_SEAT = 0xFF
+# columns of cards_played, a face code's column is PLAYED_CARD_COLUMN[code]
+PLAYED_CARD_KINDS = [CardType.ORGAN, CardType.VIRUS, CardType.MEDICINE, *TreatmentName]
+PLAYED_CARD_COLUMN = bytes(FACE_KIND[code] if code < TREATMENT_BASE else TREATMENT + code - TREATMENT_BASE
+                           for code in range(NUM_FACES))
+
+# name -> (dtype, shape of a row)
+COLUMNS = {
+    'base_seed': (np.int64, ()),
+    'game_index': (np.int64, ()),
+    'seating': (np.uint8, (GameConstants.MAX_PLAYERS,)),  # PLAYER_TYPES index of each seat, then EMPTY_SEAT
+    'winner_seat': (np.int8, ()),  # -1 when the game failed
+    'num_turns': (np.uint32, ()),
+    'cards_played': (np.uint16, (len(PLAYED_CARD_KINDS),)),  # successful plays by PLAYED_CARD_KINDS
+    'failed_moves': (np.uint32, ()),  # moves of played cards that were rejected by the rules
+    'duration': (np.float32, ()),  # seconds
+}
+COLUMN_SUFFIX = '.npy'
+PARTIAL_SUFFIX = '.partial'
+DEFAULT_CHUNK_ROWS = 1 << 16
+
+
+class PlayedCardCounter:
+    """Cards played and failed moves of one game.
+
+    The object engine keeps both in its histories, the compact engine has no history, so its plays are counted from
+    the ``MOVE`` events of the game.
+    """
+
+    def __init__(self, game: 'GameManager'):
+        self.game = game
+        self._cards_played = [0] * len(PLAYED_CARD_KINDS)
+        self._subscribed = game.engine == EngineType.COMPACT
+        if self._subscribed:
+            game.events.subscribe(EventType.MOVE, self.on_compact_move)
+
+    def on_compact_move(self, move: tuple) -> None:
+        if move[0] == PLAY:
+            state = self.game.state
+            self._cards_played[PLAYED_CARD_COLUMN[state.hands[state.current_player_index][move[1]]]] += 1
+
+    def detach(self) -> None:
+        if self._subscribed:
+            self.game.events.unsubscribe(EventType.MOVE, self.on_compact_move)
+            self._subscribed = False
+
+    def cards_played(self) -> List[int]:
+        if self.game.engine == EngineType.COMPACT:
+            return self._cards_played
+        cards_played = [0] * len(PLAYED_CARD_KINDS)
+        for _, action, card, _ in self.game.state.move_history:
+            if action == Action.PLAY:
+                cards_played[PLAYED_CARD_COLUMN[card_code(card)]] += 1
+        return cards_played
+
+    def failed_moves(self) -> int:
+        if self.game.engine == EngineType.COMPACT:
+            return 0
+        return sum(player.num_failed_moves for player in self.game.config.players)
+
+
+class ResultsSink:
+    """Buffers one row per game and writes the rows in chunks of ``chunk_rows`` to ``directory``.
+
+    A chunk is a directory ``<prefix>-<n>`` with one ``.npy`` file per column of ``COLUMNS``. It is written under a
+    temporary name and renamed when complete, so readers never see partial chunks. Call ``close`` (or use the sink
+    as a context manager) to write the last, partially filled chunk.
+    """
+
+    def __init__(self, directory: str, prefix: str = 'results', chunk_rows: int = DEFAULT_CHUNK_ROWS):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.prefix = prefix
+        self.chunk_rows = chunk_rows
+        self.num_rows = 0
+        self._chunk_number = len(glob(os.path.join(escape(directory), f'{escape(prefix)}-*')))
+        self._buffers = {name: np.zeros((chunk_rows, *shape), dtype) for name, (dtype, shape) in COLUMNS.items()}
+        self._num_buffered = 0
+
+    def add(self, base_seed: int, game_index: int, seating: Sequence[PlayerType], winner_seat: Optional[int],
+            num_turns: int, cards_played: Sequence[int], failed_moves: int, duration: float) -> None:
+        buffers = self._buffers
+        i = self._num_buffered
+        buffers['base_seed'][i] = base_seed
+        buffers['game_index'][i] = game_index
+        seats = buffers['seating'][i]
+        seats[:] = EMPTY_SEAT
+        seats[:len(seating)] = [PLAYER_TYPES.index(player_type) for player_type in seating]
+        buffers['winner_seat'][i] = -1 if winner_seat is None else winner_seat
+        buffers['num_turns'][i] = num_turns
+        buffers['cards_played'][i] = cards_played
+        buffers['failed_moves'][i] = failed_moves
+        buffers['duration'][i] = duration
+        self._num_buffered += 1
+        self.num_rows += 1
+        if self._num_buffered == self.chunk_rows:
+            self.flush()
+
+    def add_game(self, game: 'GameManager', counter: PlayedCardCounter, base_seed: int, game_index: int,
+                 seating: Sequence[PlayerType], winner_seat: Optional[int], duration: float) -> None:
+        self.add(base_seed, game_index, seating, winner_seat, game.num_turns, counter.cards_played(),
+                 counter.failed_moves(), duration)
+
+    def flush(self) -> None:
+        if not self._num_buffered:
+            return
+        path = os.path.join(self.directory, f'{self.prefix}-{self._chunk_number:05d}')
+        self._chunk_number += 1
+        os.makedirs(path + PARTIAL_SUFFIX)
+        for name, buffer in self._buffers.items():
+            np.save(os.path.join(path + PARTIAL_SUFFIX, name + COLUMN_SUFFIX), buffer[:self._num_buffered])
+        os.rename(path + PARTIAL_SUFFIX, path)
+        self._num_buffered = 0
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self) -> 'ResultsSink':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class ResultsTable:
+    """The chunks written to ``directory`` by result sinks, read lazily.
+
+    Columns are memory mapped one chunk at a time, so aggregations over any number of rows stay within the memory
+    of a chunk::
+
+        table = ResultsTable('results')
+        mean_turns = sum(int(chunk['num_turns'].sum()) for chunk in table.chunks(['num_turns'])) / len(table)
+    """
+
+    def __init__(self, directory: str):
+        self.paths = sorted(path for path in glob(os.path.join(escape(directory), '*'))
+                            if os.path.isdir(path) and not path.endswith(PARTIAL_SUFFIX))
+        # the row count is in the header of a column file, mapping it reads nothing else
+        self.chunk_lengths = [len(self._load(path, 'winner_seat')) for path in self.paths]
+
+    @staticmethod
+    def _load(path: str, name: str) -> np.ndarray:
+        return np.load(os.path.join(path, name + COLUMN_SUFFIX), mmap_mode='r')
+
+    def __len__(self) -> int:
+        return sum(self.chunk_lengths)
+
+    def chunks(self, columns: Optional[Sequence[str]] = None) -> Iterator[Dict[str, np.ndarray]]:
+        """Memory-mapped ``columns`` (all by default) of one chunk after the other."""
+        for path in self.paths:
+            yield {name: self._load(path, name) for name in (columns or COLUMNS)}
+
+    def column(self, name: str) -> np.ndarray:
+        """A whole column read into memory."""
+        dtype, shape = COLUMNS[name]
+        if not self.paths:
+            return np.zeros((0, *shape), dtype)
+        return np.concatenate([chunk[name] for chunk in self.chunks([name])])
+
+    def win_counts(self) -> np.ndarray:
+        """Wins of every seat over all rows, failed games excluded."""
+        wins = np.zeros(GameConstants.MAX_PLAYERS, np.int64)
+        for chunk in self.chunks(['winner_seat']):
+            winner_seats = chunk['winner_seat']
+            wins += np.bincount(winner_seats[winner_seats >= 0], minlength=GameConstants.MAX_PLAYERS)
+        return wins
@@ -0,0 +1,95 @@
+from array import array
+
+from enums import CardColor, TreatmentName, CardType, OrganState
+from game.game_constants import GameConstants
+
+COLOR_OFFSETS = {color: i for i, color in enumerate(CardColor)}
+ORGAN_STATE_OFFSETS = {state: i * len(CardColor) for i, state in enumerate(OrganState)}
+COLOR_CARD_TYPE_OFFSETS = {card_type: i * len(CardColor)
+                           for i, card_type in enumerate([CardType.ORGAN, CardType.MEDICINE, CardType.VIRUS])}
+TREATMENT_OFFSETS = {treatment: i for i, treatment in enumerate(TreatmentName)}
+
+
+class StateEncoder:
+    """Encodes the observation of ``GameState.get_state_array_for_ai`` into a preallocated float32 buffer.
+
+    The body and hand sections are only rewritten when the ``body_version``/``hand_version`` of their player changed
+    since the previous call, so asking for the vector again within a turn costs a few comparisons. The same buffer
+    is returned on every call (``GameState.get_state_array_view``); ``GameState.get_state_array_for_ai`` copies it. ``version`` is bumped whenever
+    the content of the buffer changes, so it can key caches of anything computed from the observation.
+    """
+
+    def __init__(self, num_players: int):
+        self.num_players = num_players
+        self.body_size = len(OrganState) * len(CardColor)
+
+        self.body_index = 0
+        self.player_index = self.body_index + (num_players * self.body_size)
+        self.color_cards_index = self.player_index + num_players
+        self.treatments_index = self.color_cards_index + (len(CardColor) * len(COLOR_CARD_TYPE_OFFSETS))
+        self.deck_index = self.treatments_index + len(TreatmentName)
+        self.discard_pile_index = self.deck_index + 1
+        self.num_inputs = self.discard_pile_index + 1
+
+        self.buffer = array('f', bytes(4 * self.num_inputs))
+        self.version = 0
+        self._body_versions = [None] * num_players
+        self._current_player_index = None
+        self._hand_key = None
+        self._deck_size = None
+
+    def encode(self, game_state: 'GameState') -> array:
+        buffer = self.buffer
+        body_versions = self._body_versions
+        changed = False
+        for player_id, player in enumerate(game_state.players):
+            if body_versions[player_id] != player.body_version:
+                self._encode_body(player_id, player)
+                body_versions[player_id] = player.body_version
+                changed = True
+
+        current_player_id = game_state.current_player_index
+        if current_player_id != self._current_player_index:
+            if self._current_player_index is not None:
+                buffer[self.player_index + self._current_player_index] = 0.
+            buffer[self.player_index + current_player_id] = 1.
+            self._current_player_index = current_player_id
+            changed = True
+
+        current_player = game_state.players[current_player_id]
+        hand_key = (current_player_id, current_player.hand_version)
+        if hand_key != self._hand_key:
+            self._encode_hand(current_player)
+            self._hand_key = hand_key
+            changed = True
+
+        deck_size = (len(game_state.deck.cards), len(game_state.deck.discard_pile))
+        if deck_size != self._deck_size:
+            buffer[self.deck_index] = deck_size[0] / GameConstants.NUM_TOTAL_CARDS
+            buffer[self.discard_pile_index] = deck_size[1] / GameConstants.NUM_TOTAL_CARDS
+            self._deck_size = deck_size
+            changed = True
+
+        if changed:
+            self.version += 1
+        return buffer
+
+    def _encode_body(self, player_id: int, player: 'BasePlayer') -> None:
+        start = self.body_index + player_id * self.body_size
+        buffer = self.buffer
+        for i in range(start, start + self.body_size):
+            buffer[i] = 0.
+        for organ in player.body:
+            buffer[start + ORGAN_STATE_OFFSETS[organ.state] + COLOR_OFFSETS[organ.color]] = 1.
+
+    def _encode_hand(self, player: 'BasePlayer') -> None:
+        buffer = self.buffer
+        for i in range(self.color_cards_index, self.deck_index):
+            buffer[i] = 0.
+        for card in player.hand:
+            if card.name in TREATMENT_OFFSETS:
+                buffer[self.treatments_index + TREATMENT_OFFSETS[card.name]] = 1.
+            elif card.type in COLOR_CARD_TYPE_OFFSETS:
+                buffer[self.color_cards_index + COLOR_CARD_TYPE_OFFSETS[card.type] + COLOR_OFFSETS[card.color]] = 1.
+            else:
+                raise ValueError
@@ -0,0 +1,300 @@
+"""Tournaments between player configurations.
+
+    python -m game.tournament Random RuleBasedAI StrategyBasedAI --table-size 2 --matches 500
+
+Tables of ``table_size`` entrants are scheduled round-robin (every combination of entrants, round after round) or at
+random. A match plays a table once per seat rotation, all rotations with the same deck and starting seat
+(``game_rng(base_seed, i)``), so luck of the deal cancels out between the entrants of the table. Matches run on a pool
+of worker processes and the Elo ratings and head-to-head statistics are updated as they finish.
+
+Every pair of entrants has sequential probability ratio tests on who of the two wins the games where one of them
+wins: one of them is stronger, or there is no significant difference. Once the pair is decided it needs no more
+games: tables whose pairs are all decided are no longer scheduled and the tournament ends when every pair is decided
+or ``max_matches`` matches have been played.
+"""
+import argparse
+import math
+import os
+import random
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import combinations, count
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from enums import EngineType, PlayerType, TableMode
+from game.game_manager import GameManager, TurnLimitError, game_rng
+from models.deck import DeckPool
+from players import PlayerFactory
+
+
+class Entrant:
+    """A player configuration: a player type and the keyword arguments of its constructor."""
+
+    def __init__(self, name: str, player_type: PlayerType, **player_kwargs):
+        self.name = name
+        self.player_type = player_type
+        self.player_kwargs = player_kwargs
+
+    def __repr__(self) -> str:
+        return f"Entrant({self.name!r}, {self.player_type})"
+
+
+class EloRatings:
+    """Multiplayer Elo: a game counts as a win of the winner over every other player and a draw between the losers,
+    each of these pairwise results weighted by ``1 / (players - 1)``."""
+
+    def __init__(self, num_entrants: int, k: float = 16., initial: float = 1500.):
+        self.k = k
+        self.ratings = [initial] * num_entrants
+
+    def expected_score(self, a: int, b: int) -> float:
+        return 1 / (1 + 10 ** ((self.ratings[b] - self.ratings[a]) / 400))
+
+    def update(self, seated: Sequence[int], winner: int) -> None:
+        k = self.k / (len(seated) - 1)
+        changes = [0.] * len(seated)
+        for i, j in combinations(range(len(seated)), 2):
+            a, b = seated[i], seated[j]
+            score = 1. if a == winner else 0. if b == winner else .5
+            change = k * (score - self.expected_score(a, b))
+            changes[i] += change
+            changes[j] -= change
+        for entrant, change in zip(seated, changes):
+            self.ratings[entrant] += change
+
+
+class SPRT:
+    """Wald's sequential probability ratio test of the success probability ``p`` of Bernoulli trials,
+    ``H0: p = p0`` against ``H1: p = p1``, with error rates ``alpha`` (accepting H1 when H0 holds) and ``beta``."""
+
+    def __init__(self, p0: float, p1: float, alpha: float = 0.05, beta: float = 0.05):
+        self.success_llr = math.log(p1 / p0)
+        self.failure_llr = math.log((1 - p1) / (1 - p0))
+        self.lower = math.log(beta / (1 - alpha))
+        self.upper = math.log((1 - beta) / alpha)
+        self.llr = 0.
+        self.decision: Optional[bool] = None  # True when H1 is accepted, False when H0 is
+
+    def update(self, success: bool) -> Optional[bool]:
+        if self.decision is None:
+            self.llr += self.success_llr if success else self.failure_llr
+            if self.llr >= self.upper:
+                self.decision = True
+            elif self.llr <= self.lower:
+                self.decision = False
+        return self.decision
+
+
+class Pairing:
+    """Head-to-head record of entrants ``a`` and ``b`` over the games that one of them won.
+
+    Two SPRTs run on the probability ``p`` that ``a`` wins such a game, both with ``H0: p = 0.5`` (the entrants are
+    equally strong), one against ``H1: p = 0.5 + delta`` and one against ``H1: p = 0.5 - delta``. The pair is decided
+    when one of them accepts its H1, that entrant is ``stronger``, or when both accept H0: no significant difference.
+    """
+
+    def __init__(self, a: int, b: int, delta: float = 0.1, alpha: float = 0.05, beta: float = 0.05):
+        self.a = a
+        self.b = b
+        self.wins = [0, 0]
+        self.sprts = (SPRT(0.5, 0.5 + delta, alpha, beta), SPRT(0.5, 0.5 - delta, alpha, beta))
+        self.decided_after: Optional[int] = None  # games between the two when the pair was decided
+
+    @property
+    def stronger(self) -> Optional[int]:
+        a_stronger, b_stronger = (sprt.decision for sprt in self.sprts)
+        return self.a if a_stronger else self.b if b_stronger else None
+
+    @property
+    def decided(self) -> bool:
+        return self.stronger is not None or all(sprt.decision is False for sprt in self.sprts)
+
+    def add_win(self, winner: int) -> None:
+        self.wins[winner != self.a] += 1
+        if not self.decided:
+            for sprt in self.sprts:
+                sprt.update(winner == self.a)
+            if self.decided:
+                self.decided_after = sum(self.wins)
+
+
+def play_match(entrants: List[Entrant], base_seed: int, game_index: int,
+               engine: EngineType = EngineType.OBJECT) -> List[Optional[int]]:
+    """Play one game per seat rotation of the table, all with the random stream ``game_rng(base_seed, game_index)``.
+
+    Returns the position in ``entrants`` of the winner of each game, None for games hitting the turn limit.
+    """
+    winners = []
+    deck_pool = DeckPool()
+    for shift in range(len(entrants)):
+        seated = entrants[shift:] + entrants[:shift]
+        player_factory = PlayerFactory()
+        for seat, entrant in enumerate(seated):
+            player_factory.add_player(entrant.player_type, f"{entrant.name}#{seat + 1}", **entrant.player_kwargs)
+        game = GameManager(player_factory, engine=engine, rng=game_rng(base_seed, game_index), deck_pool=deck_pool)
+        try:
+            winner = game.run()
+        except TurnLimitError:
+            winners.append(None)
+            continue
+        finally:
+            game.release()
+        winners.append((player_factory.players.index(winner) + shift) % len(entrants))
+    return winners
+
+
+class Tournament:
+    def __init__(self, entrants: List[Entrant], table_size: int = 2, mode: TableMode = TableMode.ROUND_ROBIN,
+                 max_matches: int = 1000, num_workers: Optional[int] = None, base_seed: int = 0,
+                 engine: EngineType = EngineType.OBJECT, elo_k: float = 16., sprt_delta: float = 0.1,
+                 sprt_alpha: float = 0.05, sprt_beta: float = 0.05):
+        if not 2 <= table_size <= len(entrants):
+            raise ValueError(f"Table size must be between 2 and the number of entrants ({len(entrants)})")
+        self.entrants = entrants
+        self.table_size = table_size
+        self.mode = mode
+        self.max_matches = max_matches
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.base_seed = base_seed
+        self.engine = engine
+        self.rng = random.Random(f"{base_seed}:tables")
+        self.elo = EloRatings(len(entrants), elo_k)
+        self.pairings = {(a, b): Pairing(a, b, sprt_delta, sprt_alpha, sprt_beta)
+                         for a, b in combinations(range(len(entrants)), 2)}
+        self.games = [0] * len(entrants)
+        self.wins = [0] * len(entrants)
+        self.num_matches = 0
+        self.num_errors = 0
+
+    def _pairs(self, table: Sequence[int]) -> Iterator[Pairing]:
+        for a, b in combinations(sorted(table), 2):
+            yield self.pairings[a, b]
+
+    def _undecided(self, table: Sequence[int]) -> bool:
+        return any(not pairing.decided for pairing in self._pairs(table))
+
+    def _scheduled_tables(self) -> Iterator[Tuple[Tuple[int, ...], int]]:
+        """``(table, game index)`` of the matches to play, as long as some pair of the table is undecided.
+
+        Round-robin tables of one round share the game index, so every table of the round plays the same deck.
+        """
+        if self.mode == TableMode.ROUND_ROBIN:
+            tables = list(combinations(range(len(self.entrants)), self.table_size))
+            for round_index in count():
+                tables = [table for table in tables if self._undecided(table)]
+                if not tables:
+                    return
+                for table in tables:
+                    if self._undecided(table):
+                        yield table, round_index
+        elif self.mode == TableMode.RANDOM:
+            for match_index in count():
+                undecided = [pairing for pairing in self.pairings.values() if not pairing.decided]
+                if not undecided:
+                    return
+                pairing = self.rng.choice(undecided)
+                others = [i for i in range(len(self.entrants)) if i not in (pairing.a, pairing.b)]
+                table = [pairing.a, pairing.b] + self.rng.sample(others, self.table_size - 2)
+                self.rng.shuffle(table)
+                yield tuple(table), match_index
+        else:
+            raise ValueError(f"Unknown table mode: {self.mode}")
+
+    def add_match(self, table: Sequence[int], winners: List[Optional[int]]) -> None:
+        self.num_matches += 1
+        for winner_position in winners:
+            if winner_position is None:
+                self.num_errors += 1
+                continue
+            winner = table[winner_position]
+            for entrant in table:
+                self.games[entrant] += 1
+            self.wins[winner] += 1
+            self.elo.update(table, winner)
+            for pairing in self._pairs(table):
+                if winner in (pairing.a, pairing.b):
+                    pairing.add_win(winner)
+
+    def _match_args(self, table: Tuple[int, ...], game_index: int) -> tuple:
+        return [self.entrants[i] for i in table], self.base_seed, game_index, self.engine
+
+    def run(self) -> 'Tournament':
+        matches = self._scheduled_tables()
+        if self.num_workers == 1:
+            for table, game_index in matches:
+                if self.num_matches >= self.max_matches:
+                    break
+                self.add_match(table, play_match(*self._match_args(table, game_index)))
+            return self
+
+        with ProcessPoolExecutor(max_workers=self.num_workers) as executor:
+            pending = {}
+            num_submitted = 0
+            while True:
+                # keep every worker busy with a match queued behind it
+                while len(pending) < 2 * self.num_workers and num_submitted < self.max_matches:
+                    match = next(matches, None)
+                    if match is None:
+                        break
+                    table, game_index = match
+                    pending[executor.submit(play_match, *self._match_args(table, game_index))] = table
+                    num_submitted += 1
+                if not pending:
+                    return self
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self.add_match(pending.pop(future), future.result())
+
+    def standings(self) -> List[Tuple[str, float, int, int]]:
+        """``(name, Elo rating, games, wins)`` of every entrant, best rated first."""
+        rows = [(entrant.name, self.elo.ratings[i], self.games[i], self.wins[i])
+                for i, entrant in enumerate(self.entrants)]
+        return sorted(rows, key=lambda row: row[1], reverse=True)
+
+    def report(self) -> str:
+        lines = [f"{'entrant':<24} {'elo':>7} {'games':>7} {'wins':>7} {'win rate':>9}"]
+        for name, rating, games, wins in self.standings():
+            lines.append(f"{name:<24} {rating:>7.0f} {games:>7} {wins:>7} {wins / games if games else 0.:>9.1%}")
+        lines.append(f"{self.num_matches} matches, {sum(self.wins)} games, {self.num_errors} failed")
+        for pairing in self.pairings.values():
+            a, b = self.entrants[pairing.a].name, self.entrants[pairing.b].name
+            if not pairing.decided:
+                verdict = "undecided"
+            elif pairing.stronger is None:
+                verdict = f"no significant difference after {pairing.decided_after} games"
+            else:
+                verdict = f"{self.entrants[pairing.stronger].name} stronger after {pairing.decided_after} games"
+            lines.append(f"{a} vs {b}: {pairing.wins[0]}-{pairing.wins[1]}, {verdict}")
+        return '\n'.join(lines)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Rate player types against each other in a tournament.")
+    parser.add_argument('players', nargs='+', type=PlayerType, help=f"entrants ({', '.join(PlayerType)})")
+    parser.add_argument('-t', '--table-size', type=int, default=2, help="players per table")
+    parser.add_argument('-m', '--mode', type=TableMode, default=TableMode.ROUND_ROBIN, choices=list(TableMode))
+    parser.add_argument('-n', '--matches', type=int, default=1000,
+                        help="maximum number of matches (one game per seat rotation each)")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="number of worker processes (default: all cores)")
+    parser.add_argument('-s', '--seed', type=int, default=0, help="base seed of the decks and the random tables")
+    parser.add_argument('--delta', type=float, default=0.1,
+                        help="the SPRTs test a head-to-head win probability of 0.5 against 0.5 + delta and 0.5 - delta")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    names: Dict[str, int] = {}
+    entrants = []
+    for player_type in args.players:
+        # numbered when a type enters more than once
+        names[player_type] = names.get(player_type, 0) + 1
+        suffix = names[player_type] if args.players.count(player_type) > 1 else ''
+        entrants.append(Entrant(f"{player_type}{suffix}", player_type))
+    tournament = Tournament(entrants, args.table_size, args.mode, args.matches, args.workers, args.seed,
+                            sprt_delta=args.delta).run()
+    print(tournament.report())
+
+
+if __name__ == '__main__':
+    main()
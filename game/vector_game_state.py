@@ -0,0 +1,554 @@
+import argparse
+import random
+import time
+from typing import List, Optional, Sequence, Union
+
+import numpy as np
+
+from game.compact_game_state import (CONTAGION, DECK_CODES, DISCARD, EMPTY, FACE_COLOR, FACE_KIND, HEALTHY, IMMUNISED,
+                                     INFECTED, LATEX_GLOVE, MEDICAL_ERROR, MEDICINE, NUM_COLORS, ORGAN, ORGAN_THIEF,
+                                     PLAY, TRANSPLANT, VACCINATED, VIRUS, WILD, CompactGameState, color_matches)
+from game.game_constants import GameConstants
+
+HAND_SIZE = GameConstants.HAND_SIZE
+DECK_SIZE = len(DECK_CODES)
+NO_MOVE = -1  # last_actions of a game whose player had no cards
+
+# face code -> kind/color, the EMPTY code maps to a kind no card has
+KINDS = np.full(256, 0xFF, np.uint8)
+KINDS[:len(FACE_KIND)] = list(FACE_KIND)
+CARD_COLORS = np.full(256, WILD, np.uint8)
+CARD_COLORS[:len(FACE_COLOR)] = list(FACE_COLOR)
+DECK = np.frombuffer(DECK_CODES, np.uint8)
+
+
+# COLOR_MATCHES[card color, organ color, body mask] is compact_game_state.color_matches
+COLOR_MATCHES = np.array([[[color_matches(card_color, organ_color, body_mask) for body_mask in range(1 << NUM_COLORS)]
+                           for organ_color in range(NUM_COLORS)] for card_color in range(NUM_COLORS)])
+
+
+def _color_matches(card_color: np.ndarray, organ_color: np.ndarray, body_mask: np.ndarray) -> np.ndarray:
+    # vectorized color_matches, broadcasting its arguments
+    index = (card_color * NUM_COLORS + organ_color).astype(np.uint16) << NUM_COLORS | body_mask
+    return COLOR_MATCHES.ravel()[index]
+
+
+def num_actions(num_players: int) -> int:
+    """Size of the action space of ``num_players`` players: the play indices followed by the discard masks."""
+    return HAND_SIZE * num_players * NUM_COLORS * NUM_COLORS + (1 << HAND_SIZE)
+
+
+def action_index(move: tuple, hand: bytes, num_players: int) -> int:
+    """Action of a ``CompactGameState`` move of a player holding ``hand``, the inverse of
+    ``VectorGameState.move_tuple``. A contagion spreading several viruses maps to the action of its first transfer."""
+    num_play_actions = num_actions(num_players) - (1 << HAND_SIZE)
+    if move[0] == DISCARD:
+        return num_play_actions + sum(1 << hand_index for hand_index in move[1])
+    hand_index, args = move[1], move[2:]
+    code = hand[hand_index]
+    target = x = y = 0
+    if code == CONTAGION:
+        y, target, x = args[0][0]
+    elif FACE_KIND[code] == MEDICINE:
+        x, = args
+    elif code == MEDICAL_ERROR:
+        target, = args
+    elif args:
+        target, x, y = (*args, 0)[:3]  # virus and organ thief (target, slot), transplant (target, slot, own slot)
+    return ((hand_index * num_players + target) * NUM_COLORS + x) * NUM_COLORS + y
+
+
+class VectorGameState:
+    """``num_games`` games of ``num_players`` players held as NumPy arrays and played one turn of every game per
+    ``step``.
+
+    The arrays are the ones of ``CompactGameState`` with a leading game axis: ``states``, ``colors`` and ``attached``
+    (flat organ index ``player * NUM_COLORS + slot``), ``hands`` (``EMPTY`` after the ``hand_sizes`` cards), and
+    ``deck``/``discard_pile`` filled up to ``deck_sizes``/``discard_sizes`` (the top of the deck is the last card).
+    The rules are applied with array operations on all games at once and follow ``CompactGameState.apply_move``.
+
+    Every player follows the random policy of ``RandomPlayer``: with probability ``play_probability`` (of its seat) it
+    plays a move drawn uniformly from its legal plays, otherwise - or without a legal play - it discards a uniformly
+    drawn non-empty subset of its hand. A play probability of 1 gives a scripted "always play" policy. Games are not
+    the games of ``GameManager``, the random numbers come from a NumPy generator.
+
+    A play is an index into ``num_play_actions`` per game: hand index ``h``, target player ``t`` and slots ``x``,
+    ``y`` at ``((h * num_players + t) * NUM_COLORS + x) * NUM_COLORS + y`` (see ``move_tuple`` for the layout).
+    """
+
+    def __init__(self, num_games: int, num_players: int, rng: Optional[np.random.Generator] = None,
+                 play_probability: Union[float, Sequence[float]] = 0.5):
+        if not GameConstants.MIN_PLAYERS <= num_players <= GameConstants.MAX_PLAYERS:
+            raise ValueError(f"Number of players must be between {GameConstants.MIN_PLAYERS} and "
+                             f"{GameConstants.MAX_PLAYERS}")
+        self.num_games = num_games
+        self.num_players = num_players
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.play_probability = np.broadcast_to(np.asarray(play_probability, np.float64), (num_players,)).copy()
+        self.num_play_actions = HAND_SIZE * num_players * NUM_COLORS * NUM_COLORS
+        num_organs = num_players * NUM_COLORS
+        self.states = np.zeros((num_games, num_organs), np.uint8)
+        self.colors = np.zeros((num_games, num_organs), np.uint8)
+        self.attached = np.zeros((num_games, 2 * num_organs), np.uint8)
+        self.hands = np.zeros((num_games, num_players, HAND_SIZE), np.uint8)
+        self.hand_sizes = np.zeros((num_games, num_players), np.int64)
+        self.deck = np.zeros((num_games, DECK_SIZE), np.uint8)
+        self.deck_sizes = np.zeros(num_games, np.int64)
+        self.discard_pile = np.zeros((num_games, DECK_SIZE), np.uint8)
+        self.discard_sizes = np.zeros(num_games, np.int64)
+        self.current_players = np.zeros(num_games, np.int64)
+        self.num_turns = np.zeros(num_games, np.int64)
+        self.winners = np.zeros(num_games, np.int64)  # seat of the winner, -1 while playing or when failed
+        self.finished = np.zeros(num_games, bool)
+        self.last_actions = np.zeros(num_games, np.int64)  # play index, num_play_actions + discard mask or NO_MOVE
+        self.reset(np.arange(num_games))
+
+    def reset(self, games: np.ndarray) -> None:
+        """Start new games in the slots ``games``."""
+        n = len(games)
+        self.states[games] = 0
+        self.colors[games] = np.tile(np.arange(NUM_COLORS, dtype=np.uint8), self.num_players)
+        self.attached[games] = EMPTY
+        self.hands[games] = EMPTY
+        self.hand_sizes[games] = 0
+        self.deck[games] = self.rng.permuted(np.tile(DECK, (n, 1)), axis=1)
+        self.deck_sizes[games] = DECK_SIZE
+        self.discard_sizes[games] = 0
+        self.current_players[games] = self.rng.integers(0, self.num_players, n)
+        self.num_turns[games] = 0
+        self.winners[games] = -1
+        self.finished[games] = False
+        self.last_actions[games] = NO_MOVE
+
+    # legal plays
+
+    def _card_plays(self, games: np.ndarray) -> list:
+        """Legal plays of the hand cards of the current players of ``games``, one entry per family of cards.
+
+        An entry ``(rows, cards, legal, index)`` covers the games ``games[rows]``: ``cards`` marks the hand cards of
+        the family, ``legal`` (with a hand axis of length ``HAND_SIZE`` or 1) their legal plays and ``index`` places
+        them in the ``(target, x, y)`` block of plays of one hand card.
+        """
+        n, num_players = len(games), self.num_players
+        rows = np.arange(n)
+        own = self.current_players[games]
+        states = self.states[games].reshape(n, num_players, NUM_COLORS)
+        colors = self.colors[games].reshape(n, num_players, NUM_COLORS)
+        masks = np.bitwise_or.reduce(np.where(states > 0, 1 << colors, 0).astype(np.uint8), axis=2)  # body colors
+        own_states, own_colors, own_mask = states[rows, own], colors[rows, own], masks[rows, own]
+        opponents = np.arange(num_players) != own[:, None]
+        targets = opponents[:, :, None] & (states > 0) & (states < IMMUNISED)  # opponent organs, not immunised
+        own_organs = (own_states > 0) & (own_states < IMMUNISED)
+
+        hand = self.hands[games, own]
+        kinds = KINDS[hand]
+        card_colors = CARD_COLORS[hand]
+        latex_gloves = hand == LATEX_GLOVE
+        organ = ((own_mask[:, None] >> card_colors) & 1 == 0) & (own_states[rows[:, None], card_colors] == 0)
+        medicine = own_organs[:, None] & _color_matches(card_colors[:, :, None], own_colors[:, None],
+                                                        own_mask[:, None, None])
+        medical_error = opponents & ((masks > 0) | (own_mask > 0)[:, None])  # a swap that moves some organ
+        plays = [(rows, (kinds == ORGAN) | latex_gloves, organ | latex_gloves, (0, 0, 0)),
+                 (rows, kinds == MEDICINE, medicine, (0, slice(None), 0)),
+                 (rows, hand == MEDICAL_ERROR, medical_error[:, None], (slice(None), 0, 0))]
+
+        # the other cards need the target organs of every opponent, only the games holding them pay for these
+        r = np.flatnonzero((kinds == VIRUS).any(axis=1))
+        if len(r):
+            virus = targets[r, None] & _color_matches(card_colors[r, :, None, None], colors[r, None],
+                                                      masks[r, None, :, None])
+            plays.append((r, kinds[r] == VIRUS, virus, (slice(None), slice(None), 0)))
+        r = np.flatnonzero((hand == ORGAN_THIEF).any(axis=1))
+        if len(r):
+            organ_thief = (targets[r] & ((own_mask[r, None, None] >> colors[r]) & 1 == 0)
+                           & (own_states[r, None, :] == 0))
+            plays.append((r, hand[r] == ORGAN_THIEF, organ_thief[:, None], (slice(None), slice(None), 0)))
+        # (target, target slot, own slot)
+        r = np.flatnonzero((hand == TRANSPLANT).any(axis=1))
+        if len(r):
+            target_colors, own_organ_colors = colors[r, :, :, None], own_colors[r, None, None, :]
+            # after the swap neither body may hold two organs of the same color
+            transplant = (targets[r, :, :, None] & own_organs[r, None, None, :]
+                          & (((own_mask[r, None, None, None] & ~(1 << own_organ_colors)) >> target_colors) & 1 == 0)
+                          & (((masks[r, :, None, None] & ~(1 << target_colors)) >> own_organ_colors) & 1 == 0))
+            transplant &= np.eye(NUM_COLORS, dtype=bool) | ((own_states[r, None, :, None] == 0)
+                                                            & (states[r, :, None, :] == 0))
+            plays.append((r, hand[r] == TRANSPLANT, transplant[:, None], (slice(None),) * 3))
+        r = np.flatnonzero((hand == CONTAGION).any(axis=1))
+        if len(r):
+            virus_colors = CARD_COLORS[self.attached[games[r]].reshape(len(r), num_players, NUM_COLORS, 2)[
+                np.arange(len(r)), own[r], :, 0]]
+            contagion = ((own_states[r] == INFECTED)[:, None, None, :] & targets[r, :, :, None]
+                         & _color_matches(virus_colors[:, None, None, :], colors[r, :, :, None],
+                                          masks[r, :, None, None]))
+            plays.append((r, hand[r] == CONTAGION, contagion[:, None], (slice(None),) * 3))
+        return plays
+
+    def legal_play_mask(self, games: np.ndarray) -> np.ndarray:
+        """Legal plays of the current players of ``games``, a boolean array of ``num_play_actions`` per game."""
+        mask = np.zeros((len(games), HAND_SIZE, self.num_players, NUM_COLORS, NUM_COLORS), bool)
+        for rows, cards, legal, index in self._card_plays(games):
+            mask[(rows, slice(None)) + index] |= cards.reshape(cards.shape + (1,) * (legal.ndim - 2)) & legal
+        return mask.reshape(len(games), self.num_play_actions)
+
+    def pick_plays(self, games: np.ndarray) -> np.ndarray:
+        """Draw a play uniformly from the legal plays of the current player of every game of ``games``, -1 for
+        players without a legal play.
+
+        The hand card is drawn weighted by its number of legal plays and the play among the plays of that card, so
+        only one block of plays per game is built instead of the whole ``legal_play_mask``.
+        """
+        n = len(games)
+        rows = np.arange(n)
+        plays = self._card_plays(games)
+        counts = np.zeros((n, HAND_SIZE), np.int64)
+        for r, cards, legal, _ in plays:
+            counts[r] += cards * legal.sum(axis=tuple(range(2, legal.ndim)))
+        totals = counts.cumsum(axis=1)
+        picks = (self.rng.random(n) * totals[:, -1]).astype(np.int64)
+        hand_indices = np.minimum((picks[:, None] >= totals).sum(axis=1), HAND_SIZE - 1)
+        card_counts = counts[rows, hand_indices]
+        picks -= totals[rows, hand_indices] - card_counts  # the index among the plays of the drawn card
+
+        blocks = np.zeros((n, self.num_players, NUM_COLORS, NUM_COLORS), bool)
+        for r, cards, legal, index in plays:
+            picked = cards[np.arange(len(r)), hand_indices[r]]
+            hand_axis = hand_indices[r[picked]] if legal.shape[1] > 1 else 0
+            blocks[(r[picked],) + index] = legal[np.flatnonzero(picked), hand_axis]
+        block_size = self.num_players * NUM_COLORS * NUM_COLORS
+        actions = np.full(n, -1, np.int64)
+        playable = totals[:, -1] > 0
+        # the legal plays of all drawn cards in one flat list, each game picks one of its own
+        offsets = (np.cumsum(card_counts) - card_counts + picks)[playable]
+        positions = np.nonzero(blocks.reshape(n, block_size))[1][offsets]
+        actions[playable] = hand_indices[playable] * block_size + positions
+        return actions
+
+    def move_tuple(self, game: int, action: int) -> tuple:
+        """The ``CompactGameState`` move of the current player of ``game`` for a play index or discard action."""
+        action = int(action)
+        if action >= self.num_play_actions:
+            discard_mask = action - self.num_play_actions
+            return DISCARD, tuple(i for i in range(HAND_SIZE) if discard_mask >> i & 1)
+        y = action % NUM_COLORS
+        x = action // NUM_COLORS % NUM_COLORS
+        target = action // (NUM_COLORS * NUM_COLORS) % self.num_players
+        hand_index = action // (NUM_COLORS * NUM_COLORS * self.num_players)
+        code = int(self.hands[game, self.current_players[game], hand_index])
+        kind = FACE_KIND[code]
+        if kind == ORGAN or code == LATEX_GLOVE:
+            return PLAY, hand_index
+        if kind == MEDICINE:
+            return PLAY, hand_index, x
+        if kind == VIRUS or code == ORGAN_THIEF:
+            return PLAY, hand_index, target, x
+        if code == TRANSPLANT:
+            return PLAY, hand_index, target, x, y
+        if code == CONTAGION:
+            return PLAY, hand_index, ((y, target, x),)
+        return PLAY, hand_index, target
+
+    def legal_plays(self, game: int) -> List[tuple]:
+        mask = self.legal_play_mask(np.array([game]))[0]
+        return [self.move_tuple(game, action) for action in np.flatnonzero(mask)]
+
+    def to_compact(self, game: int) -> CompactGameState:
+        """The game as a ``CompactGameState`` (with a fresh random stream)."""
+        state = CompactGameState.__new__(CompactGameState)
+        state.num_players = self.num_players
+        state.rng = random.Random()
+        state.deck = bytearray(self.deck[game, :self.deck_sizes[game]])
+        state.discard_pile = bytearray(self.discard_pile[game, :self.discard_sizes[game]])
+        state.hands = [bytearray(self.hands[game, player, :self.hand_sizes[game, player]])
+                       for player in range(self.num_players)]
+        state.states = bytearray(self.states[game])
+        state.colors = bytearray(self.colors[game])
+        state.attached = bytearray(self.attached[game])
+        state.current_player_index = int(self.current_players[game])
+        return state
+
+    # turns
+
+    def step(self) -> np.ndarray:
+        """Play one turn of every unfinished game, returns the games that finished in this turn."""
+        games = np.flatnonzero(~self.finished)
+        own = self.current_players[games]
+        self.num_turns[games] += 1
+        self.last_actions[games] = NO_MOVE
+        moving = self.hand_sizes[games, own] > 0
+        movers, mover_seats = games[moving], own[moving]
+
+        attempts = self.rng.random(len(movers)) < self.play_probability[mover_seats]
+        players, seats = movers[attempts], mover_seats[attempts]
+        actions = self.pick_plays(players)
+        can_play = actions >= 0
+        players, seats, actions = players[can_play], seats[can_play], actions[can_play]
+        self.last_actions[players] = actions
+
+        discarding = np.ones(len(movers), bool)
+        discarding[np.flatnonzero(attempts)[can_play]] = False
+        discarders, discarder_seats = movers[discarding], mover_seats[discarding]
+        discard_masks = self.rng.integers(1, 1 << self.hand_sizes[discarders, discarder_seats])
+        self.last_actions[discarders] = self.num_play_actions + discard_masks
+
+        self._discard(discarders, discarder_seats, discard_masks)
+        self._play(players, seats, actions)
+
+        won = (self.states[movers].reshape(len(movers), self.num_players, NUM_COLORS)[np.arange(len(movers)),
+                                                                                      mover_seats] >= HEALTHY)
+        won = won.sum(axis=1) >= GameConstants.NUM_HEALTHY_ORGANS_TO_WIN
+        self.winners[movers[won]] = mover_seats[won]
+        self.finished[movers[won]] = True
+        playing = ~self.finished[games]
+        self._complete_hands(games[playing], own[playing])
+        self.current_players[games] = (own + 1) % self.num_players
+        self.finished[games[self.num_turns[games] > GameConstants.MAX_TURNS]] = True
+        return games[self.finished[games]]
+
+    def run(self) -> np.ndarray:
+        """Play every game to its end, returns the winner seats (-1 for games hitting ``MAX_TURNS``)."""
+        while not self.finished.all():
+            self.step()
+        return self.winners
+
+    def _push(self, games: np.ndarray, codes: np.ndarray) -> None:
+        # append a card to the discard pile of every game of games
+        self.discard_pile[games, self.discard_sizes[games]] = codes
+        self.discard_sizes[games] += 1
+
+    def _remove_hand_cards(self, games: np.ndarray, seats: np.ndarray, removed: np.ndarray) -> None:
+        kept = ~removed & (np.arange(HAND_SIZE) < self.hand_sizes[games, seats][:, None])
+        # the kept cards move to the front in their order
+        rows, columns = np.nonzero(kept)
+        hands = np.full((len(games), HAND_SIZE), EMPTY, np.uint8)
+        hands[rows, kept.cumsum(axis=1)[rows, columns] - 1] = self.hands[games[rows], seats[rows], columns]
+        self.hands[games, seats] = hands
+        self.hand_sizes[games, seats] = kept.sum(axis=1)
+
+    def _discard(self, games: np.ndarray, seats: np.ndarray, discard_masks: np.ndarray) -> None:
+        for hand_index in reversed(range(HAND_SIZE)):
+            chosen = (discard_masks >> hand_index) & 1 == 1
+            self._push(games[chosen], self.hands[games[chosen], seats[chosen], hand_index])
+        self._remove_hand_cards(games, seats, (discard_masks[:, None] >> np.arange(HAND_SIZE)) & 1 == 1)
+
+    def _play(self, games: np.ndarray, seats: np.ndarray, actions: np.ndarray) -> None:
+        num_players = self.num_players
+        y = actions % NUM_COLORS
+        x = actions // NUM_COLORS % NUM_COLORS
+        targets = actions // (NUM_COLORS * NUM_COLORS) % num_players
+        hand_indices = actions // (NUM_COLORS * NUM_COLORS * num_players)
+        codes = self.hands[games, seats, hand_indices]
+        kinds = KINDS[codes]
+
+        chosen = kinds == ORGAN
+        g, color = games[chosen], CARD_COLORS[codes[chosen]]
+        organs = seats[chosen] * NUM_COLORS + color
+        self.states[g, organs] = HEALTHY
+        self.colors[g, organs] = color
+        chosen = kinds == MEDICINE
+        self._apply_medicine(games[chosen], codes[chosen], seats[chosen] * NUM_COLORS + x[chosen])
+        chosen = kinds == VIRUS
+        self._apply_virus(games[chosen], codes[chosen], targets[chosen] * NUM_COLORS + x[chosen])
+        chosen = codes == ORGAN_THIEF
+        self._move_organ(games[chosen], targets[chosen], seats[chosen], x[chosen])
+        self._push(games[chosen], codes[chosen])
+
+        chosen = codes == TRANSPLANT
+        g, seat, target, target_slot, slot = games[chosen], seats[chosen], targets[chosen], x[chosen], y[chosen]
+        same = target_slot == slot
+        self._swap_organs(g[same], seat[same], target[same], slot[same])
+        other = ~same
+        self._move_organ(g[other], target[other], seat[other], target_slot[other])
+        self._move_organ(g[other], seat[other], target[other], slot[other])
+        self._push(g, codes[chosen])
+
+        chosen = codes == CONTAGION
+        g, slot = games[chosen], seats[chosen] * NUM_COLORS + y[chosen]
+        viruses = self.attached[g, 2 * slot]
+        self._clear_attached(g, slot)
+        self.states[g, slot] = HEALTHY
+        self.colors[g, slot] = y[chosen]
+        self._apply_virus(g, viruses, targets[chosen] * NUM_COLORS + x[chosen])
+        self._push(g, codes[chosen])
+
+        chosen = codes == MEDICAL_ERROR
+        self._swap_bodies(games[chosen], seats[chosen], targets[chosen])
+        self._push(games[chosen], codes[chosen])
+
+        chosen = codes == LATEX_GLOVE
+        g, seat = games[chosen], seats[chosen]
+        for target in range(num_players):
+            hit = seat != target
+            target_games = g[hit]
+            for hand_index in reversed(range(HAND_SIZE)):
+                held = self.hand_sizes[target_games, target] > hand_index
+                self._push(target_games[held], self.hands[target_games[held], target, hand_index])
+            self.hands[target_games, target] = EMPTY
+            self.hand_sizes[target_games, target] = 0
+        self._push(g, codes[chosen])
+
+        self._remove_hand_cards(games, seats, np.arange(HAND_SIZE) == hand_indices[:, None])
+
+    def _apply_virus(self, games: np.ndarray, viruses: np.ndarray, organs: np.ndarray) -> None:
+        states = self.states[games, organs]
+        chosen = states == HEALTHY
+        g, organ, virus = games[chosen], organs[chosen], viruses[chosen]
+        self.states[g, organ] = INFECTED
+        self.attached[g, 2 * organ] = virus
+        self._adopt_color(g, organ, virus)
+        chosen = states == INFECTED
+        g, organ = games[chosen], organs[chosen]
+        self._push(g, self.attached[g, 2 * organ])
+        self._push(g, (ORGAN * NUM_COLORS + organ % NUM_COLORS).astype(np.uint8))
+        self._push(g, viruses[chosen])
+        self._clear_organ(g, organ, 0)
+        chosen = states == VACCINATED
+        g, organ = games[chosen], organs[chosen]
+        self._push(g, self.attached[g, 2 * organ])
+        self._push(g, viruses[chosen])
+        self._clear_organ(g, organ, HEALTHY)
+
+    def _apply_medicine(self, games: np.ndarray, medicines: np.ndarray, organs: np.ndarray) -> None:
+        states = self.states[games, organs]
+        chosen = states == HEALTHY
+        g, organ, medicine = games[chosen], organs[chosen], medicines[chosen]
+        self.states[g, organ] = VACCINATED
+        self.attached[g, 2 * organ] = medicine
+        self._adopt_color(g, organ, medicine)
+        chosen = states == INFECTED
+        g, organ = games[chosen], organs[chosen]
+        self._push(g, self.attached[g, 2 * organ])
+        self._push(g, medicines[chosen])
+        self._clear_organ(g, organ, HEALTHY)
+        chosen = states == VACCINATED
+        self.states[games[chosen], organs[chosen]] = IMMUNISED
+        self.attached[games[chosen], 2 * organs[chosen] + 1] = medicines[chosen]
+
+    def _adopt_color(self, games: np.ndarray, organs: np.ndarray, codes: np.ndarray) -> None:
+        wild = self.colors[games, organs] == WILD
+        self.colors[games[wild], organs[wild]] = CARD_COLORS[codes[wild]]
+
+    def _clear_attached(self, games: np.ndarray, organs: np.ndarray) -> None:
+        self.attached[games, 2 * organs] = EMPTY
+        self.attached[games, 2 * organs + 1] = EMPTY
+
+    def _clear_organ(self, games: np.ndarray, organs: np.ndarray, state: int) -> None:
+        self._clear_attached(games, organs)
+        self.states[games, organs] = state
+        self.colors[games, organs] = organs % NUM_COLORS
+
+    def _move_organ(self, games: np.ndarray, sources: np.ndarray, targets: np.ndarray, slots: np.ndarray) -> None:
+        source, target = sources * NUM_COLORS + slots, targets * NUM_COLORS + slots
+        self.states[games, target] = self.states[games, source]
+        self.colors[games, target] = self.colors[games, source]
+        self.attached[games, 2 * target] = self.attached[games, 2 * source]
+        self.attached[games, 2 * target + 1] = self.attached[games, 2 * source + 1]
+        self._clear_organ(games, source, 0)
+
+    def _swap_organs(self, games: np.ndarray, first: np.ndarray, second: np.ndarray, slots: np.ndarray) -> None:
+        first, second = first * NUM_COLORS + slots, second * NUM_COLORS + slots
+        for array, i, j in ((self.states, first, second), (self.colors, first, second),
+                            (self.attached, 2 * first, 2 * second), (self.attached, 2 * first + 1, 2 * second + 1)):
+            array[games, i], array[games, j] = array[games, j], array[games, i]
+
+    def _swap_bodies(self, games: np.ndarray, first: np.ndarray, second: np.ndarray) -> None:
+        rows = games[:, None]
+        for array, width in ((self.states, NUM_COLORS), (self.colors, NUM_COLORS), (self.attached, 2 * NUM_COLORS)):
+            i = first[:, None] * width + np.arange(width)
+            j = second[:, None] * width + np.arange(width)
+            array[rows, i], array[rows, j] = array[rows, j], array[rows, i]
+
+    def _complete_hands(self, games: np.ndarray, seats: np.ndarray) -> None:
+        for _ in range(HAND_SIZE):
+            drawing = ((self.hand_sizes[games, seats] < HAND_SIZE)
+                       & (self.deck_sizes[games] + self.discard_sizes[games] > 0))
+            games, seats = games[drawing], seats[drawing]
+            if not len(games):
+                return
+            self._refill_decks(games[self.deck_sizes[games] == 0])
+            top = self.deck_sizes[games] - 1
+            self.hands[games, seats, self.hand_sizes[games, seats]] = self.deck[games, top]
+            self.deck_sizes[games] = top
+            self.hand_sizes[games, seats] += 1
+
+    def _refill_decks(self, games: np.ndarray) -> None:
+        # the discard pile, reversed, becomes the deck
+        sizes = self.discard_sizes[games]
+        positions = sizes[:, None] - 1 - np.arange(DECK_SIZE)
+        self.deck[games] = np.where(positions >= 0, self.discard_pile[games[:, None], np.maximum(positions, 0)], EMPTY)
+        self.deck_sizes[games] = sizes
+        self.discard_sizes[games] = 0
+
+
+class VectorResult:
+    def __init__(self, num_players: int):
+        self.wins = np.zeros(num_players, np.int64)
+        self.num_games = 0
+        self.num_errors = 0
+        self.total_turns = 0
+        self.wall_time = 0.
+
+    def win_rates(self) -> np.ndarray:
+        return self.wins / self.num_games if self.num_games else np.zeros_like(self.wins, float)
+
+    @property
+    def mean_turns(self) -> float:
+        return self.total_turns / self.num_games if self.num_games else 0.
+
+    @property
+    def games_per_second(self) -> float:
+        return self.num_games / self.wall_time if self.wall_time else 0.
+
+
+def simulate(num_players: int, num_games: int, seed: Optional[int] = None, batch_size: int = 8192,
+             play_probability: Union[float, Sequence[float]] = 0.5) -> VectorResult:
+    """Play ``num_games`` random-policy games on a ``VectorGameState`` of ``batch_size`` slots.
+
+    Slots of finished games are refilled with new games while any are left, so the arrays stay full. Win counts and
+    turns exclude games hitting ``MAX_TURNS``, which only count as errors.
+    """
+    start = time.perf_counter()
+    result = VectorResult(num_players)
+    state = VectorGameState(min(batch_size, num_games), num_players, np.random.default_rng(seed), play_probability)
+    started = state.num_games
+    while not state.finished.all():
+        finished = state.step()
+        if not len(finished):
+            continue
+        winners = state.winners[finished]
+        won = winners >= 0
+        result.wins += np.bincount(winners[won], minlength=num_players)
+        result.num_games += int(won.sum())
+        result.num_errors += int((~won).sum())
+        result.total_turns += int(state.num_turns[finished][won].sum())
+        restarted = finished[:max(0, num_games - started)]
+        started += len(restarted)
+        state.reset(restarted)
+    result.wall_time = time.perf_counter() - start
+    return result
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Play random-policy Virus! games on the vectorized engine.")
+    parser.add_argument('-p', '--players', type=int, default=4, help="number of players")
+    parser.add_argument('-n', '--games', type=int, default=100_000, help="number of games to play")
+    parser.add_argument('-s', '--seed', type=int, default=None, help="seed of the NumPy generator")
+    parser.add_argument('-b', '--batch-size', type=int, default=8192, help="number of games played side by side")
+    parser.add_argument('--play-probability', type=float, nargs='+', default=[0.5],
+                        help="probability of playing a card rather than discarding, one value or one per seat")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    play_probability = args.play_probability[0] if len(args.play_probability) == 1 else args.play_probability
+    result = simulate(args.players, args.games, args.seed, args.batch_size, play_probability)
+    print(f'FINAL STATS AFTER {result.num_games} GAMES ({result.num_errors} FAILED)')
+    for seat, (wins, win_rate) in enumerate(zip(result.wins, result.win_rates())):
+        print(f'Seat {seat + 1}: {wins} ({win_rate:.1%})')
+    print(f'Turns: mean {result.mean_turns:.1f}')
+    print(f'Time: {result.wall_time:.2f}s, {result.games_per_second:.1f} games/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+from hashlib import blake2b
+
+# Zobrist hashing of the object engine. Every (location, card) feature has a random 64 bit key and a component's
+# hash is the sum of the keys of its features, so identical cards (e.g. two red viruses in a hand) add up instead
+# of cancelling out as they would with xor. The deck, the discard pile, the hands and the bodies keep their sums up
+# to date on every change and GameState.zobrist_hash combines them and reduces the result modulo 2**64.
+MASK = (1 << 64) - 1
+
+
+def zobrist_key(*parts) -> int:
+    # derived from the feature itself, so the keys are the same in every process and run
+    return int.from_bytes(blake2b(repr(parts).encode(), digest_size=8).digest(), 'little')
+
+
+class ZobristKeys(dict):
+    """Keys of one kind of feature, created on first use."""
+
+    def __init__(self, name: str):
+        super().__init__()
+        self.name = name
+
+    def __missing__(self, feature) -> int:
+        key = self[feature] = zobrist_key(self.name, feature)
+        return key
+
+
+DECK_KEYS = ZobristKeys('deck')  # card name
+DISCARD_PILE_KEYS = ZobristKeys('discard pile')  # card name
+HAND_KEYS = ZobristKeys('hand')  # card name
+ORGAN_KEYS = ZobristKeys('organ')  # (original color, organ state, color)
+ATTACHED_KEYS = ZobristKeys('attached')  # (original color of the organ, card name)
+TURN_KEYS = ZobristKeys('turn')  # current player index
+
+
+class _SeatMultipliers(ZobristKeys):
+    # odd, so multiplying the hash of a player's hand and body by it keeps every bit of it
+    def __missing__(self, seat: int) -> int:
+        key = self[seat] = zobrist_key(self.name, seat) | 1
+        return key
+
+
+SEAT_MULTIPLIERS = _SeatMultipliers('seat')
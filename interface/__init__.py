@@ -1,4 +1,6 @@
+from .event_bus import EventBus
 from .blank_presenter import BlankPresenter
 from .cli_presenter import CLIPresenter
 
-presenter = BlankPresenter()
+# bus of every game not given its own, e.g. CLIPresenter().subscribe(events) prints all games
+events = EventBus()
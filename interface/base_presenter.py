@@ -1,7 +1,22 @@
 from abc import ABC, abstractmethod
 
+from enums import EventType
+
 
 class BasePresenter(ABC):
+    def subscribe(self, events: 'EventBus') -> None:
+        """Present every game publishing on ``events``."""
+        events.subscribe(EventType.GAME_START, lambda _: self.print_game_start())
+        events.subscribe(EventType.GAME_OVER, self.print_game_over)
+        events.subscribe(EventType.TURN_START, lambda _: self.print_separator())
+        events.subscribe(EventType.STATE, self.print_state)
+        events.subscribe(EventType.NETWORK_OUTPUT, self.print_output_array)
+        events.subscribe(EventType.NETWORK_SUBSET, self.print_subset_array)
+        events.subscribe(EventType.DECISION, self.print_decision)
+        events.subscribe(EventType.CARD, self.print_card)
+        events.subscribe(EventType.CARD_PLAY_STATUS, lambda success: self.print_card_play_status_success()
+                         if success else self.print_card_play_status_fail())
+
     @abstractmethod
     def print_game_start(self) -> None:
         pass
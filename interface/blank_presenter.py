@@ -2,6 +2,9 @@ from interface.base_presenter import BasePresenter
 
 
 class BlankPresenter(BasePresenter):
+    def subscribe(self, events: 'EventBus') -> None:
+        pass  # stays unsubscribed, so the games never build payloads for it
+
     def print_game_start(self) -> None:
         pass
 
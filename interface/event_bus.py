@@ -0,0 +1,41 @@
+from typing import Any, Callable, Dict, List, Optional
+
+from enums import EventType
+
+
+class EventBus:
+    """Publishes game events to the callbacks subscribed to them.
+
+    Publishing an event nobody listens to costs a dictionary lookup. Payloads that are expensive to build are
+    published with ``emit_lazy``, which only calls the builder when the event has subscribers, so headless games
+    pay nothing for logging, metrics or recording.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[EventType, List[Callable[[Any], None]]] = {}
+
+    def subscribe(self, event_type: EventType, callback: Callable[[Any], None]) -> None:
+        self._subscribers.setdefault(event_type, []).append(callback)
+
+    def unsubscribe(self, event_type: EventType, callback: Callable[[Any], None]) -> None:
+        callbacks = self._subscribers[event_type]
+        callbacks.remove(callback)
+        if not callbacks:
+            del self._subscribers[event_type]
+
+    def has_subscribers(self, event_type: Optional[EventType] = None) -> bool:
+        """Whether ``event_type`` (any event when omitted) has subscribers."""
+        return bool(self._subscribers) if event_type is None else event_type in self._subscribers
+
+    def emit(self, event_type: EventType, payload: Any = None) -> None:
+        callbacks = self._subscribers.get(event_type)
+        if callbacks:
+            for callback in callbacks:
+                callback(payload)
+
+    def emit_lazy(self, event_type: EventType, build_payload: Callable[..., Any], *args) -> None:
+        callbacks = self._subscribers.get(event_type)
+        if callbacks:
+            payload = build_payload(*args)
+            for callback in callbacks:
+                callback(payload)
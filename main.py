@@ -1,36 +1,72 @@
-from players import PlayerFactory
-from game.game_manager import GameManager
-from enums import PlayerType
+import argparse
 
-from collections import defaultdict
+from enums import PlayerType, EngineType
+from game.batch_runner import run_batch
+from game.instrumentation import Instrumentation
+from interface import CLIPresenter, events
 
+DEFAULT_SEATING = [
+    PlayerType.STRATEGY_BASED_AI,
+    # PlayerType.RULE_BASED_AI,
+    # PlayerType.HUMAN,
+    # PlayerType.ISMCTS_AI,
+    # PlayerType.RANDOM,
+    PlayerType.RANDOM,
+    PlayerType.RANDOM,
+    PlayerType.RANDOM,
+]
 
-def main():
-    player_factory = PlayerFactory()
-
-    player_factory.add_player(PlayerType.STRATEGY_BASED_AI, "John")
-    # player_factory.add_player(PlayerType.RULE_BASED_AI, "John")
-    # player_factory.add_player(PlayerType.HUMAN, "John")
-    # player_factory.add_player(PlayerType.ISMCTS_AI, "John")
-    # player_factory.add_player(PlayerType.RANDOM, "John")
 
-    player_factory.add_player(PlayerType.RANDOM, "George")
-    player_factory.add_player(PlayerType.RANDOM, "Amy")
-    player_factory.add_player(PlayerType.RANDOM, "Phil")
+def parse_args():
+    parser = argparse.ArgumentParser(description="Play a batch of Virus! games and print the win statistics.")
+    parser.add_argument('players', nargs='*', type=PlayerType, default=DEFAULT_SEATING,
+                        help=f"seating, one player type per seat ({', '.join(PlayerType)})")
+    parser.add_argument('-n', '--games', type=int, default=100, help="number of games to play")
+    parser.add_argument('-w', '--workers', type=int, default=None, help="number of worker processes (default: all cores)")
+    parser.add_argument('-s', '--seed', type=int, default=0, help="base seed, game i is played with the stream game_rng(seed, i)")
+    parser.add_argument('-g', '--game', type=int, default=None, help="replay only the game with this index")
+    parser.add_argument('-e', '--engine', type=EngineType, default=EngineType.OBJECT, choices=list(EngineType))
+    parser.add_argument('--chunk-size', type=int, default=None, help="number of games sent to a worker at once")
+    parser.add_argument('-r', '--record', metavar='DIR', default=None,
+                        help="append the played games to binary game record shards in this directory")
+    parser.add_argument('--results', metavar='DIR', default=None,
+                        help="write one row per game (seed, seating, winner, turns, cards played, ...) to columnar "
+                             "chunks in this directory")
+    parser.add_argument('--dataset', metavar='DIR', default=None,
+                        help="write a training record (observation, legal actions, chosen action, outcome) per move to "
+                             "dataset shards in this directory")
+    parser.add_argument('-v', '--verbose', action='store_true', help="print every turn of the games (use with --game)")
+    parser.add_argument('--profile', action='store_true',
+                        help="time the engine and player hot paths and print a report (plays on a single worker)")
+    return parser.parse_args()
 
-    game = GameManager(player_factory)
-    winner = game.run()
-    return winner
 
+def main():
+    args = parse_args()
+    if args.verbose:
+        CLIPresenter().subscribe(events)
+    instrumentation = Instrumentation()
+    if args.profile:
+        args.workers = 1
+        instrumentation.enable()
+    if args.game is not None:
+        result = run_batch(args.players, 1, num_workers=1, base_seed=args.seed, engine=args.engine,
+                           first_game=args.game, record_dir=args.record, results_dir=args.results,
+                           dataset_dir=args.dataset)
+    else:
+        result = run_batch(args.players, args.games, num_workers=args.workers, base_seed=args.seed,
+                           engine=args.engine, chunk_size=args.chunk_size, record_dir=args.record,
+                           results_dir=args.results, dataset_dir=args.dataset)
+    instrumentation.disable()
 
-NUM_ITERATIONS = 100
-winners = defaultdict(int)
+    print(f'FINAL STATS AFTER {result.num_games} GAMES ({result.num_errors} FAILED)')
+    for name, wins, win_rate in zip(result.seat_names(), result.wins, result.win_rates()):
+        print(f'{name}: {wins} ({win_rate:.1%})')
+    print(f'Turns: mean {result.mean_turns:.1f}, min {result.min_turns}, max {result.max_turns}')
+    print(f'Time: {result.wall_time:.2f}s wall, {result.cpu_time:.2f}s cpu, {result.games_per_second:.1f} games/s')
+    if args.profile:
+        print(instrumentation.report())
 
-for i in range(NUM_ITERATIONS):
-    print(f'ITERATION {i+1}')
-    curr_winner = main()
-    winners[str(curr_winner)] += 1
 
-print(f'FINAL STATS AFTER {NUM_ITERATIONS} ITERATIONS')
-for winner, wins in winners.items():
-    print(f'{winner}: {wins}')
+if __name__ == '__main__':
+    main()
@@ -2,10 +2,31 @@ from abc import ABC, abstractmethod
 from typing import List
 from enums import TreatmentName, CardType, OrganState, CardColor
 from models.move import Move
-from models.organ_states import HealthyStateHandler
+from models.organ_states import (MEDICINE, MEDICINE_ADDED, MEDICINE_REMOVED, VIRUS, VIRUS_ADDED, VIRUS_REMOVED,
+                                 play_on_organ)
+from game.zobrist import ORGAN_KEYS, ATTACHED_KEYS
+
+COLOR_BITS = {color: 1 << i for i, color in enumerate(CardColor)}
+
+
+def color_fits(card_color: CardColor, organ: 'Organ', body_owner: 'BasePlayer') -> bool:
+    """Whether a virus/medicine of ``card_color`` can go on ``organ`` in the body of ``body_owner``, the rule of
+    ``compact_game_state.color_matches``."""
+    if organ.color == CardColor.WILD:
+        # cannot turn wild organ into a color that is already in the body
+        return card_color == CardColor.WILD or not body_owner.has_organ_color(card_color)
+    return card_color == CardColor.WILD or card_color == organ.color
+
+
+def _has_organ_slot(player: 'BasePlayer', original_color: CardColor) -> bool:
+    # a body holds at most one organ of each original color (one wild organ, however it is colored)
+    return any(organ.original_color == original_color for organ in player.body)
 
 
 class Card(ABC):
+    # slotted (as are the subclasses, down to an empty __slots__) so the many cards of live games carry no __dict__
+    __slots__ = ('name', 'type')
+
     def __init__(self, name: str, card_type: CardType):
         self.name = str(name)
         self.type = card_type
@@ -25,6 +46,9 @@ class Card(ABC):
     @abstractmethod
     def prepare_moves(self, player, game_state) -> List[Move]: ...
 
+    def finish_play(self, game_state: 'GameState') -> None:
+        """Called once after a play of the card with at least one successful move."""
+
     def __str__(self) -> str:
         return self.name
 
@@ -33,27 +57,31 @@ class Card(ABC):
 
 
 class ColoredCard(Card, ABC):
+    __slots__ = ('color',)
+    _names = {}  # (card type, color) -> name, one string shared by all cards of a kind
+
     def __init__(self, card_type: CardType, color: CardColor):
-        name = f"{card_type.value} {color.value}"
+        name = self._names.get((card_type, color))
+        if name is None:
+            name = self._names[card_type, color] = f"{card_type.value} {color.value}"
         super().__init__(name, card_type)
         self.color = color
 
 
 class Medicine(ColoredCard):
+    __slots__ = ()
+
     def __init__(self, color: CardColor):
-        self.name = f"{color} {CardType.MEDICINE}"
         super().__init__(CardType.MEDICINE, color)
 
     def play(self, game_state: 'GameState', owner: 'Player', move: 'Move') -> bool:
         target_organ = move.player_organ
         if not target_organ:
             return True
+        if not color_fits(self.color, target_organ, owner):
+            return True
 
-        return target_organ.state_handler.on_medicine_play(
-            medicine_card=self,
-            target_organ=target_organ,
-            game_state=game_state
-        )
+        return play_on_organ(self, MEDICINE, target_organ, None, game_state)
 
     def can_be_played(self, game_state: 'GameState', owner: 'Player'):
         for organ in owner.body:
@@ -71,23 +99,18 @@ class Medicine(ColoredCard):
 
 
 class Virus(ColoredCard):
+    __slots__ = ()
+
     def __init__(self, color):
-        self.name = f"{color} {CardType.VIRUS}"
         super().__init__(CardType.VIRUS, color)
 
     def play(self, game_state: 'GameState', owner: 'Player', move: 'Move') -> bool:
         target_player = move.opponent
         target_organ = move.opponent_organ
-        if not target_organ:
+        if not target_organ or not color_fits(self.color, target_organ, target_player):
             return True
 
-        return target_organ.state_handler.on_virus_play(
-            virus_card=self,
-            target_organ=target_organ,
-            target_player=target_player,
-            owner=owner,
-            game_state=game_state
-        )
+        return play_on_organ(self, VIRUS, target_organ, target_player, game_state)
 
     def prepare_moves(self, player, game_state) -> List[Move]:
         chosen_opponent = player.decide_opponent(game_state, self)
@@ -98,7 +121,7 @@ class Virus(ColoredCard):
         chosen_organ = chosen_opponent.get_organ_by_color(chosen_color)
 
         if chosen_organ:
-            if not (chosen_organ.color == CardColor.WILD and self.color in chosen_opponent.organ_colors):  # cannot turn wild organ into a color that is already in opponent's body
+            if not (chosen_organ.color == CardColor.WILD and chosen_opponent.has_organ_color(self.color)):  # cannot turn wild organ into a color that is already in opponent's body
                 return [Move(opponent=chosen_opponent, opponent_organ=chosen_organ)]
 
     def can_be_played(self, game_state: 'GameState', owner: 'Player'):
@@ -113,29 +136,66 @@ class Virus(ColoredCard):
 
 
 class Organ(ColoredCard):
+    __slots__ = ('owner', 'original_color', '_color', 'viruses', 'medicines', 'zobrist_hash', '_state')
+
     def __init__(self, color):
-        self.name = f"{color} {CardType.ORGAN}"
+        self.owner = None  # player whose body holds the organ, notified about color and state changes
         self.original_color = color
-        self.state_handler = HealthyStateHandler()
+        self._color = color
         self.viruses = []
         self.medicines = []
+        # Zobrist hash of the organ with its state, color and attached cards, part of the owner's body_hash
+        self.zobrist_hash = 0
+        self.state = OrganState.HEALTHY
         super().__init__(CardType.ORGAN, color)
 
     @property
-    def state(self):
-        return self.state_handler.state
+    def state(self) -> OrganState:
+        return self._state
+
+    @state.setter
+    def state(self, state: OrganState) -> None:
+        self._state = state
+        self.rehash()
+        if self.owner is not None:
+            self.owner.body_version += 1
+
+    @property
+    def color(self) -> CardColor:
+        return self._color
+
+    @color.setter
+    def color(self, color: CardColor) -> None:
+        old_color = getattr(self, '_color', None)
+        if color == old_color:
+            return
+        self._color = color
+        self.rehash()
+        if self.owner is not None:
+            self.owner.on_organ_recolored(self, old_color)
+
+    def rehash(self) -> None:
+        # attached cards only change together with the state, so the state/color setters keep the hash current
+        original_color = self.original_color
+        zobrist_hash = ORGAN_KEYS[original_color, self._state, self._color]
+        for card in self.viruses:
+            zobrist_hash += ATTACHED_KEYS[original_color, card.name]
+        for card in self.medicines:
+            zobrist_hash += ATTACHED_KEYS[original_color, card.name]
+        if self.owner is not None:
+            self.owner.body_hash += zobrist_hash - self.zobrist_hash
+        self.zobrist_hash = zobrist_hash
 
     def __repr__(self):
         return f"{self.name}{' ('+self.color.upper()+')' if self.color != self.original_color else ''} ({'+' * len(self.medicines)}{'-' * len(self.viruses)})"
 
     def play(self, game_state: 'GameState', owner: 'Player', move: 'Move') -> bool:
-        if any(organ.color == self.color for organ in owner.body):
+        if owner.has_organ_color(self.color) or _has_organ_slot(owner, self.original_color):
             return True
         owner.add_organ_to_body(self)
 
     def can_be_played(self, game_state: 'GameState', owner: 'Player'):
-        organ_colors = [organ.color for organ in owner.body]
-        if self.color not in organ_colors:
+        if not owner.has_organ_color(self.color):
             return True
 
     def discard(self, game_state):
@@ -150,43 +210,64 @@ class Organ(ColoredCard):
 
     def add_virus(self, virus_card):
         self.viruses.append(virus_card)
-        self.state_handler.apply_virus(self, virus_card)
+        self.state = self._next_state(VIRUS_ADDED, 'Virus cannot be applied on')
 
     def remove_virus(self):
         virus = self.viruses.pop()
-        self.state_handler.remove_virus(self, virus)
+        self.state = self._next_state(VIRUS_REMOVED, 'Virus cannot be removed from')
         return virus
 
     def add_medicine(self, medicine):
         self.medicines.append(medicine)
-        self.state_handler.apply_medicine(self, medicine)
+        self.state = self._next_state(MEDICINE_ADDED, 'Medicine cannot be applied on')
 
     def remove_medicine(self):
         medicine = self.medicines.pop()
-        self.state_handler.remove_medicine(self, medicine)
+        self.state = self._next_state(MEDICINE_REMOVED, 'Medicine cannot be removed from')
         return medicine
 
+    def _next_state(self, transitions: dict, error: str) -> OrganState:
+        state = transitions.get(self._state)
+        if state is None:
+            raise ValueError(f'{error} {self._state.name.lower()} organ')
+        return state
+
     def prepare_moves(self, player, game_state) -> List[Move]:
-        if self.color not in player.organ_colors:
+        if not player.has_organ_color(self.color):
             return [Move()]
 
+    def reset(self) -> None:
+        """Back to a healthy organ of its original color outside of any body, for decks reused by the next game."""
+        self.owner = None
+        self.viruses.clear()
+        self.medicines.clear()
+        self._color = self.original_color
+        self.state = OrganState.HEALTHY
+
     def reset_wild_card(self):
         if self.original_color == CardColor.WILD:
             self.color = CardColor.WILD
 
 
 class TreatmentCard(Card, ABC):
+    __slots__ = ()
+
     def __init__(self, name):
         super().__init__(name, CardType.TREATMENT)
 
 
 class OrganThief(TreatmentCard):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__(TreatmentName.ORGAN_THIEF)
 
     def play(self, game_state: 'GameState', owner: 'Player', move: 'Move') -> bool:
         target = move.opponent
         target_organ = move.opponent_organ
+        if (target_organ.state == OrganState.IMMUNISED or owner.has_organ_color(target_organ.color)
+                or _has_organ_slot(owner, target_organ.original_color)):
+            return True
         target.remove_organ_from_body(target_organ)
         owner.add_organ_to_body(target_organ)
         game_state.add_card_to_discard_pile(self)
@@ -194,31 +275,36 @@ class OrganThief(TreatmentCard):
     def can_be_played(self, game_state: 'GameState', owner: 'Player') -> bool:
         opponents = game_state.get_opponents(owner)
         for opponent in opponents:
-            owner_organ_colors = [organ.color for organ in owner.body]
-            if any(organ.color not in owner_organ_colors for organ in opponent.body):
+            if any(not owner.has_organ_color(organ.color) for organ in opponent.body):
                 return True
 
     def prepare_moves(self, player, game_state):
         chosen_opponent = player.decide_opponent(game_state, self)
         chosen_color = player.decide_organ_color(game_state, opponent_body=chosen_opponent.body)
         chosen_organ = chosen_opponent.get_organ_by_color(chosen_color)
-        if chosen_organ and chosen_organ.state < OrganState.IMMUNISED and chosen_organ.color not in player.organ_colors:
+        if chosen_organ and chosen_organ.state < OrganState.IMMUNISED and not player.has_organ_color(chosen_organ.color):
             return [Move(opponent=chosen_opponent, opponent_organ=chosen_organ)]
 
 
 class Contagion(TreatmentCard):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__(TreatmentName.CONTAGION)
 
     def play(self, game_state: 'GameState', owner: 'Player', move: 'Move') -> bool:
         infected_organ = move.player_organ
+        if infected_organ.state != OrganState.INFECTED:
+            return True
         virus = infected_organ.viruses[0]
         is_error = virus.play(game_state, owner, move)
-        if not is_error:
-            infected_organ.remove_virus()
-        else:
+        if is_error:
             return True
-        game_state.add_card_to_discard_pile(self)
+        infected_organ.remove_virus()
+        infected_organ.reset_wild_card()  # like a cured organ, a wild organ is wild again once its virus left
+
+    def finish_play(self, game_state: 'GameState') -> None:
+        game_state.add_card_to_discard_pile(self)  # once, however many viruses the play spread
 
     def can_be_played(self, game_state: 'GameState', owner: 'Player') -> bool:
         infected_organs = [organ for organ in owner.body if organ.state == OrganState.INFECTED]
@@ -242,6 +328,8 @@ class Contagion(TreatmentCard):
 
 
 class Transplant(TreatmentCard):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__(TreatmentName.TRANSPLANT)
 
@@ -249,9 +337,19 @@ class Transplant(TreatmentCard):
         target = move.opponent
         stolen_organ = move.opponent_organ
         given_organ = move.player_organ
+        if OrganState.IMMUNISED in (stolen_organ.state, given_organ.state):
+            return True
+        # after the swap neither body may hold two organs of the same color (nor two organs of one original color)
+        if (owner.organs_by_color.get(stolen_organ.color, given_organ) is not given_organ
+                or target.organs_by_color.get(given_organ.color, stolen_organ) is not stolen_organ):
+            return True
+        if stolen_organ.original_color != given_organ.original_color and (
+                _has_organ_slot(owner, stolen_organ.original_color)
+                or _has_organ_slot(target, given_organ.original_color)):
+            return True
         target.remove_organ_from_body(stolen_organ)
+        owner.remove_organ_from_body(given_organ)  # remove both organs first so organs of the same color can be swapped
         owner.add_organ_to_body(stolen_organ)
-        owner.remove_organ_from_body(given_organ)
         target.add_organ_to_body(given_organ)
         game_state.add_card_to_discard_pile(self)
 
@@ -271,17 +369,21 @@ class Transplant(TreatmentCard):
         chosen_player_organ = player.get_organ_by_color(chosen_player_color)
         chosen_opponent_organ = chosen_opponent.get_organ_by_color(chosen_opponent_color)
         # TODO: move the validation logic to play() or separate CardValidator class
-        if chosen_player_organ and chosen_opponent_organ and chosen_player_organ.state < OrganState.IMMUNISED and chosen_opponent_organ.state < OrganState.IMMUNISED and chosen_opponent_organ.color not in player.organ_colors and chosen_player_organ.color not in chosen_opponent.organ_colors:
+        if chosen_player_organ and chosen_opponent_organ and chosen_player_organ.state < OrganState.IMMUNISED and chosen_opponent_organ.state < OrganState.IMMUNISED and not player.has_organ_color(chosen_opponent_organ.color) and not chosen_opponent.has_organ_color(chosen_player_organ.color):
             return [Move(opponent=chosen_opponent, player_organ=chosen_player_organ,
                          opponent_organ=chosen_opponent_organ)]
 
 
 class MedicalError(TreatmentCard):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__(TreatmentName.MEDICAL_ERROR)
 
     def play(self, game_state: 'GameState', owner: 'Player', move: 'Move') -> bool:
         target = move.opponent
+        if not owner.body and not target.body:
+            return True
         owner.body, target.body = target.body, owner.body
         game_state.add_card_to_discard_pile(self)
 
@@ -297,6 +399,8 @@ class MedicalError(TreatmentCard):
 
 
 class LatexGlove(TreatmentCard):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__(TreatmentName.LATEX_GLOVE)
 
@@ -304,7 +408,7 @@ class LatexGlove(TreatmentCard):
         opponents = game_state.get_opponents(owner)
         for opponent in opponents:
             while opponent.hand:
-                card = opponent.hand.pop()
+                card = opponent.pop_hand_card()
                 game_state.add_card_to_discard_pile(card)
         game_state.add_card_to_discard_pile(self)
 
@@ -1,53 +1,105 @@
 import random
+from typing import List, Optional
 
 from game.game_constants import GameConstants
 from models.cards import Card, Organ, Virus, Medicine, MedicalError, Contagion, LatexGlove, OrganThief, Transplant
 from enums import CardColor
+from game.zobrist import DECK_KEYS, DISCARD_PILE_KEYS
+
+
+def _create_shared_cards() -> List[Card]:
+    cards = []
+    for card_type, num_wild, num_colored in ((Virus, GameConstants.NUM_WILD_VIRUSES, GameConstants.NUM_COLORED_VIRUSES),
+                                             (Medicine, GameConstants.NUM_WILD_MEDICINES,
+                                              GameConstants.NUM_COLORED_MEDICINES)):
+        cards += [card_type(CardColor.WILD) for _ in range(num_wild)]
+        for color in (CardColor.RED, CardColor.GREEN, CardColor.BLUE, CardColor.YELLOW):
+            cards += [card_type(color) for _ in range(num_colored)]
+    cards += [Contagion() for _ in range(GameConstants.NUM_CONTAGIONS)]
+    cards += [OrganThief() for _ in range(GameConstants.NUM_ORGAN_THIEVES)]
+    cards += [Transplant() for _ in range(GameConstants.NUM_TRANSPLANTS)]
+    cards += [LatexGlove() for _ in range(GameConstants.NUM_LATEX_GLOVES)]
+    cards += [MedicalError() for _ in range(GameConstants.NUM_MEDICAL_ERRORS)]
+    return cards
+
+
+# Viruses, medicines and treatments never change during a game, so every deck holds the same instances of them
+# (identical cards are still distinct objects within a deck). Only the organs, which carry their attached cards, color
+# and state, belong to a single deck.
+SHARED_CARDS = _create_shared_cards()
 
 
 class Deck:
-    def __init__(self):
-        self.cards: list[Card] = []
-        self.discard_pile: list[Card] = []
+    def __init__(self, rng: Optional[random.Random] = None):
+        self.rng = rng if rng is not None else random.Random()
+        self.organs: List[Organ] = []
+        self.all_cards: List[Card] = []
         self._create_cards()
+        self.cards: List[Card] = list(self.all_cards)
+        self.discard_pile: List[Card] = []
+        self.shuffle()
+        # Zobrist hash of the contents (not the order) of the deck and the discard pile, reduced modulo 2**64 only by
+        # GameState.zobrist_hash
+        self.zobrist_hash = sum(DECK_KEYS[card.name] for card in self.cards)
+
+    def reset(self, rng: random.Random) -> None:
+        """Reuse the deck for a new game: every card back in the deck, shuffled by ``rng`` exactly like a new deck."""
+        for organ in self.organs:
+            organ.reset()
+        self.rng = rng
+        self.cards[:] = self.all_cards
+        self.discard_pile = []
         self.shuffle()
+        self.zobrist_hash = sum(DECK_KEYS[card.name] for card in self.cards)
 
     def shuffle(self) -> None:
-        random.shuffle(self.cards)
+        self.rng.shuffle(self.cards)
 
     def refill_deck(self):
         self.cards = self.discard_pile[::-1]
         self.discard_pile = []
+        self.zobrist_hash = sum(DECK_KEYS[card.name] for card in self.cards)
 
     def draw_card(self) -> Card:
         if not self.cards:
             self.refill_deck()
         card = self.cards.pop()
+        self.zobrist_hash -= DECK_KEYS[card.name]
         # print('drawing', card)
         return card
 
     def discard(self, card: Card) -> None:
         # print('discarding', card)
         self.discard_pile.append(card)
+        self.zobrist_hash += DISCARD_PILE_KEYS[card.name]
+
+    def truncate_discard_pile(self, size: int) -> None:
+        for card in self.discard_pile[size:]:
+            self.zobrist_hash -= DISCARD_PILE_KEYS[card.name]
+        del self.discard_pile[size:]
 
     def _create_cards(self) -> None:
-        self.cards += [Organ(CardColor.WILD) for _ in range(GameConstants.NUM_WILD_ORGANS)]
-        self.cards += [Organ(CardColor.RED) for _ in range(GameConstants.NUM_COLORED_ORGANS)]
-        self.cards += [Organ(CardColor.GREEN) for _ in range(GameConstants.NUM_COLORED_ORGANS)]
-        self.cards += [Organ(CardColor.BLUE) for _ in range(GameConstants.NUM_COLORED_ORGANS)]
-        self.cards += [Organ(CardColor.YELLOW) for _ in range(GameConstants.NUM_COLORED_ORGANS)]
-        self.cards += [Virus(CardColor.WILD) for _ in range(GameConstants.NUM_WILD_VIRUSES)]
-        self.cards += [Virus(CardColor.RED) for _ in range(GameConstants.NUM_COLORED_VIRUSES)]
-        self.cards += [Virus(CardColor.GREEN) for _ in range(GameConstants.NUM_COLORED_VIRUSES)]
-        self.cards += [Virus(CardColor.BLUE) for _ in range(GameConstants.NUM_COLORED_VIRUSES)]
-        self.cards += [Virus(CardColor.YELLOW) for _ in range(GameConstants.NUM_COLORED_VIRUSES)]
-        self.cards += [Medicine(CardColor.WILD) for _ in range(GameConstants.NUM_WILD_MEDICINES)]
-        self.cards += [Medicine(CardColor.RED) for _ in range(GameConstants.NUM_COLORED_MEDICINES)]
-        self.cards += [Medicine(CardColor.GREEN) for _ in range(GameConstants.NUM_COLORED_MEDICINES)]
-        self.cards += [Medicine(CardColor.BLUE) for _ in range(GameConstants.NUM_COLORED_MEDICINES)]
-        self.cards += [Medicine(CardColor.YELLOW) for _ in range(GameConstants.NUM_COLORED_MEDICINES)]
-        self.cards += [Contagion() for _ in range(GameConstants.NUM_CONTAGIONS)]
-        self.cards += [OrganThief() for _ in range(GameConstants.NUM_ORGAN_THIEVES)]
-        self.cards += [Transplant() for _ in range(GameConstants.NUM_TRANSPLANTS)]
-        self.cards += [LatexGlove() for _ in range(GameConstants.NUM_LATEX_GLOVES)]
-        self.cards += [MedicalError() for _ in range(GameConstants.NUM_MEDICAL_ERRORS)]
+        self.organs += [Organ(CardColor.WILD) for _ in range(GameConstants.NUM_WILD_ORGANS)]
+        for color in (CardColor.RED, CardColor.GREEN, CardColor.BLUE, CardColor.YELLOW):
+            self.organs += [Organ(color) for _ in range(GameConstants.NUM_COLORED_ORGANS)]
+        self.all_cards = self.organs + SHARED_CARDS
+
+
+class DeckPool:
+    """Decks of finished games, reset in place for the next game instead of creating new cards.
+
+    A released deck must no longer be used by its game, its organs are cleared when it is acquired again.
+    """
+
+    def __init__(self):
+        self._decks: List[Deck] = []
+
+    def acquire(self, rng: random.Random) -> Deck:
+        if not self._decks:
+            return Deck(rng)
+        deck = self._decks.pop()
+        deck.reset(rng)
+        return deck
+
+    def release(self, deck: Deck) -> None:
+        self._decks.append(deck)
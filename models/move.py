@@ -1,4 +1,6 @@
 class Move:
+    __slots__ = ('opponent', 'player_organ', 'opponent_organ')
+
     def __init__(self, opponent=None, player_organ=None, opponent_organ=None):
         self.opponent = opponent
         self.player_organ = player_organ
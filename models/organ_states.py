@@ -1,129 +1,87 @@
-from abc import ABC, abstractmethod
-
-from enums import OrganState, CardColor
-
-
-class OrganStateHandler(ABC):
-    @abstractmethod
-    def apply_virus(self, organ, virus):
-        pass
-
-    @abstractmethod
-    def remove_virus(self, organ, virus):
-        pass
-
-    @abstractmethod
-    def apply_medicine(self, organ, medicine):
-        pass
-
-    @abstractmethod
-    def remove_medicine(self, organ, medicine):
-        pass
-
-    @abstractmethod
-    def on_virus_play(self, virus_card, target_organ, target_player, owner, game_state):
-        pass
-
-    @abstractmethod
-    def on_medicine_play(self, medicine_card, target_organ, game_state):
-        pass
-
-
-class HealthyStateHandler(OrganStateHandler):
-    state = OrganState.HEALTHY
-
-    def apply_virus(self, organ, virus):
-        organ.state_handler = InfectedStateHandler()
-
-    def remove_virus(self, organ, virus):
-        raise ValueError('Virus cannot be removed from healthy organ')
-
-    def apply_medicine(self, organ, medicine):
-        organ.state_handler = VaccinatedStateHandler()
-
-    def remove_medicine(self, organ, medicine):
-        raise ValueError('Medicine cannot be removed from healthy organ')
-
-    def on_virus_play(self, virus_card, target_organ, target_player, owner, game_state):
-        target_organ.add_virus(virus_card)
-        if target_organ.color == CardColor.WILD:
-            target_organ.color = virus_card.color
-
-    def on_medicine_play(self, medicine_card, target_organ, game_state):
-        target_organ.add_medicine(medicine_card)
-        if target_organ.color == CardColor.WILD:
-            target_organ.color = medicine_card.color
-
-
-class InfectedStateHandler(OrganStateHandler):
-    state = OrganState.INFECTED
-
-    def apply_virus(self, organ, virus):
-        organ.state_handler = HealthyStateHandler()  # reset to default state before discarding the organ
-
-    def remove_virus(self, organ, virus):
-        organ.state_handler = HealthyStateHandler()
-
-    def apply_medicine(self, organ, medicine):
-        organ.state_handler = HealthyStateHandler()
-
-    def remove_medicine(self, organ, medicine):
-        raise ValueError('Medicine cannot be removed from infected organ')
-
-    def on_virus_play(self, virus_card, target_organ, target_player, owner, game_state):
-        target_player.remove_organ_from_body(target_organ)
-        target_organ.discard(game_state)
-        game_state.add_card_to_discard_pile(virus_card)
-
-    def on_medicine_play(self, medicine_card, target_organ, game_state):
-        virus_card = target_organ.remove_virus()
-        game_state.add_card_to_discard_pile(virus_card)
-        game_state.add_card_to_discard_pile(medicine_card)
-        target_organ.reset_wild_card()
-
-
-class VaccinatedStateHandler(OrganStateHandler):
-    state = OrganState.VACCINATED
-
-    def apply_virus(self, organ, virus):
-        organ.state_handler = HealthyStateHandler()
-
-    def remove_virus(self, organ, virus):
-        raise ValueError('Virus cannot be removed from vaccinated organ')
-
-    def apply_medicine(self, organ, medicine):
-        organ.state_handler = ImmunisedStateHandler()
-
-    def remove_medicine(self, organ, medicine):
-        organ.state_handler = HealthyStateHandler()
-
-    def on_virus_play(self, virus_card, target_organ, target_player, owner, game_state):
-        medicine = target_organ.remove_medicine()
-        game_state.add_card_to_discard_pile(medicine)
-        game_state.add_card_to_discard_pile(virus_card)
-        target_organ.reset_wild_card()
-
-    def on_medicine_play(self, medicine_card, target_organ, game_state):
-        target_organ.add_medicine(medicine_card)
-
-
-class ImmunisedStateHandler(OrganStateHandler):
-    state = OrganState.IMMUNISED
-
-    def apply_virus(self, organ, virus):
-        raise ValueError('Virus cannot be applied on immunised organ')
-
-    def remove_virus(self, organ, virus):
-        raise ValueError('Virus cannot be removed from immunised organ')
-
-    def apply_medicine(self, organ, medicine):
-        raise ValueError('Medicine cannot be applied on immunised organ')
-
-    def remove_medicine(self, organ, medicine):
-        raise ValueError('Medicine cannot be removed from immunised organ')
-
-    def on_virus_play(self, virus_card, target_organ, target_player, owner, game_state):
-        return True
-
-    def on_medicine_play(self, medicine_card, target_organ, game_state):
+from typing import Optional
+
+from enums import CardColor, OrganState
+
+# card kinds indexing the transition table
+VIRUS, MEDICINE = 0, 1
+
+
+class OrganTransition:
+    """Effect of a virus or medicine played on an organ.
+
+    ``state`` is the state of the organ afterwards. The played card is either attached to the organ or discarded, and
+    a card lying on the organ is discarded with it when ``discard_attached`` is set. A ``destroyed`` organ leaves the
+    body of its owner for the discard pile (after its attached card, before the played one).
+    """
+    __slots__ = ('state', 'attach', 'discard_attached', 'destroyed', 'adopt_color', 'reset_wild')
+
+    def __init__(self, state: OrganState, attach: bool = False, discard_attached: bool = False,
+                 destroyed: bool = False, adopt_color: bool = False, reset_wild: bool = False):
+        self.state = state
+        self.attach = attach
+        self.discard_attached = discard_attached
+        self.destroyed = destroyed
+        self.adopt_color = adopt_color  # a wild organ takes the color of the played card
+        self.reset_wild = reset_wild  # a recolored wild organ turns wild again
+
+    def __repr__(self) -> str:
+        flags = [name for name in self.__slots__[1:] if getattr(self, name)]
+        return f"OrganTransition({self.state.name}{''.join(', ' + flag for flag in flags)})"
+
+
+def _both(transition: Optional[OrganTransition]) -> tuple:
+    return transition, transition
+
+
+# TRANSITIONS[state][card kind][organ is wild], None where the play is illegal (an immunised organ)
+TRANSITIONS = {
+    OrganState.HEALTHY: (
+        (OrganTransition(OrganState.INFECTED, attach=True),
+         OrganTransition(OrganState.INFECTED, attach=True, adopt_color=True)),
+        (OrganTransition(OrganState.VACCINATED, attach=True),
+         OrganTransition(OrganState.VACCINATED, attach=True, adopt_color=True)),
+    ),
+    OrganState.INFECTED: (
+        _both(OrganTransition(OrganState.HEALTHY, discard_attached=True, destroyed=True, reset_wild=True)),
+        _both(OrganTransition(OrganState.HEALTHY, discard_attached=True, reset_wild=True)),
+    ),
+    OrganState.VACCINATED: (
+        _both(OrganTransition(OrganState.HEALTHY, discard_attached=True, reset_wild=True)),
+        _both(OrganTransition(OrganState.IMMUNISED, attach=True)),
+    ),
+    OrganState.IMMUNISED: (
+        _both(None),
+        _both(None),
+    ),
+}
+
+# states after attaching or removing a single card outside of a play (setting up positions, discarding organs)
+VIRUS_ADDED = {OrganState.HEALTHY: OrganState.INFECTED, OrganState.INFECTED: OrganState.HEALTHY,
+               OrganState.VACCINATED: OrganState.HEALTHY}
+VIRUS_REMOVED = {OrganState.INFECTED: OrganState.HEALTHY}
+MEDICINE_ADDED = {OrganState.HEALTHY: OrganState.VACCINATED, OrganState.INFECTED: OrganState.HEALTHY,
+                  OrganState.VACCINATED: OrganState.IMMUNISED}
+MEDICINE_REMOVED = {OrganState.VACCINATED: OrganState.HEALTHY}
+
+
+def play_on_organ(card: 'ColoredCard', kind: int, organ: 'Organ', owner: Optional['BasePlayer'],
+                  game_state: 'GameState') -> Optional[bool]:
+    """Resolve ``card`` (a virus or medicine, see ``kind``) played on ``organ`` of ``owner``, True if illegal."""
+    transition = TRANSITIONS[organ.state][kind][organ.color is CardColor.WILD]
+    if transition is None:
         return True
+    if transition.destroyed:
+        owner.remove_organ_from_body(organ)
+    if transition.discard_attached:
+        game_state.add_card_to_discard_pile((organ.viruses or organ.medicines).pop())
+    elif transition.attach:
+        (organ.medicines if kind else organ.viruses).append(card)
+    if transition.destroyed:
+        game_state.add_card_to_discard_pile(organ)
+    if not transition.attach:
+        game_state.add_card_to_discard_pile(card)
+    organ.state = transition.state
+    if transition.adopt_color:
+        organ.color = card.color
+    elif transition.reset_wild:
+        organ.reset_wild_card()
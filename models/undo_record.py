@@ -0,0 +1,9 @@
+class UndoRecord:
+    def __init__(self, num_successful_moves, player_snapshots, organ_snapshots, discard_pile, discard_pile_size,
+                 move_history_size):
+        self.num_successful_moves = num_successful_moves
+        self.player_snapshots = player_snapshots
+        self.organ_snapshots = organ_snapshots
+        self.discard_pile = discard_pile
+        self.discard_pile_size = discard_pile_size
+        self.move_history_size = move_history_size
@@ -6,6 +6,7 @@ from players.random_player import RandomPlayer
 from players.neat_player import NEATPlayer
 from players.strategy_based_ai import StrategyBasedAIPlayer
 from players.rule_based_ai import RuleBasedAIPlayer
+from players.ismcts_ai import ISMCTSPlayer
 
 from typing import List
 
@@ -20,6 +21,7 @@ class PlayerFactory:
         PlayerType.NEAT_AI: NEATPlayer,
         PlayerType.STRATEGY_BASED_AI: StrategyBasedAIPlayer,
         PlayerType.RULE_BASED_AI: RuleBasedAIPlayer,
+        PlayerType.ISMCTS_AI: ISMCTSPlayer,
     }
 
     def create_player(self, player_type: PlayerType, name: str, **kwargs) -> BasePlayer:
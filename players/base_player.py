@@ -1,16 +1,35 @@
+import random
 from abc import ABC, abstractmethod
-from typing import List, Tuple
+from typing import Dict, List, Tuple
 
-from models.cards import Card, Organ
-from enums import Action, CardColor, OrganState
+from models.cards import Card, Organ, COLOR_BITS
+from game.zobrist import HAND_KEYS
+from enums import Action, CardColor, EventType, OrganState
 from game.game_state import GameState
 from models.move import Move
-from interface import presenter
 
 
 class BasePlayer(ABC):
+    # subclasses without __slots__ get a __dict__ for their own attributes (e.g. NEATPlayer.score), the common state
+    # of every player lives in the slots
+    __slots__ = ('name', 'rng', 'hand_version', 'body_version', 'organ_color_mask', 'organs_by_color', 'hand_hash',
+                 'body_hash', '_hand', '_body', 'move_history')
+    supports_compact_engine: bool = False
+
     def __init__(self, name: str):
         self.name: str = name
+        # random stream of the player's decisions, replaced by the stream of the game it is seated in
+        self.rng: random.Random = random.Random()
+        # bumped on every change of the hand/body, lets the state encoder skip unchanged sections
+        self.hand_version: int = 0
+        self.body_version: int = 0
+        # colors present in the body as a bitmask over COLOR_BITS and the organ of each color, kept in sync with body
+        self.organ_color_mask: int = 0
+        self.organs_by_color: Dict[CardColor, Organ] = {}
+        # Zobrist hashes of the hand (see game.zobrist) and the body (sum of the organs' hashes), kept in sync and
+        # reduced modulo 2**64 only by GameState.zobrist_hash
+        self.hand_hash: int = 0
+        self.body_hash: int = 0
         self.hand: List[Card] = []
         self.body: List[Organ] = []
         self.move_history: List[Tuple[Card, bool]] = []
@@ -18,9 +37,61 @@ class BasePlayer(ABC):
     def __str__(self) -> str:
         return self.name
 
+    @property
+    def hand(self) -> List[Card]:
+        return self._hand
+
+    @hand.setter
+    def hand(self, cards: List[Card]) -> None:
+        self._hand = cards
+        self.hand_hash = sum(HAND_KEYS[card.name] for card in cards)
+        self.hand_version += 1
+
+    @property
+    def body(self) -> List[Organ]:
+        return self._body
+
+    @body.setter
+    def body(self, organs: List[Organ]) -> None:
+        self._body = organs
+        self.organs_by_color.clear()
+        self.organ_color_mask = 0
+        self.body_hash = 0
+        for organ in organs:
+            organ.owner = self
+            self.body_hash += organ.zobrist_hash
+            self.organs_by_color.setdefault(organ.color, organ)
+            self.organ_color_mask |= COLOR_BITS[organ.color]
+        self.body_version += 1
+
+    def has_organ_color(self, color: CardColor) -> bool:
+        return color in self.organs_by_color
+
+    def on_organ_recolored(self, organ: Organ, old_color: CardColor) -> None:
+        self._reindex_color(old_color)
+        self._reindex_color(organ.color)
+        self.body_version += 1
+
+    def _reindex_color(self, color: CardColor) -> None:
+        for organ in self._body:
+            if organ.color == color:
+                self.organs_by_color[color] = organ
+                self.organ_color_mask |= COLOR_BITS[color]
+                return
+        self.organs_by_color.pop(color, None)
+        self.organ_color_mask &= ~COLOR_BITS[color]
+
     def remove_hand_card(self, card):
         assert card in self.hand
-        return self.hand.remove(card)
+        self.hand_version += 1
+        self.hand_hash -= HAND_KEYS[card.name]
+        return self._hand.remove(card)
+
+    def pop_hand_card(self) -> Card:
+        self.hand_version += 1
+        card = self._hand.pop()
+        self.hand_hash -= HAND_KEYS[card.name]
+        return card
 
     def get_hand_card_by_id(self, card_id):
         if card_id > len(self.hand):
@@ -34,21 +105,48 @@ class BasePlayer(ABC):
         return next((card for card in self.hand if card.type == card_type), None)
 
     def add_card_to_hand(self, card: Card) -> None:
-        if len(self.hand) >= 3:
+        if len(self._hand) >= 3:
             raise ValueError
-        self.hand.append(card)
+        self._hand.append(card)
+        self.hand_hash += HAND_KEYS[card.name]
+        self.hand_version += 1
 
     def add_organ_to_body(self, organ: Organ) -> None:
-        if organ.color in self.organ_colors:
+        if organ.color in self.organs_by_color:
             raise ValueError
         self.body.append(organ)
+        organ.owner = self
+        self.organs_by_color[organ.color] = organ
+        self.organ_color_mask |= COLOR_BITS[organ.color]
+        self.body_hash += organ.zobrist_hash
+        self.body_version += 1
 
     def remove_organ_from_body(self, organ):
         assert organ in self.body
         self.body.remove(organ)
+        organ.owner = None
+        self.body_hash -= organ.zobrist_hash
+        self._reindex_color(organ.color)
+        self.body_version += 1
+
+    def reset(self) -> None:
+        """Empty hand, body and history for the next game of the same seating, see ``GameManager.run_many``."""
+        self.hand = []
+        self.body = []
+        self.move_history = []
+
+    def snapshot(self) -> tuple:
+        return self.hand, list(self.hand), self.body, list(self.body), len(self.move_history)
+
+    def restore(self, snapshot: tuple) -> None:
+        hand, hand_cards, body, body_organs, move_history_size = snapshot
+        hand[:] = hand_cards
+        body[:] = body_organs
+        self.hand, self.body = hand, body
+        del self.move_history[move_history_size:]
 
     def get_organ_by_color(self, color):
-        return next((organ for organ in self.body if organ.color == color), None)
+        return self.organs_by_color.get(color)
 
     def get_infected_organs(self):
         return [organ for organ in self.body if organ.state == OrganState.INFECTED]
@@ -65,7 +163,8 @@ class BasePlayer(ABC):
     def discard_card(self, game_state, card_id):
         card = self.get_hand_card_by_id(card_id)
         game_state.add_card_to_discard_pile(card)
-        self.hand.remove(card)
+        self.remove_hand_card(card)
+        game_state.move_history.append((self, Action.DISCARD, [card], None))
 
     def play_card(self, game_state, card, moves):
         if not card or not moves:
@@ -79,19 +178,19 @@ class BasePlayer(ABC):
             self.move_history.append((card.name, is_error))
         if num_successful_moves:
             self.remove_hand_card(card)
-            presenter.print_card_play_status_success()
-        else:
-            presenter.print_card_play_status_fail()
+            card.finish_play(game_state)
+            game_state.move_history.append((self, Action.PLAY, card, moves))
         return num_successful_moves
 
     def take_turn(self, game_state) -> bool:
         action = self.decide_action(game_state)
         assert action is not None
-        presenter.print_decision(action.name)
+        game_state.events.emit(EventType.DECISION, action)
         if action == Action.PLAY:
             card, moves = self.prepare_moves(game_state)
-            presenter.print_card(card)
+            game_state.events.emit(EventType.CARD, card)
             num_successful_moves = self.play_card(game_state, card, moves)
+            game_state.events.emit(EventType.CARD_PLAY_STATUS, bool(num_successful_moves))
             if not num_successful_moves:
                 return True
         elif action == Action.DISCARD:
@@ -106,10 +205,13 @@ class BasePlayer(ABC):
         sorted_ids = sorted(card_ids, reverse=True)
         if not card_ids:
             return True
+        discarded_cards = []
         for card_id in sorted_ids:
             hand_card = self.get_hand_card_by_id(card_id)
             self.remove_hand_card(hand_card)
             game_state.add_card_to_discard_pile(hand_card)
+            discarded_cards.append(hand_card)
+        game_state.move_history.append((self, Action.DISCARD, discarded_cards, None))
 
     @abstractmethod
     def decide_action(self, game_state: GameState) -> Action:
@@ -130,6 +232,9 @@ class BasePlayer(ABC):
     def decide_cards_to_discard_indices(self, game_state: GameState) -> List[int]:
         pass
 
+    def decide_compact_move(self, game_state: 'CompactGameState') -> tuple:
+        raise NotImplementedError(f"{type(self).__name__} cannot play on the compact engine")
+
     def prepare_moves(self, game_state) -> tuple[Card, Move] | tuple[Card, list[Move]]:
         card_id = self.decide_card_to_play_index(game_state)
         card = self.get_hand_card_by_id(card_id)
@@ -0,0 +1,113 @@
+import os
+from typing import List, Optional
+
+from enums import Action, CardColor, SearchParallelism, EventType
+from game.compact_game_state import CompactGameState, DISCARD, object_move_key, object_play
+from game.game_state import GameState
+from models.cards import Card
+from players import BasePlayer
+from players.ismcts_ai.information_set import InformationSet, discard_indices
+from players.ismcts_ai.parallel import LeafParallelISMCTS, root_parallel_search
+from players.ismcts_ai.search import ISMCTS, Node, keyed_moves
+
+
+class ISMCTSPlayer(BasePlayer):
+    """Information set MCTS player searching on the compact engine.
+
+    Each decision runs ``iterations`` iterations and/or searches for ``time_limit`` seconds (whichever ends first)
+    on determinizations of the current player's view. On the object engine the subtree reached through the moves
+    recorded in ``GameState.move_history`` since the last decision is kept as the new root.
+
+    ``parallel`` spreads the search over ``num_workers`` processes (all cores by default):
+
+    * ``SearchParallelism.ROOT`` searches an independent tree per worker and plays the move with the most visits
+      summed over the trees; ``iterations`` is the total over the workers, ``time_limit`` applies to each of them
+      and the trees are not reused,
+    * ``SearchParallelism.LEAF`` keeps a single tree here and runs the rollouts of ``leaf_batch_size`` leaves at a
+      time in the workers.
+    """
+    supports_compact_engine = True
+
+    def __init__(self, name: str, iterations: Optional[int] = 500, time_limit: Optional[float] = None,
+                 exploration: float = 0.7, rollout_turns: int = 12, reuse_tree: bool = True,
+                 parallel: Optional[SearchParallelism] = None, num_workers: Optional[int] = None,
+                 leaf_batch_size: int = 32):
+        super().__init__(name)
+        self.iterations = iterations
+        self.time_limit = time_limit
+        self.exploration = exploration
+        self.rollout_turns = rollout_turns
+        self.reuse_tree = reuse_tree and parallel != SearchParallelism.ROOT
+        self.parallel = parallel
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.leaf_batch_size = leaf_batch_size
+        self.last_iterations = 0
+        self._root: Optional[Node] = None
+        self._history_size = 0
+        self._history = None
+
+    def search(self, state: CompactGameState, root: Node) -> tuple:
+        """Key (see ``search.move_key``) of the most visited move of the current player of ``state``."""
+        information_set = InformationSet(state, self.rng)
+        if self.parallel == SearchParallelism.ROOT:
+            visits, self.last_iterations = root_parallel_search(state, self.rng, self.num_workers, self.iterations,
+                                                                self.time_limit, self.exploration, self.rollout_turns)
+        else:
+            if self.parallel == SearchParallelism.LEAF:
+                search = LeafParallelISMCTS(self.rng, self.num_workers, self.leaf_batch_size,
+                                            exploration=self.exploration, rollout_turns=self.rollout_turns)
+            else:
+                search = ISMCTS(self.rng, exploration=self.exploration, rollout_turns=self.rollout_turns)
+            self.last_iterations = search.run(root, information_set.sample, self.iterations, self.time_limit)
+            visits = {key: child.visits for key, child in root.children.items()}
+        moves = keyed_moves(information_set.view)
+        return max(moves, key=lambda key: visits.get(key, -1))
+
+    def take_turn(self, game_state: GameState) -> bool:
+        root = self._reused_root(game_state)
+        key = self.search(CompactGameState.from_game_state(game_state), root)
+        self._root = root
+        self._history = game_state.move_history
+        self._history_size = len(game_state.move_history)
+
+        if key[0] == DISCARD:
+            game_state.events.emit(EventType.DECISION, Action.DISCARD)
+            return self.discard_cards(game_state, discard_indices(self, key))
+        card, moves = object_play(game_state, self, key)
+        game_state.events.emit(EventType.DECISION, Action.PLAY)
+        game_state.events.emit(EventType.CARD, card)
+        num_successful_moves = self.play_card(game_state, card, moves)
+        game_state.events.emit(EventType.CARD_PLAY_STATUS, bool(num_successful_moves))
+
+    def decide_compact_move(self, game_state: CompactGameState) -> tuple:
+        key = self.search(game_state, Node(-1))
+        return keyed_moves(game_state)[key]
+
+    def reset(self) -> None:
+        super().reset()
+        self._root = self._history = None
+        self._history_size = 0
+
+    def _reused_root(self, game_state: GameState) -> Node:
+        node = self._root
+        if not self.reuse_tree or node is None or self._history is not game_state.move_history:
+            return Node(-1)
+        for history_entry in game_state.move_history[self._history_size:]:
+            node = node.children.get(object_move_key(game_state, history_entry))
+            if node is None or node.player_index != game_state.players.index(history_entry[0]):
+                return Node(-1)
+        node.parent = None
+        return node
+
+    # the search decides whole moves, the single decisions are not used
+    def decide_action(self, game_state: GameState) -> Action:
+        pass
+
+    def decide_opponent(self, game_state: GameState, card: Card) -> BasePlayer:
+        pass
+
+    def decide_organ_color(self, game_state: GameState, opponent_body=None) -> CardColor:
+        pass
+
+    def decide_cards_to_discard_indices(self, game_state: GameState) -> List[int]:
+        pass
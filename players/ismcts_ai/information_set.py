@@ -0,0 +1,44 @@
+import random
+from typing import List
+
+from game.compact_game_state import CompactGameState, card_code
+
+
+class InformationSet:
+    """What the current player of a compact state knows: everything but the other hands and the deck order.
+
+    ``sample`` deals the hidden cards at random into the other hands and the deck, giving one determinization.
+    """
+
+    def __init__(self, state: CompactGameState, rng: random.Random):
+        self.rng = rng
+        self.view = state.copy()
+        self.player_index = state.current_player_index
+        self.hidden = bytearray(state.deck)
+        self.hand_sizes = []
+        for player_index, hand in enumerate(self.view.hands):
+            if player_index != self.player_index:
+                self.hidden += hand
+                self.hand_sizes.append((player_index, len(hand)))
+                hand.clear()
+        self.view.deck = bytearray()
+
+    def sample(self) -> CompactGameState:
+        state = self.view.copy()
+        cards = self.hidden[:]
+        self.rng.shuffle(cards)
+        start = 0
+        for player_index, hand_size in self.hand_sizes:
+            state.hands[player_index] = cards[start:start + hand_size]
+            start += hand_size
+        state.deck = cards[start:]
+        return state
+
+
+def discard_indices(player: 'BasePlayer', key: tuple) -> List[int]:
+    codes = [card_code(card) for card in player.hand]
+    indices = []
+    for code in key[1]:
+        index = next(i for i, hand_code in enumerate(codes) if hand_code == code and i not in indices)
+        indices.append(index)
+    return indices
@@ -0,0 +1,111 @@
+import atexit
+import random
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from game.compact_game_state import CompactGameState
+from players.ismcts_ai.information_set import InformationSet
+from players.ismcts_ai.search import ISMCTS, Node
+
+# worker pools are expensive to start, so they live for the whole process and are shared by all players
+_executors: Dict[int, ProcessPoolExecutor] = {}
+
+
+def get_executor(num_workers: int) -> ProcessPoolExecutor:
+    executor = _executors.get(num_workers)
+    if executor is None:
+        executor = _executors[num_workers] = ProcessPoolExecutor(max_workers=num_workers)
+    return executor
+
+
+@atexit.register
+def shutdown_executors() -> None:
+    for executor in _executors.values():
+        executor.shutdown(cancel_futures=True)
+    _executors.clear()
+
+
+def _search_tree(data: bytes, seed: int, iterations: Optional[int], time_limit: Optional[float],
+                 exploration: float, rollout_turns: int) -> Tuple[Dict[tuple, int], int]:
+    rng = random.Random(seed)
+    root = Node(-1)
+    search = ISMCTS(rng, exploration=exploration, rollout_turns=rollout_turns)
+    num_iterations = search.run(root, InformationSet(CompactGameState.from_bytes(data, rng), rng).sample,
+                                iterations, time_limit)
+    return {key: child.visits for key, child in root.children.items()}, num_iterations
+
+
+def root_parallel_search(state: CompactGameState, rng: random.Random, num_workers: int, iterations: Optional[int],
+                         time_limit: Optional[float], exploration: float = 0.7,
+                         rollout_turns: int = 12) -> Tuple[Dict[tuple, int], int]:
+    """Search independent trees of the current player of ``state`` in ``num_workers`` processes.
+
+    Every worker gets the packed state (``CompactGameState.to_bytes``) and its own seed, runs its share of the
+    iterations (or the whole ``time_limit``) and sends back only the visit counts of the root moves, which are
+    summed here. Returns the merged visit counts per move key and the total number of iterations.
+    """
+    if iterations is None and time_limit is None:
+        raise ValueError("The search needs an iteration or time budget")
+    executor = get_executor(num_workers)
+    data = state.to_bytes()
+    if iterations is None:
+        shares = [None] * num_workers
+    else:
+        shares = [iterations // num_workers + (i < iterations % num_workers) for i in range(num_workers)]
+    futures = [executor.submit(_search_tree, data, rng.getrandbits(64), share, time_limit, exploration, rollout_turns)
+               for share in shares if share != 0]
+    visits = {}
+    num_iterations = 0
+    for future in futures:
+        tree_visits, tree_iterations = future.result()
+        for key, key_visits in tree_visits.items():
+            visits[key] = visits.get(key, 0) + key_visits
+        num_iterations += tree_iterations
+    return visits, num_iterations
+
+
+def _rollouts(states: List[bytes], seed: int, rollout_turns: int) -> List[List[float]]:
+    rng = random.Random(seed)
+    search = ISMCTS(rng, rollout_turns=rollout_turns)
+    return [search.rollout(CompactGameState.from_bytes(data, rng)) for data in states]
+
+
+class LeafParallelISMCTS(ISMCTS):
+    """ISMCTS keeping one tree in this process and running the rollouts of a batch of leaves in worker processes.
+
+    Each step descends ``batch_size`` times, adding a virtual loss (a visit without reward) along every path so
+    that the descents spread over different leaves, then sends the packed leaf states to the workers in one chunk
+    per worker and backs the rewards up when they come back.
+    """
+
+    def __init__(self, rng: random.Random, num_workers: int, batch_size: int = 32, exploration: float = 0.7,
+                 rollout_turns: int = 12):
+        super().__init__(rng, exploration=exploration, rollout_turns=rollout_turns)
+        self.num_workers = num_workers
+        self.batch_size = batch_size
+
+    def step(self, root: Node, sample: Callable[[], CompactGameState], max_iterations: Optional[int]) -> int:
+        batch_size = self.batch_size if max_iterations is None else min(self.batch_size, max_iterations)
+        leaves = []
+        for _ in range(batch_size):
+            state = sample()
+            path, winner = self.descend(root, state)
+            if winner is None:
+                for node in path:
+                    node.visits += 1
+                leaves.append((path, state.to_bytes()))
+            else:
+                self.backup(path, self._win_rewards(state, winner))
+
+        executor = get_executor(self.num_workers)
+        chunk_size = max(1, -(-len(leaves) // self.num_workers))
+        futures = [(leaves[start:start + chunk_size],
+                    executor.submit(_rollouts, [data for _, data in leaves[start:start + chunk_size]],
+                                    self.rng.getrandbits(64), self.rollout_turns))
+                   for start in range(0, len(leaves), chunk_size)]
+        for chunk, future in futures:
+            for (path, _), rewards in zip(chunk, future.result()):
+                for node in path:
+                    node.visits -= 1
+                self.backup(path, rewards)
+        return batch_size
@@ -0,0 +1,156 @@
+import math
+import random
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from game.compact_game_state import CompactGameState, DISCARD, DISCARD_MOVES, HEALTHY, NUM_COLORS, PLAY
+from game.game_constants import GameConstants
+
+
+def move_key(state: CompactGameState, move: tuple) -> tuple:
+    """Move as every player observes it: the hand indices of a compact move replaced by the face codes of the cards.
+
+    Moves with equal keys are the same decision in every determinization, so they share a node of the tree.
+    """
+    hand = state.hands[state.current_player_index]
+    if move[0] == DISCARD:
+        return DISCARD, tuple(sorted(hand[i] for i in move[1]))
+    return (PLAY, hand[move[1]]) + move[2:]
+
+
+def keyed_moves(state: CompactGameState) -> Dict[tuple, tuple]:
+    return {move_key(state, move): move for move in state.legal_moves()}
+
+
+class Node:
+    def __init__(self, player_index: int, key: Optional[tuple] = None, parent: Optional['Node'] = None):
+        self.player_index = player_index  # player who made the move leading to this node
+        self.key = key
+        self.parent = parent
+        self.children: Dict[tuple, Node] = {}
+        self.visits = 0
+        # number of iterations in which the move was legal, replaces the parent visits in UCB
+        self.availability = 0
+        self.reward = 0.
+
+    def ucb(self, exploration: float) -> float:
+        return self.reward / self.visits + exploration * math.sqrt(math.log(self.availability) / self.visits)
+
+
+class ISMCTS:
+    """Single observer information set Monte Carlo tree search on the compact engine.
+
+    Every iteration samples a determinization (a compact state with the hidden cards dealt at random), descends the
+    tree through the moves legal in it, expands one new move, continues with random legal plays for at most
+    ``rollout_turns`` turns and backs the result up. Nodes are keyed by ``move_key`` and store the reward of the
+    player who made the move, so the same tree handles any number of players.
+    """
+
+    def __init__(self, rng: random.Random, exploration: float = 0.7, rollout_turns: int = 12):
+        self.rng = rng
+        self.exploration = exploration
+        self.rollout_turns = rollout_turns
+
+    def run(self, root: Node, sample: Callable[[], CompactGameState], iterations: Optional[int] = None,
+            time_limit: Optional[float] = None) -> int:
+        """Run iterations until the iteration count or the wall-clock limit (seconds) is reached."""
+        if iterations is None and time_limit is None:
+            raise ValueError("The search needs an iteration or time budget")
+        deadline = None if time_limit is None else time.perf_counter() + time_limit
+        num_iterations = 0
+        while iterations is None or num_iterations < iterations:
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            num_iterations += self.step(root, sample, None if iterations is None else iterations - num_iterations)
+        return num_iterations
+
+    def step(self, root: Node, sample: Callable[[], CompactGameState], max_iterations: Optional[int]) -> int:
+        """Run at least one and at most ``max_iterations`` (when given) iterations, return how many were run."""
+        self.iterate(root, sample())
+        return 1
+
+    def iterate(self, root: Node, state: CompactGameState) -> None:
+        path, winner = self.descend(root, state)
+        self.backup(path, self.rollout(state) if winner is None else self._win_rewards(state, winner))
+
+    def descend(self, root: Node, state: CompactGameState) -> Tuple[List[Node], Optional[int]]:
+        """Walk down from the root playing the moves on ``state`` until a node is expanded or the game is won.
+
+        Returns the visited nodes and the winner (``None`` if the game goes on).
+        """
+        node = root
+        path = [root]
+        winner = None
+        expanded = False
+        while winner is None and not expanded:
+            self._skip_empty_hands(state)
+            moves = keyed_moves(state)
+            children = node.children
+            for key in moves:
+                if key in children:
+                    children[key].availability += 1
+            untried = [key for key in moves if key not in children]
+            if untried:
+                key = self.rng.choice(untried)
+                child = children[key] = Node(state.current_player_index, key, node)
+                child.availability = 1
+                expanded = True
+            else:
+                exploration = self.exploration
+                child = max((children[key] for key in moves), key=lambda candidate: candidate.ucb(exploration))
+            path.append(child)
+            node = child
+            winner = self._play(state, moves[child.key])
+        return path, winner
+
+    @staticmethod
+    def backup(path: List[Node], rewards: List[float]) -> None:
+        for node in path:
+            node.visits += 1
+            if node.player_index >= 0:
+                node.reward += rewards[node.player_index]
+
+    def rollout(self, state: CompactGameState) -> List[float]:
+        rng = self.rng
+        for _ in range(self.rollout_turns):
+            player_index = state.current_player_index
+            hand = state.hands[player_index]
+            if hand:
+                plays = state.legal_plays()
+                state.apply_move(rng.choice(plays) if plays else rng.choice(DISCARD_MOVES[len(hand)]))
+                if state.check_win_condition(player_index):
+                    return self._win_rewards(state, player_index)
+            state.complete_hand(player_index)
+            state.next_player()
+        return self._evaluate(state)
+
+    def _play(self, state: CompactGameState, move: tuple) -> Optional[int]:
+        player_index = state.current_player_index
+        state.apply_move(move)
+        if state.check_win_condition(player_index):
+            return player_index
+        state.complete_hand(player_index)
+        state.next_player()
+
+    def _skip_empty_hands(self, state: CompactGameState) -> None:
+        # a player whose hand was discarded by a latex glove only draws
+        for _ in range(state.num_players):
+            player_index = state.current_player_index
+            if state.hands[player_index]:
+                return
+            state.complete_hand(player_index)
+            state.next_player()
+
+    @staticmethod
+    def _win_rewards(state: CompactGameState, winner: int) -> List[float]:
+        return [1. if player_index == winner else 0. for player_index in range(state.num_players)]
+
+    @staticmethod
+    def _evaluate(state: CompactGameState) -> List[float]:
+        # unfinished rollout: half a win at most, in proportion to the organs that count for the win
+        rewards = []
+        for player_index in range(state.num_players):
+            base = player_index * NUM_COLORS
+            organs = sum(1 for organ_state in state.states[base:base + NUM_COLORS] if organ_state >= HEALTHY)
+            rewards.append(0.5 * organs / GameConstants.NUM_HEALTHY_ORGANS_TO_WIN)
+        return rewards
@@ -5,9 +5,9 @@ import os
 from typing import List
 
 from players import BasePlayer
-from enums import Action, CardColor
+from enums import Action, CardColor, EventType
 from game.game_state import GameState
-from interface import presenter
+from players.neat_player.compiled_network import CompiledNetwork
 
 
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -26,10 +26,15 @@ def get_best_genome():
 
 
 class NEATPlayer(BasePlayer):
-    def __init__(self, name: str, genome=None, config=neat_config):
+    def __init__(self, name: str, genome=None, config=neat_config, compiled: bool = False, net=None):
         super().__init__(name)
-        self.genome = get_best_genome() if genome is None else genome
-        self.net = neat.nn.FeedForwardNetwork.create(self.genome, config)
+        self.genome = get_best_genome() if genome is None and net is None else genome
+        if net is not None:
+            self.net = net
+        elif compiled:
+            self.net = CompiledNetwork.create(self.genome, config)
+        else:
+            self.net = neat.nn.FeedForwardNetwork.create(self.genome, config)
 
         self.action_index = 0
         self.card_index = self.action_index + 2
@@ -40,57 +45,70 @@ class NEATPlayer(BasePlayer):
 
         self.score = 0
 
+        self._activation_key = None
+        self._output_arr = None
+
+    def activate(self, game_state: GameState) -> List[float]:
+        """Network output for the current observation, evaluated once per state version and shared by all heads."""
+        inputs = game_state.get_state_array_view()
+        activation_key = (game_state.encoder, game_state.encoder.version)
+        if activation_key != self._activation_key:
+            self._output_arr = self.net.activate(inputs)
+            self._activation_key = activation_key
+        return self._output_arr
+
+    def prime_activation(self, game_state: GameState, output_arr: List[float]) -> None:
+        """Store an output computed elsewhere (e.g. in a batch) for the current observation."""
+        game_state.get_state_array_view()
+        self._activation_key = (game_state.encoder, game_state.encoder.version)
+        self._output_arr = output_arr
+
     def decide_action(self, game_state: GameState) -> Action:
-        inputs = game_state.get_state_array_for_ai()
-        output_arr = self.net.activate(inputs)
-        presenter.print_output_array(output_arr)
+        output_arr = self.activate(game_state)
+        game_state.events.emit(EventType.NETWORK_OUTPUT, output_arr)
 
         subset_arr = output_arr[self.action_index: self.action_index + 2]
-        presenter.print_subset_array(subset_arr)
+        game_state.events.emit(EventType.NETWORK_SUBSET, subset_arr)
         actions = list(Action)
         action_index = subset_arr.index(max(subset_arr))
         return actions[action_index]
 
     def decide_card_to_play_index(self, game_state: GameState) -> int:
-        inputs = game_state.get_state_array_for_ai()
-        output_arr = self.net.activate(inputs)
-        presenter.print_output_array(output_arr)
+        output_arr = self.activate(game_state)
+        game_state.events.emit(EventType.NETWORK_OUTPUT, output_arr)
 
         subset_arr = output_arr[self.card_index: self.card_index + 3]
         card_index = subset_arr.index(max(subset_arr))
         return card_index
 
     def decide_cards_to_discard_indices(self, game_state: GameState) -> List[int]:
-        inputs = game_state.get_state_array_for_ai()
-        output_arr = self.net.activate(inputs)
-        presenter.print_output_array(output_arr)
+        output_arr = self.activate(game_state)
+        game_state.events.emit(EventType.NETWORK_OUTPUT, output_arr)
 
         subset_arr = output_arr[self.discard_count_index: self.discard_count_index + 3]
-        presenter.print_subset_array(subset_arr)
+        game_state.events.emit(EventType.NETWORK_SUBSET, subset_arr)
         discard_count = subset_arr.index(max(subset_arr)) + 1
 
         subset_arr = output_arr[self.discard_index: self.discard_index + 3]
-        presenter.print_subset_array(subset_arr)
+        game_state.events.emit(EventType.NETWORK_SUBSET, subset_arr)
         discard_indices = sorted(range(len(subset_arr)), key=lambda i: subset_arr[i], reverse=True)[:discard_count]
         return discard_indices
 
     def decide_opponent(self, game_state: GameState, card) -> BasePlayer:
-        inputs = game_state.get_state_array_for_ai()
-        output_arr = self.net.activate(inputs)
-        presenter.print_output_array(output_arr)
+        output_arr = self.activate(game_state)
+        game_state.events.emit(EventType.NETWORK_OUTPUT, output_arr)
 
         opponents = game_state.get_opponents(self)
 
         subset_arr = output_arr[self.opponent_index: self.opponent_index + len(opponents)]
-        presenter.print_subset_array(subset_arr)
+        game_state.events.emit(EventType.NETWORK_SUBSET, subset_arr)
 
         opponent_index = subset_arr.index(max(subset_arr))
         return opponents[opponent_index]
 
     def decide_organ_color(self, game_state: GameState, opponent_body=None) -> CardColor:
-        inputs = game_state.get_state_array_for_ai()
-        output_arr = self.net.activate(inputs)
-        presenter.print_output_array(output_arr)
+        output_arr = self.activate(game_state)
+        game_state.events.emit(EventType.NETWORK_OUTPUT, output_arr)
 
         subset_arr = output_arr[self.color_index: self.color_index + len(CardColor)]
         color_index = subset_arr.index(max(subset_arr))
@@ -110,6 +128,13 @@ class NEATPlayer(BasePlayer):
         score -= (10 * self.get_infected_organs_num())
         return score
 
+    def snapshot(self) -> tuple:
+        return super().snapshot(), self.score
+
+    def restore(self, snapshot: tuple) -> None:
+        base_snapshot, self.score = snapshot
+        super().restore(base_snapshot)
+
     def add_organ_to_body(self, organ: 'Organ') -> None:
         super().add_organ_to_body(organ)
         self.score += 10
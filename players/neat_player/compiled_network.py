@@ -0,0 +1,107 @@
+from typing import List
+
+import numpy as np
+from neat.graphs import feed_forward_layers
+
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 1. / (1. + np.exp(-np.clip(5. * z, -60., 60.)))
+
+
+def _tanh(z: np.ndarray) -> np.ndarray:
+    return np.tanh(np.clip(2.5 * z, -60., 60.))
+
+
+def _relu(z: np.ndarray) -> np.ndarray:
+    return np.maximum(z, 0.)
+
+
+def _identity(z: np.ndarray) -> np.ndarray:
+    return z
+
+
+# same definitions as neat.activations
+ACTIVATIONS = {
+    'sigmoid': _sigmoid,
+    'tanh': _tanh,
+    'relu': _relu,
+    'identity': _identity,
+}
+
+
+class CompiledNetwork:
+    """Feed forward phenotype of a genome evaluated as one matrix product per layer of ``feed_forward_layers``.
+
+    Every node gets a column of a ``(batch, columns)`` value matrix - inputs first, then the layers in order - so a
+    layer reads all the columns before it and writes its own block. Outputs are the same as those of
+    ``neat.nn.FeedForwardNetwork`` up to float rounding, for one observation or for a whole batch of them.
+    """
+
+    def __init__(self, num_inputs: int, num_columns: int, layers: list, output_columns: List[int]):
+        self.num_inputs = num_inputs
+        self.num_columns = num_columns
+        self.layers = layers
+        self.output_columns = output_columns
+
+    @staticmethod
+    def create(genome, config) -> 'CompiledNetwork':
+        genome_config = config.genome_config
+        input_keys = genome_config.input_keys
+        output_keys = genome_config.output_keys
+        connections = [cg.key for cg in genome.connections.values() if cg.enabled]
+        links = {}
+        for in_node, out_node in connections:
+            links.setdefault(out_node, []).append((in_node, genome.connections[(in_node, out_node)].weight))
+
+        columns = {key: i for i, key in enumerate(input_keys)}
+        layers = []
+        for layer in feed_forward_layers(input_keys, output_keys, connections):
+            layer = sorted(layer)
+            offset = len(columns)
+            weights = np.zeros((offset, len(layer)))
+            biases = np.zeros(len(layer))
+            activations = {}
+            for j, node in enumerate(layer):
+                node_gene = genome.nodes[node]
+                if node_gene.aggregation != 'sum':
+                    raise ValueError(f"Unsupported aggregation function: {node_gene.aggregation}")
+                if node_gene.activation not in ACTIVATIONS:
+                    raise ValueError(f"Unsupported activation function: {node_gene.activation}")
+                for in_node, weight in links.get(node, []):
+                    weights[columns[in_node], j] += weight * node_gene.response
+                biases[j] = node_gene.bias
+                activations.setdefault(node_gene.activation, []).append(j)
+            for j, node in enumerate(layer):
+                columns[node] = offset + j
+            groups = [(ACTIVATIONS[name], indices if len(indices) < len(layer) else None)
+                      for name, indices in activations.items()]
+            layers.append((offset, weights, biases, groups))
+
+        # outputs that no path reaches keep the value 0 like in neat.nn.FeedForwardNetwork
+        for key in output_keys:
+            columns.setdefault(key, len(columns))
+        return CompiledNetwork(len(input_keys), len(columns), layers, [columns[key] for key in output_keys])
+
+    def activate_batch(self, inputs) -> np.ndarray:
+        """Outputs for a ``(batch, num_inputs)`` array of observations, one row per observation."""
+        inputs = np.asarray(inputs)
+        if inputs.ndim != 2 or inputs.shape[1] != self.num_inputs:
+            raise RuntimeError(f"Expected a batch of {self.num_inputs} inputs, got shape {inputs.shape}")
+
+        values = np.zeros((inputs.shape[0], self.num_columns))
+        values[:, :self.num_inputs] = inputs
+        for offset, weights, biases, groups in self.layers:
+            z = values[:, :offset] @ weights
+            z += biases
+            for activation, indices in groups:
+                if indices is None:
+                    z = activation(z)
+                else:
+                    z[:, indices] = activation(z[:, indices])
+            values[:, offset:offset + z.shape[1]] = z
+        return values[:, self.output_columns]
+
+    def activate(self, inputs) -> List[float]:
+        if len(inputs) != self.num_inputs:
+            raise RuntimeError(f"Expected {self.num_inputs} inputs, got {len(inputs)}")
+        return self.activate_batch(np.asarray(inputs).reshape(1, -1))[0].tolist()
@@ -0,0 +1,46 @@
+from typing import List, Optional
+
+import numpy as np
+
+from game.game_constants import GameConstants
+from game.game_manager import GameManager
+from players import BasePlayer
+from players.neat_player import NEATPlayer
+from players.neat_player.compiled_network import CompiledNetwork
+
+
+def play_lockstep(games: List[GameManager]) -> List[Optional[BasePlayer]]:
+    """Play object engine games side by side, one turn of each game per step, and return their winners.
+
+    Before every step the observations of all NEAT players about to move with a ``CompiledNetwork`` are stacked per
+    network and evaluated in a single ``activate_batch`` call, so players sharing a network (e.g. one genome playing
+    many games) pay for one matrix product per layer instead of one network pass per game. Games that hit
+    ``GameConstants.MAX_TURNS`` end without a winner (``None``).
+    """
+    winners = [None] * len(games)
+    active = list(range(len(games)))
+    while active:
+        pending = {}
+        for game_index in active:
+            state = games[game_index].state
+            player = state.get_current_player()
+            if isinstance(player, NEATPlayer) and isinstance(player.net, CompiledNetwork) and player.hand:
+                pending.setdefault(id(player.net), []).append((player, state, state.get_state_array_view()))
+
+        for entries in pending.values():
+            net = entries[0][0].net
+            outputs = net.activate_batch(np.array([inputs for _, _, inputs in entries], dtype=np.float32))
+            for (player, state, _), output_arr in zip(entries, outputs):
+                player.prime_activation(state, output_arr.tolist())
+
+        still_active = []
+        for game_index in active:
+            game = games[game_index]
+            winner = game.play_turn()
+            game.num_turns += 1
+            if winner:
+                winners[game_index] = winner
+            elif game.num_turns <= GameConstants.MAX_TURNS:
+                still_active.append(game_index)
+        active = still_active
+    return winners
@@ -0,0 +1,173 @@
+import multiprocessing
+import random
+from typing import List, Optional
+
+from enums import PlayerType
+from game.game_manager import GameManager, TurnLimitError
+from players import PlayerFactory
+from players.neat_player.compiled_network import CompiledNetwork
+from players.neat_player.lockstep import play_lockstep
+
+NUM_BOTS = 3
+WIN_BONUS = 50
+TOURNAMENT_GROUP_SIZE = 4
+TOURNAMENT_WIN_BONUS = 300
+
+
+def genome_seed(base_seed: int, generation: int, key) -> str:
+    # string seeds are hashed with sha512 by random.seed, so they do not depend on PYTHONHASHSEED
+    return f"{base_seed}:{generation}:{key}"
+
+
+def _run_game(player_factory: PlayerFactory, seed: Optional[str] = None):
+    try:
+        return GameManager(player_factory, rng=random.Random(seed)).run()
+    except TurnLimitError:  # score the players without a winner
+        return None
+
+
+def _bot_game(genome, config, net=None) -> tuple:
+    player_factory = PlayerFactory()
+    ai_player = player_factory.add_player(PlayerType.NEAT_AI, "AI", genome=genome, config=config, compiled=True,
+                                          net=net)
+    for i in range(NUM_BOTS):
+        player_factory.add_player(PlayerType.RULE_BASED_AI, f"Bot{i + 1}")
+    return player_factory, ai_player
+
+
+def _bot_game_fitness(ai_player, winner) -> float:
+    fitness = ai_player.get_final_score()
+    if ai_player is winner:
+        fitness += WIN_BONUS
+    return fitness
+
+
+def eval_genome(genome, config, seed: Optional[str] = None) -> float:
+    """Fitness of a genome playing one game against the rule based bots."""
+    player_factory, ai_player = _bot_game(genome, config)
+    return _bot_game_fitness(ai_player, _run_game(player_factory, seed))
+
+
+def eval_genome_games(genome, config, seeds: List[str]) -> float:
+    """Mean fitness of a genome over one game per seed against the rule based bots, played in lockstep.
+
+    The games share one compiled network, so every step evaluates the decisions of all of them in one batch.
+    """
+    net = CompiledNetwork.create(genome, config)
+    games, ai_players = [], []
+    for seed in seeds:
+        player_factory, ai_player = _bot_game(genome, config, net)
+        games.append(GameManager(player_factory, rng=random.Random(seed)))
+        ai_players.append(ai_player)
+
+    winners = play_lockstep(games)
+    return sum(_bot_game_fitness(ai_player, winner) for ai_player, winner in zip(ai_players, winners)) / len(seeds)
+
+
+def eval_group(genomes, config, seed: Optional[str] = None) -> List[float]:
+    """Fitness of every genome of a group playing one game against each other."""
+    player_factory = PlayerFactory()
+    ai_players = [player_factory.add_player(PlayerType.NEAT_AI, f"AI{j + 1}", genome=genome, config=config,
+                                            compiled=True)
+                  for j, genome in enumerate(genomes)]
+
+    winner = _run_game(player_factory, seed)
+
+    fitnesses = []
+    for player in ai_players:
+        fitness = player.get_final_score()
+        if player is winner:
+            fitness += TOURNAMENT_WIN_BONUS
+        fitnesses.append(fitness)
+    return fitnesses
+
+
+_worker_config = None
+
+
+def _init_worker(config) -> None:
+    global _worker_config
+    _worker_config = config
+
+
+def _evaluate_batch(batch, config=None):
+    config = config or _worker_config
+    results = []
+    for keys, genomes, seed, num_games in batch:
+        if len(genomes) > 1:
+            fitnesses = eval_group(genomes, config, seed)
+        elif num_games > 1:
+            fitnesses = [eval_genome_games(genomes[0], config, [f"{seed}:{i}" for i in range(num_games)])]
+        else:
+            fitnesses = [eval_genome(genomes[0], config, seed)]
+        results += zip(keys, fitnesses)
+    return results
+
+
+class ParallelGenomeEvaluator:
+    """Fitness function for ``Population.run`` that plays the games in a pool of persistent worker processes.
+
+    The workers import the engine and the bots once and receive the genomes in batches. Every game is seeded from
+    ``(base_seed, generation, genome key)`` so rerunning a training with the same seed gives the same fitnesses,
+    whatever the number of workers. With ``games_per_genome`` above one, each genome (outside of tournaments) plays
+    that many games against the bots in lockstep and gets their mean fitness.
+    """
+
+    def __init__(self, config, num_workers: Optional[int] = None, base_seed: int = 0, tournament: bool = False,
+                 batch_size: Optional[int] = None, games_per_genome: int = 1):
+        self.num_workers = num_workers or multiprocessing.cpu_count()
+        self.base_seed = base_seed
+        self.tournament = tournament
+        self.games_per_genome = games_per_genome
+        self.batch_size = batch_size
+        self.generation = 0
+        self.pool = None
+        if self.num_workers > 1:
+            self.pool = multiprocessing.Pool(self.num_workers, initializer=_init_worker, initargs=(config,))
+
+    def __call__(self, genomes, config) -> None:
+        self.evaluate(genomes, config)
+
+    def __enter__(self) -> 'ParallelGenomeEvaluator':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def evaluate(self, genomes, config) -> None:
+        genomes_by_key = dict(genomes)
+        for genome in genomes_by_key.values():
+            genome.fitness = 0
+
+        tasks = [(keys, [genomes_by_key[key] for key in keys], genome_seed(self.base_seed, self.generation, keys[0]),
+                  self.games_per_genome)
+                 for keys in self._groups(sorted(genomes_by_key))]
+        self.generation += 1
+        if not tasks:
+            return
+
+        batch_size = self.batch_size or max(1, len(tasks) // (self.num_workers * 4))
+        batches = [tasks[i:i + batch_size] for i in range(0, len(tasks), batch_size)]
+        if self.pool is None:
+            results = [_evaluate_batch(batch, config) for batch in batches]
+        else:
+            results = self.pool.map(_evaluate_batch, batches)
+
+        for batch_results in results:
+            for key, fitness in batch_results:
+                genomes_by_key[key].fitness += fitness
+
+    def _groups(self, keys: List[int]) -> List[tuple]:
+        if not self.tournament:
+            return [(key,) for key in keys]
+
+        # shuffle genomes to ensure random matchups
+        random.Random(genome_seed(self.base_seed, self.generation, 'groups')).shuffle(keys)
+        num_groups = len(keys) // TOURNAMENT_GROUP_SIZE
+        return [tuple(keys[i * TOURNAMENT_GROUP_SIZE:(i + 1) * TOURNAMENT_GROUP_SIZE]) for i in range(num_groups)]
@@ -1,26 +1,14 @@
 import neat
 import os
 import pickle
-from players import PlayerFactory
-from game.game_manager import GameManager
+import random
 from live_graph_reporter import LiveGraphReporter
-from enums import PlayerType
+from evaluation import eval_genome, eval_group, ParallelGenomeEvaluator, TOURNAMENT_GROUP_SIZE
 
 
 def eval_genomes(genomes, config):
     for genome_id, genome in genomes:
-        player_factory = PlayerFactory()
-
-        ai_player = player_factory.add_player(PlayerType.NEAT_AI, "AI", genome=genome, config=config)
-
-        for i in range(3):
-            player_factory.add_player(PlayerType.RULE_BASED_AI, f"Bot{i + 1}")
-
-        game = GameManager(player_factory)
-        winner = game.run()
-        genome.fitness = ai_player.get_final_score()
-        if ai_player is winner:
-            genome.fitness += 50
+        genome.fitness = eval_genome(genome, config)
 
 
 def eval_genomes_tournament(genomes, config):
@@ -29,41 +17,25 @@ def eval_genomes_tournament(genomes, config):
         genome.fitness = 0
 
     # Create all possible groups of 4 genomes
-    if len(genomes) < 4:
+    if len(genomes) < TOURNAMENT_GROUP_SIZE:
         return  # Not enough genomes to form a match
 
     # Shuffle genomes to ensure random matchups
-    import random
     random.shuffle(genomes)
 
-    group_size = 4
-    num_groups = len(genomes) // group_size
+    num_groups = len(genomes) // TOURNAMENT_GROUP_SIZE
 
     for i in range(num_groups):
-        group = genomes[i * group_size : (i + 1) * group_size]
-        player_factory = PlayerFactory()
-        ai_players = []
-
-        # Create 4 AI players with their genomes
-        for j, (genome_id, genome) in enumerate(group):
-            player = player_factory.add_player(PlayerType.NEAT_AI, f"AI{j + 1}", genome=genome, config=config)
-            ai_players.append((genome, player))
-
-        # Run the game
-        game = GameManager(player_factory)
-        winner = game.run()
-
-        # Assign fitness based on final score and winning bonus
-        for genome, player in ai_players:
-            genome.fitness += player.get_final_score()
-            if player is winner:
-                genome.fitness += 300
+        group = [genome for _, genome in genomes[i * TOURNAMENT_GROUP_SIZE: (i + 1) * TOURNAMENT_GROUP_SIZE]]
+        for genome, fitness in zip(group, eval_group(group, config)):
+            genome.fitness += fitness
 
 
-def run_training(cfg_path, genome_path):
+def run_training(cfg_path, genome_path, num_workers=None, seed=0):
     config = neat.Config(neat.DefaultGenome, neat.DefaultReproduction,
                          neat.DefaultSpeciesSet, neat.DefaultStagnation,
                          cfg_path)
+    random.seed(seed)
     population = neat.Population(config)
     population.add_reporter(neat.StdOutReporter(True))
     population.add_reporter(neat.StatisticsReporter())
@@ -72,7 +44,8 @@ def run_training(cfg_path, genome_path):
 
     # population = neat.Checkpointer.restore_checkpoint('neat-checkpoint-29')
 
-    winner = population.run(eval_genomes, 1000)
+    with ParallelGenomeEvaluator(config, num_workers=num_workers, base_seed=seed) as evaluator:
+        winner = population.run(evaluator, 1000)
     with open(genome_path, "wb") as f:
         pickle.dump(winner, f)
 
@@ -1,17 +1,22 @@
-import random
 from typing import List
 
 from enums import CardColor, Action
+from game.compact_game_state import DISCARD_MOVES
 from players import BasePlayer
 
+ACTIONS = tuple(Action)
+
 
 class RandomPlayer(BasePlayer):
+    __slots__ = ()
+    supports_compact_engine = True
+
     def decide_action(self, game_state) -> Action:
-        return random.choice(list(Action))
+        return self.rng.choice(ACTIONS)
 
     def decide_opponent(self, game_state, card) -> BasePlayer:
         opponents = game_state.get_opponents(self)
-        return random.choice(opponents)
+        return self.rng.choice(opponents)
 
     def decide_organ_color(self, game_state, opponent_body=None) -> CardColor:
         if opponent_body:
@@ -20,11 +25,18 @@ class RandomPlayer(BasePlayer):
             colors = [organ.color for organ in self.body]
         else:
             colors = list(CardColor)
-        return random.choice(colors)
+        return self.rng.choice(colors)
 
     def decide_card_to_play_index(self, game_state) -> int:
-        return random.randint(0, len(self.hand) - 1)
+        return self.rng.randint(0, len(self.hand) - 1)
 
     def decide_cards_to_discard_indices(self, game_state) -> List[int]:
-        num_cards = random.randint(1, len(self.hand))
-        return random.sample(range(len(self.hand)), num_cards)
+        num_cards = self.rng.randint(1, len(self.hand))
+        return self.rng.sample(range(len(self.hand)), num_cards)
+
+    def decide_compact_move(self, game_state) -> tuple:
+        if self.decide_action(game_state) == Action.PLAY:
+            plays = game_state.legal_plays()
+            if plays:
+                return self.rng.choice(plays)
+        return self.rng.choice(DISCARD_MOVES[len(game_state.hands[game_state.current_player_index])])
@@ -1,10 +1,9 @@
-from enums import CardType, TreatmentName, CardColor, OrganState, Action
+from enums import CardType, TreatmentName, CardColor, OrganState, Action, EventType
 from players.base_player import BasePlayer
 from game.game_constants import GameConstants
 from game.game_state import GameState
-from models.cards import Card
+from models.cards import Card, color_fits
 from models.move import Move
-from interface import presenter
 
 from typing import List, Tuple
 from abc import ABC, abstractmethod
@@ -35,7 +34,7 @@ class WinningMoveStrategy(CardPlayStrategy):
         if len(player_healthy_organ_states) >= 3:
 
             # check if we have the organ card of color that is not in the body
-            if card.type == CardType.ORGAN and card.color not in player.organ_colors:
+            if card.type == CardType.ORGAN and not player.has_organ_color(card.color):
                 moves_to_play.append(Move())
                 return card, moves_to_play
 
@@ -48,7 +47,7 @@ class WinningMoveStrategy(CardPlayStrategy):
                             return card, moves_to_play
 
                 # OR check if we have the medicine card of color that is in the body and if the organ is infected
-                elif card.color in player.organ_colors:
+                elif player.has_organ_color(card.color):
                     organ = player.get_organ_by_color(card.color)
                     if organ.state == OrganState.INFECTED:
                         moves_to_play.append(Move(player_organ=organ))
@@ -58,7 +57,7 @@ class WinningMoveStrategy(CardPlayStrategy):
             elif card.name == TreatmentName.ORGAN_THIEF:
                 for opponent in opponents:
                     for opponent_organ in opponent.body:
-                        if opponent_organ.color not in player.organ_colors and OrganState.HEALTHY <= opponent_organ.state < OrganState.IMMUNISED:
+                        if not player.has_organ_color(opponent_organ.color) and OrganState.HEALTHY <= opponent_organ.state < OrganState.IMMUNISED:
                             moves_to_play.append(Move(opponent=opponent, opponent_organ=opponent_organ))
                             return card, moves_to_play
 
@@ -69,8 +68,8 @@ class WinningMoveStrategy(CardPlayStrategy):
                         if OrganState.HEALTHY <= opponent_organ.state < OrganState.IMMUNISED:
                             if opponent_organ.color == CardColor.WILD:
                                 sorted_organs = sorted(player.body, key=lambda x: -len(x.viruses))
-                                if sorted_organs[0].state < opponent_organ.state and sorted_organs[
-                                    0].color not in opponent.organ_colors and opponent_organ.color not in player.organ_colors:
+                                if sorted_organs[0].state < opponent_organ.state and not opponent.has_organ_color(
+                                        sorted_organs[0].color) and not player.has_organ_color(opponent_organ.color):
                                     moves_to_play.append(Move(opponent=opponent,
                                                               player_organ=sorted_organs[0],
                                                               opponent_organ=opponent_organ))
@@ -85,7 +84,7 @@ class WinningMoveStrategy(CardPlayStrategy):
 
                                 elif not player_organ_same_color:
                                     for player_organ in player.body:
-                                        if player_organ.state < opponent_organ.state and player_organ.color not in opponent.organ_colors and opponent_organ.color not in player.organ_colors:
+                                        if player_organ.state < opponent_organ.state and not opponent.has_organ_color(player_organ.color) and not player.has_organ_color(opponent_organ.color):
                                             moves_to_play.append(Move(opponent=opponent,
                                                                       player_organ=player_organ,
                                                                       opponent_organ=opponent_organ))
@@ -129,7 +128,7 @@ class OrganThiefStrategy(CardPlayStrategy):
             return
 
         opponents = game_state.get_opponents(player)
-        valid_choices = [(opponent, organ) for opponent in opponents for organ in opponent.body if organ.color not in player.organ_colors and len(organ.medicines) < 2]
+        valid_choices = [(opponent, organ) for opponent in opponents for organ in opponent.body if not player.has_organ_color(organ.color) and len(organ.medicines) < 2]
         if not valid_choices:
             return
 
@@ -154,8 +153,8 @@ class TransplantStrategy(CardPlayStrategy):
                          for opponent_organ in opponent.body
                          for player_organ in player.body
                          if player_organ.state <= opponent_organ.state < OrganState.IMMUNISED
-                         and player_organ.color not in opponent.organ_colors
-                         and opponent_organ.color not in player.organ_colors]
+                         and not opponent.has_organ_color(player_organ.color)
+                         and not player.has_organ_color(opponent_organ.color)]
 
         if not valid_choices:
             return
@@ -182,10 +181,8 @@ class MedicineStrategy(CardPlayStrategy):
         valid_choices = [(medicine_card, organ)
                          for organ in player.body
                          for medicine_card in medicine_cards
-                         if medicine_card.color == organ.color
-                         or organ.color == CardColor.WILD
-                         or medicine_card.color == CardColor.WILD
-                         and organ.state < OrganState.IMMUNISED]
+                         if organ.state < OrganState.IMMUNISED
+                         and color_fits(medicine_card.color, organ, player)]
 
         if not valid_choices:
             return
@@ -214,9 +211,7 @@ class ContagionStrategy(CardPlayStrategy):
                          for opponent in opponents
                          for opponent_organ in opponent.body
                          if opponent_organ.state < OrganState.IMMUNISED
-                         and virus.color == opponent_organ.color
-                         or virus.color == CardColor.WILD
-                         or (opponent_organ.color == CardColor.WILD and virus.color not in opponent.organ_colors)]
+                         and color_fits(virus.color, opponent_organ, opponent)]
 
         if not valid_choices:
             return
@@ -253,10 +248,8 @@ class VirusPlayStrategy(CardPlayStrategy):
                          for virus_card in virus_cards
                          for opponent in opponents
                          for organ in opponent.body
-                         if virus_card.color == organ.color
-                         or organ.color == CardColor.WILD
-                         or virus_card.color == CardColor.WILD
-                         and organ.state < OrganState.IMMUNISED]
+                         if organ.state < OrganState.IMMUNISED
+                         and color_fits(virus_card.color, organ, opponent)]
 
         if not valid_choices:
             return
@@ -308,11 +301,12 @@ class RuleBasedAIPlayer(BasePlayer):
         best_moves = self.prepare_moves(game_state)
         if best_moves:
             card, moves = best_moves
-            presenter.print_decision(Action.PLAY)
-            presenter.print_card(card)
-            self.play_card(game_state, card, moves)
+            game_state.events.emit(EventType.DECISION, Action.PLAY)
+            game_state.events.emit(EventType.CARD, card)
+            num_successful_moves = self.play_card(game_state, card, moves)
+            game_state.events.emit(EventType.CARD_PLAY_STATUS, bool(num_successful_moves))
         else:
-            presenter.print_decision(Action.DISCARD)
+            game_state.events.emit(EventType.DECISION, Action.DISCARD)
             card_ids = self.decide_cards_to_discard_indices(game_state)
             self.discard_cards(game_state, card_ids)
 
@@ -1,9 +1,7 @@
-import copy
 from typing import List
 
-from enums import Action, CardType, TreatmentName, CardColor
+from enums import Action, CardType, TreatmentName, CardColor, EventType
 from game.game_state import GameState
-from interface import presenter
 from models.cards import Card
 from players import BasePlayer
 from players.strategy_based_ai.strategies import (MedicalErrorStrategy, OrganStrategy, OrganThiefStrategy,
@@ -35,7 +33,7 @@ class StrategyBasedAIPlayer(BasePlayer):
         for organ in self.body:
             score -= organ.state
 
-        self.play_card(game_state, card, moves)
+        undo_record = game_state.make_move(self, card, moves)
 
         for opponent in opponents:
             for organ in opponent.body:
@@ -46,17 +44,20 @@ class StrategyBasedAIPlayer(BasePlayer):
 
         if game_state.check_win_condition(self):
             score += 100
+
+        game_state.unmake_move(undo_record)
         return score
 
     def take_turn(self, game_state) -> bool:
         best_moves = self.prepare_moves(game_state)
         if best_moves:
             card, moves = best_moves
-            presenter.print_decision(Action.PLAY)
-            presenter.print_card(card)
-            self.play_card(game_state, card, moves)
+            game_state.events.emit(EventType.DECISION, Action.PLAY)
+            game_state.events.emit(EventType.CARD, card)
+            num_successful_moves = self.play_card(game_state, card, moves)
+            game_state.events.emit(EventType.CARD_PLAY_STATUS, bool(num_successful_moves))
         else:
-            presenter.print_decision(Action.DISCARD)
+            game_state.events.emit(EventType.DECISION, Action.DISCARD)
             card_ids = self.decide_cards_to_discard_indices(game_state)
             self.discard_cards(game_state, card_ids)
 
@@ -67,14 +68,11 @@ class StrategyBasedAIPlayer(BasePlayer):
 
         scored_strategies = []
         for strategy in valid_strategies:
-            new_game_state = copy.deepcopy(game_state)
-            new_game_state.current_player_index = game_state.current_player_index
-            new_player = new_game_state.get_current_player()
-            result = strategy.apply(new_player, new_game_state)
+            result = strategy.apply(self, game_state)
             if not result:
                 return
             card, moves = result
-            score = new_player.evaluate_moves(new_game_state, card, moves)
+            score = self.evaluate_moves(game_state, card, moves)
             scored_strategies.append((score, strategy, card, moves))
 
         if not scored_strategies:
@@ -82,11 +80,7 @@ class StrategyBasedAIPlayer(BasePlayer):
 
         sorted_strategies = sorted(scored_strategies, key=lambda x: x[0], reverse=True)
         best_score, best_strategy, best_card, best_moves = sorted_strategies[0]
-        result = best_strategy.apply(self, game_state)
-        if not result:
-            return
-        orig_card, orig_moves = result
-        return orig_card, orig_moves
+        return best_card, best_moves
 
     def decide_cards_to_discard_indices(self, game_state: GameState) -> List[int]:
         card_ids = []
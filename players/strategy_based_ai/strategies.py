@@ -1,7 +1,7 @@
-from enums import CardType, TreatmentName, CardColor, OrganState
+from enums import CardType, TreatmentName, OrganState
 from players.base_player import BasePlayer
 from game.game_state import GameState
-from models.cards import Card
+from models.cards import Card, color_fits
 from models.move import Move
 
 from typing import List, Tuple
@@ -38,7 +38,7 @@ class OrganThiefStrategy(CardPlayStrategy):
     def apply(self, player, game_state):
         card = player.get_hand_card_by_name(TreatmentName.ORGAN_THIEF)
         opponents = game_state.get_opponents(player)
-        valid_choices = [(opponent, organ) for opponent in opponents for organ in opponent.body if organ.color not in player.organ_colors and len(organ.medicines) < 2]
+        valid_choices = [(opponent, organ) for opponent in opponents for organ in opponent.body if not player.has_organ_color(organ.color) and len(organ.medicines) < 2]
         if not valid_choices:
             return
 
@@ -66,8 +66,8 @@ class TransplantStrategy(CardPlayStrategy):
                          for opponent_organ in opponent.body
                          for player_organ in player.body
                          if player_organ.state <= opponent_organ.state < OrganState.IMMUNISED
-                         and player_organ.color not in opponent.organ_colors
-                         and opponent_organ.color not in player.organ_colors]
+                         and not opponent.has_organ_color(player_organ.color)
+                         and not player.has_organ_color(opponent_organ.color)]
 
         if not valid_choices:
             return
@@ -96,10 +96,8 @@ class MedicineStrategy(CardPlayStrategy):
         valid_choices = [(medicine_card, organ)
                          for organ in player.body
                          for medicine_card in medicine_cards
-                         if medicine_card.color == organ.color
-                         or organ.color == CardColor.WILD
-                         or medicine_card.color == CardColor.WILD
-                         and organ.state < OrganState.IMMUNISED]
+                         if organ.state < OrganState.IMMUNISED
+                         and color_fits(medicine_card.color, organ, player)]
 
         if not valid_choices:
             return
@@ -134,9 +132,7 @@ class ContagionStrategy(CardPlayStrategy):
                          for opponent in opponents
                          for opponent_organ in opponent.body
                          if opponent_organ.state < OrganState.IMMUNISED
-                         and virus.color == opponent_organ.color
-                         or virus.color == CardColor.WILD
-                         or (opponent_organ.color == CardColor.WILD and virus.color not in opponent.organ_colors)]
+                         and color_fits(virus.color, opponent_organ, opponent)]
 
         if not valid_choices:
             return
@@ -176,10 +172,8 @@ class VirusPlayStrategy(CardPlayStrategy):
                          for virus_card in virus_cards
                          for opponent in opponents
                          for organ in opponent.body
-                         if virus_card.color == organ.color
-                         or organ.color == CardColor.WILD
-                         or virus_card.color == CardColor.WILD
-                         and organ.state < OrganState.IMMUNISED]
+                         if organ.state < OrganState.IMMUNISED
+                         and color_fits(virus_card.color, organ, opponent)]
 
         if not valid_choices:
             return
@@ -1,9 +1,45 @@
+import os
+import random
+import tempfile
 import unittest
+from array import array
+from unittest import mock
+
+import neat
+import numpy as np
 
 from players import PlayerFactory
-from enums import PlayerType, OrganState, CardColor
+from enums import PlayerType, OrganState, CardColor, EngineType, TreatmentName, CardType
 from models.cards import Organ, Medicine, Virus, Contagion, MedicalError, Transplant, OrganThief, LatexGlove, Move
-from game.game_manager import GameManager
+from game.game_manager import GameManager, TurnLimitError, game_rng
+from game.game_constants import GameConstants
+from game import compact_game_state as compact
+from game.compact_game_state import object_move_key
+from game.batch_runner import run_batch
+from players.neat_player import neat_config
+from players.neat_player.compiled_network import CompiledNetwork
+from players.neat_player.training.evaluation import ParallelGenomeEvaluator, eval_genome, eval_genome_games
+from players.ismcts_ai.information_set import InformationSet
+from players.ismcts_ai.search import ISMCTS, Node, keyed_moves
+from players.ismcts_ai.parallel import root_parallel_search
+from enums import Action, SearchParallelism
+from game.transposition_table import TranspositionTable
+from benchmarks.benchmarks import get_benchmarks, measure, measure_memory, compare, best_of_runs
+from game.instrumentation import Instrumentation, instrumented_methods
+from game.game_state import GameState
+from interface import EventBus, CLIPresenter, BlankPresenter
+from enums import EventType
+from game.game_record import GameRecord, GameRecordReader, GameRecordWriter, encode_move, decode_moves
+from game.batch_runner import play_games
+from models.deck import Deck, DeckPool, SHARED_CARDS
+from models.organ_states import TRANSITIONS, VIRUS, MEDICINE
+from game.tournament import Entrant, EloRatings, Pairing, SPRT, Tournament, play_match
+from enums import TableMode
+from game.results_sink import ResultsSink, ResultsTable, PLAYED_CARD_KINDS, EMPTY_SEAT
+from game.vector_game_state import NO_MOVE, VectorGameState, num_actions, simulate
+from game.dataset import Dataset, DatasetWriter, PASS, record_dtype
+from game.zobrist import (MASK, DECK_KEYS, DISCARD_PILE_KEYS, HAND_KEYS, ORGAN_KEYS, ATTACHED_KEYS, TURN_KEYS,
+                          SEAT_MULTIPLIERS)
 
 
 class TestGameManager(unittest.TestCase):
@@ -96,6 +132,16 @@ class TestGameManager(unittest.TestCase):
         organ = self.player1.get_organ_by_color(CardColor.RED)
         self.assertEqual(organ.state, OrganState.VACCINATED)
 
+    def test_medicine_cannot_recolor_wild_organ_to_present_color(self):
+        red_organ, wild_organ, red_medicine = Organ(CardColor.RED), Organ(CardColor.WILD), Medicine(CardColor.RED)
+        self.player1.add_organ_to_body(red_organ)
+        self.player1.add_organ_to_body(wild_organ)
+        self.player1.add_card_to_hand(red_medicine)
+        self.player1.play_card(self.state, red_medicine, [Move(player_organ=wild_organ)])
+        self.assertEqual(wild_organ.color, CardColor.WILD)
+        self.assertEqual(wild_organ.state, OrganState.HEALTHY)
+        self.assertIn(red_medicine, self.player1.hand)
+
     def test_play_medicine_on_vaccinated_organ(self):
         # Test playing a medicine card on a healthy organ
         # Add a healthy organ and a medicine card to the player's hand
@@ -104,11 +150,11 @@ class TestGameManager(unittest.TestCase):
         self.player1.add_card_to_hand(cards[1])
         self.player1.add_card_to_hand(cards[2])
         moves = [Move()]
-        self.player1.play_card(self.player1, cards[0], moves)  # Play the organ card
+        self.player1.play_card(self.state, cards[0], moves)  # Play the organ card
         moves = [Move(player_organ=cards[0])]
-        self.player1.play_card(self.player1, cards[1], moves)  # Play the medicine card
+        self.player1.play_card(self.state, cards[1], moves)  # Play the medicine card
         moves = [Move(player_organ=cards[0])]
-        self.player1.play_card(self.player1, cards[2], moves)  # Play the medicine card
+        self.player1.play_card(self.state, cards[2], moves)  # Play the medicine card
         organ = self.player1.get_organ_by_color(CardColor.RED)
         self.assertEqual(organ.state, OrganState.IMMUNISED)
 
@@ -120,9 +166,9 @@ class TestGameManager(unittest.TestCase):
         self.player1.add_card_to_hand(wild_organ)
         self.player1.add_card_to_hand(red_medicine)
         moves = [Move()]
-        self.player1.play_card(self.player1, wild_organ, moves)  # Play the organ card
+        self.player1.play_card(self.state, wild_organ, moves)  # Play the organ card
         moves = [Move(player_organ=wild_organ)]
-        self.player1.play_card(self.player1, red_medicine, moves)  # Play the medicine card
+        self.player1.play_card(self.state, red_medicine, moves)  # Play the medicine card
         self.assertEqual(self.player1.body[0].state, OrganState.VACCINATED)
         self.assertEqual(self.player1.body[0].color, CardColor.RED)
 
@@ -134,9 +180,9 @@ class TestGameManager(unittest.TestCase):
         self.player1.add_card_to_hand(wild_organ)
         self.player1.add_card_to_hand(wild_medicine)
         moves = [Move()]
-        self.player1.play_card(self.player1, wild_organ, moves)  # Play the organ card
+        self.player1.play_card(self.state, wild_organ, moves)  # Play the organ card
         moves = [Move(player_organ=wild_organ)]
-        self.player1.play_card(self.player1, wild_medicine, moves)  # Play the medicine card
+        self.player1.play_card(self.state, wild_medicine, moves)  # Play the medicine card
         self.assertEqual(self.player1.body[0].state, OrganState.VACCINATED)
 
     def test_play_medicine_on_immunised_organ(self):
@@ -145,7 +191,7 @@ class TestGameManager(unittest.TestCase):
         cards = [Organ(CardColor.RED), Medicine(CardColor.RED), Medicine(CardColor.RED), Medicine(CardColor.RED)]
         self.player1.add_card_to_hand(cards[0])
         moves = [Move()]
-        self.player1.play_card(self.player1, cards[0], moves)  # Play the organ card
+        self.player1.play_card(self.state, cards[0], moves)  # Play the organ card
         self.player1.add_card_to_hand(cards[1])
         self.player1.add_card_to_hand(cards[2])
         self.player1.add_card_to_hand(cards[3])
@@ -300,8 +346,9 @@ class TestGameManager(unittest.TestCase):
         moves = [Move()]
         self.player2.play_card(self.state, cards[1], moves)
         moves = [Move(opponent=self.player2, opponent_organ=cards[1])]
-        with self.assertRaises(ValueError):
-            self.player1.play_card(self.state, cards[2], moves)  # Player1 plays the Organ Thief card
+        self.assertEqual(self.player1.play_card(self.state, cards[2], moves), 0)  # Player1 plays the Organ Thief card
+        self.assertEqual(self.player2.body, [cards[1]])
+        self.assertIn(cards[2], self.player1.hand)
 
     def test_play_transplant_treatment(self):
         # Test playing the Transplant treatment card
@@ -316,6 +363,19 @@ class TestGameManager(unittest.TestCase):
         self.assertEqual(self.player1.body[0].color, CardColor.BLUE)
         self.assertEqual(self.player2.body[0].color, CardColor.RED)
 
+    def test_transplant_swaps_organs_of_the_same_color(self):
+        infected, vaccinated = Organ(CardColor.RED), Organ(CardColor.RED)
+        self.player1.add_organ_to_body(infected)
+        self.player2.add_organ_to_body(vaccinated)
+        infected.add_virus(Virus(CardColor.RED))
+        vaccinated.add_medicine(Medicine(CardColor.RED))
+        transplant = Transplant()
+        self.player2.add_card_to_hand(transplant)
+        moves = [Move(opponent=self.player1, player_organ=vaccinated, opponent_organ=infected)]
+        self.player2.play_card(self.state, transplant, moves)
+        self.assertEqual(self.player1.body, [vaccinated])
+        self.assertEqual(self.player2.body, [infected])
+
     def test_play_latex_glove_treatment(self):
         # Test playing the Latex Glove treatment card
         # Add cards to player1's hand and a Latex Glove card to player2's hand
@@ -388,5 +448,1584 @@ class TestGameManager(unittest.TestCase):
             self.player1.get_hand_card_by_id(0)
 
 
+class TestMakeUnmakeMove(unittest.TestCase):
+    def setUp(self):
+        config = PlayerFactory()
+        self.player1 = config.add_player(PlayerType.RANDOM, "Player1")
+        self.player2 = config.add_player(PlayerType.RANDOM, "Player2")
+        self.state = GameManager(config).state
+
+    def fingerprint(self):
+        players = [(id(player.hand), [id(card) for card in player.hand],
+                    id(player.body), [(id(organ), organ.color, organ.state,
+                                       [id(card) for card in organ.viruses], [id(card) for card in organ.medicines])
+                                      for organ in player.body],
+                    list(player.move_history))
+                   for player in self.state.players]
+        return players, [id(card) for card in self.state.deck.discard_pile], [id(card) for card in self.state.deck.cards]
+
+    def assert_restored(self, player, card, moves):
+        player.add_card_to_hand(card)
+        before = self.fingerprint()
+        undo_record = self.state.make_move(player, card, moves)
+        self.assertTrue(undo_record.num_successful_moves)
+        self.assertNotEqual(self.fingerprint(), before)
+        self.state.unmake_move(undo_record)
+        self.assertEqual(self.fingerprint(), before)
+
+    def test_unmake_virus_on_wild_organ(self):
+        wild_organ = Organ(CardColor.WILD)
+        self.player1.add_organ_to_body(wild_organ)
+        self.assert_restored(self.player2, Virus(CardColor.RED), [Move(opponent=self.player1, opponent_organ=wild_organ)])
+        self.assertEqual(wild_organ.color, CardColor.WILD)
+        self.assertEqual(wild_organ.state, OrganState.HEALTHY)
+
+    def test_unmake_virus_destroying_organ(self):
+        red_organ = Organ(CardColor.RED)
+        self.player1.add_organ_to_body(red_organ)
+        red_organ.add_virus(Virus(CardColor.RED))
+        self.state.add_card_to_discard_pile(LatexGlove())
+        self.assert_restored(self.player2, Virus(CardColor.RED), [Move(opponent=self.player1, opponent_organ=red_organ)])
+        self.assertEqual(red_organ.state, OrganState.INFECTED)
+
+    def test_unmake_medicine_curing_wild_organ(self):
+        wild_organ = Organ(CardColor.WILD)
+        self.player1.add_organ_to_body(wild_organ)
+        wild_organ.add_virus(Virus(CardColor.BLUE))
+        wild_organ.color = CardColor.BLUE
+        self.assert_restored(self.player1, Medicine(CardColor.WILD), [Move(player_organ=wild_organ)])
+        self.assertEqual(wild_organ.color, CardColor.BLUE)
+
+    def test_unmake_medical_error(self):
+        self.player1.add_organ_to_body(Organ(CardColor.RED))
+        self.player2.add_organ_to_body(Organ(CardColor.BLUE))
+        self.assert_restored(self.player1, MedicalError(), [Move(opponent=self.player2)])
+
+    def test_unmake_latex_glove(self):
+        self.state.complete_hand(self.player2)
+        self.assert_restored(self.player1, LatexGlove(), [Move()])
+
+    def test_unmake_after_failed_move(self):
+        cards = [Organ(CardColor.RED), Organ(CardColor.RED), OrganThief()]
+        self.player1.add_organ_to_body(cards[0])
+        self.player2.add_organ_to_body(cards[1])
+        self.player1.add_card_to_hand(cards[2])
+        before = self.fingerprint()
+        undo_record = self.state.make_move(self.player1, cards[2], [Move(opponent=self.player2, opponent_organ=cards[1])])
+        self.assertEqual(undo_record.num_successful_moves, 0)
+        self.state.unmake_move(undo_record)
+        self.assertEqual(self.fingerprint(), before)
+
+    def test_unmake_after_move_raising_midway(self):
+        cards = [Organ(CardColor.RED), Organ(CardColor.BLUE), OrganThief()]
+        self.player1.add_organ_to_body(cards[0])
+        self.player2.add_organ_to_body(cards[1])
+        self.player1.add_card_to_hand(cards[2])
+        before = self.fingerprint()
+        # the stolen organ has already left the body of player 2 when adding it fails
+        with mock.patch.object(type(self.player1), 'add_organ_to_body', side_effect=ValueError), \
+                self.assertRaises(ValueError):
+            self.state.make_move(self.player1, cards[2], [Move(opponent=self.player2, opponent_organ=cards[1])])
+        self.assertEqual(self.fingerprint(), before)
+
+    def test_strategy_based_ai_does_not_mutate_state(self):
+        config = PlayerFactory()
+        player = config.add_player(PlayerType.STRATEGY_BASED_AI, "Player1")
+        opponent = config.add_player(PlayerType.RANDOM, "Player2")
+        self.state = GameManager(config).state
+        opponent.add_organ_to_body(Organ(CardColor.RED))
+        player.add_card_to_hand(Virus(CardColor.RED))
+        player.add_card_to_hand(Organ(CardColor.BLUE))
+        before = self.fingerprint()
+        card, moves = player.prepare_moves(self.state)
+        self.assertEqual(self.fingerprint(), before)
+        self.assertIn(card, player.hand)
+
+
+class TestMoveGenerator(unittest.TestCase):
+    def setUp(self):
+        config = PlayerFactory()
+        self.player1 = config.add_player(PlayerType.RANDOM, "Player1")
+        self.player2 = config.add_player(PlayerType.RANDOM, "Player2")
+        self.player3 = config.add_player(PlayerType.RANDOM, "Player3")
+        self.state = GameManager(config, rng=game_rng(0, 0)).state
+        self.state.current_player_index = 0
+
+    def targets(self, card):
+        return [(move.opponent, move.player_organ, move.opponent_organ)
+                for play_card, moves in self.state.legal_plays() if play_card is card for move in moves]
+
+    def test_virus_cannot_recolor_wild_organ_to_present_color(self):
+        wild_organ, red_organ = Organ(CardColor.WILD), Organ(CardColor.RED)
+        self.player2.add_organ_to_body(wild_organ)
+        self.player2.add_organ_to_body(red_organ)
+        red_virus, blue_virus = Virus(CardColor.RED), Virus(CardColor.BLUE)
+        self.player1.add_card_to_hand(red_virus)
+        self.player1.add_card_to_hand(blue_virus)
+        self.assertEqual(self.targets(red_virus), [(self.player2, None, red_organ)])
+        self.assertEqual(self.targets(blue_virus), [(self.player2, None, wild_organ)])
+
+    def test_medicine_cannot_recolor_wild_organ_to_present_color(self):
+        wild_organ, red_organ = Organ(CardColor.WILD), Organ(CardColor.RED)
+        self.player1.add_organ_to_body(wild_organ)
+        self.player1.add_organ_to_body(red_organ)
+        red_organ.add_medicine(Medicine(CardColor.RED))
+        red_organ.add_medicine(Medicine(CardColor.RED))
+        medicine = Medicine(CardColor.RED)
+        self.player1.add_card_to_hand(medicine)
+        self.assertEqual(self.targets(medicine), [])
+
+    def test_transplant_and_organ_thief_keep_colors_unique(self):
+        own_red, own_blue = Organ(CardColor.RED), Organ(CardColor.BLUE)
+        other_red = Organ(CardColor.RED)
+        self.player1.add_organ_to_body(own_red)
+        self.player1.add_organ_to_body(own_blue)
+        self.player2.add_organ_to_body(other_red)
+        transplant, organ_thief = Transplant(), OrganThief()
+        self.player1.add_card_to_hand(transplant)
+        self.player1.add_card_to_hand(organ_thief)
+        self.assertEqual(self.targets(transplant), [(self.player2, own_red, other_red)])
+        self.assertEqual(self.targets(organ_thief), [])
+
+    def test_contagion_targets(self):
+        infected_organ, target_organ, other_organ = Organ(CardColor.RED), Organ(CardColor.RED), Organ(CardColor.BLUE)
+        self.player1.add_organ_to_body(infected_organ)
+        infected_organ.add_virus(Virus(CardColor.RED))
+        self.player2.add_organ_to_body(target_organ)
+        self.player3.add_organ_to_body(other_organ)
+        contagion = Contagion()
+        self.player1.add_card_to_hand(contagion)
+        self.assertEqual(self.targets(contagion), [(self.player2, infected_organ, target_organ)])
+
+    def test_medical_error_needs_a_body_to_swap(self):
+        medical_error = MedicalError()
+        self.player1.add_card_to_hand(medical_error)
+        self.assertEqual(self.targets(medical_error), [])
+        self.player3.add_organ_to_body(Organ(CardColor.RED))
+        self.assertEqual(self.targets(medical_error), [(self.player3, None, None)])
+        self.player1.add_organ_to_body(Organ(CardColor.BLUE))
+        self.assertEqual(self.targets(medical_error), [(self.player2, None, None), (self.player3, None, None)])
+
+    def test_every_generated_play_succeeds(self):
+        num_plays = 0
+        for game_index in range(8):
+            config = PlayerFactory()
+            for i in range(4):
+                config.add_player(PlayerType.STRATEGY_BASED_AI if i == 0 else PlayerType.RANDOM, f"Player{i + 1}")
+            game_manager = GameManager(config, rng=game_rng(1, game_index))
+            state = game_manager.state
+            for _ in range(150):
+                player = state.get_current_player()
+                for card, moves in state.legal_plays():
+                    undo_record = state.make_move(player, card, moves)
+                    self.assertEqual(undo_record.num_successful_moves, len(moves))
+                    for body_player in state.players:
+                        self.assertEqual(len(set(body_player.organ_colors)), len(body_player.body))
+                    state.unmake_move(undo_record)
+                    num_plays += 1
+                if game_manager.play_turn():
+                    break
+        self.assertGreater(num_plays, 1000)
+
+
+class TestBodyColorIndex(unittest.TestCase):
+    def setUp(self):
+        config = PlayerFactory()
+        self.player1 = config.add_player(PlayerType.RANDOM, "Player1")
+        self.player2 = config.add_player(PlayerType.RANDOM, "Player2")
+        self.state = GameManager(config, rng=game_rng(0, 0)).state
+
+    def assert_indexed(self, player):
+        expected = {}
+        for organ in player.body:
+            expected.setdefault(organ.color, organ)
+        self.assertEqual(player.organs_by_color, expected)
+        self.assertEqual(player.organ_color_mask, sum(1 << list(CardColor).index(color) for color in expected))
+        for color in CardColor:
+            self.assertEqual(player.has_organ_color(color), color in expected)
+            self.assertIs(player.get_organ_by_color(color), expected.get(color))
+
+    def test_add_and_remove_organs(self):
+        red_organ, wild_organ = Organ(CardColor.RED), Organ(CardColor.WILD)
+        self.player1.add_organ_to_body(red_organ)
+        self.player1.add_organ_to_body(wild_organ)
+        self.assert_indexed(self.player1)
+        self.player1.remove_organ_from_body(red_organ)
+        self.assert_indexed(self.player1)
+        with self.assertRaises(ValueError):
+            self.player1.add_organ_to_body(Organ(CardColor.WILD))
+
+    def test_wild_recoloring(self):
+        wild_organ = Organ(CardColor.WILD)
+        self.player1.add_organ_to_body(wild_organ)
+        self.player2.add_card_to_hand(Virus(CardColor.BLUE))
+        self.player2.play_card(self.state, self.player2.hand[0], [Move(opponent=self.player1, opponent_organ=wild_organ)])
+        self.assertIs(self.player1.get_organ_by_color(CardColor.BLUE), wild_organ)
+        self.assert_indexed(self.player1)
+        self.player1.add_card_to_hand(Medicine(CardColor.BLUE))
+        self.player1.play_card(self.state, self.player1.hand[0], [Move(player_organ=wild_organ)])
+        self.assertIs(self.player1.get_organ_by_color(CardColor.WILD), wild_organ)
+        self.assert_indexed(self.player1)
+
+    def test_medical_error_and_unmake(self):
+        self.player1.add_organ_to_body(Organ(CardColor.RED))
+        self.player2.add_organ_to_body(Organ(CardColor.BLUE))
+        self.player2.add_organ_to_body(Organ(CardColor.GREEN))
+        medical_error = MedicalError()
+        self.player1.add_card_to_hand(medical_error)
+        undo_record = self.state.make_move(self.player1, medical_error, [Move(opponent=self.player2)])
+        self.assertTrue(self.player1.has_organ_color(CardColor.GREEN))
+        self.assert_indexed(self.player1)
+        self.assert_indexed(self.player2)
+        self.state.unmake_move(undo_record)
+        self.assertTrue(self.player1.has_organ_color(CardColor.RED))
+        self.assert_indexed(self.player1)
+        self.assert_indexed(self.player2)
+
+    def test_index_follows_games(self):
+        for game_index in range(5):
+            config = PlayerFactory()
+            for i in range(4):
+                config.add_player(PlayerType.RULE_BASED_AI if i == 0 else PlayerType.RANDOM, f"Player{i + 1}")
+            game_manager = GameManager(config, rng=game_rng(2, game_index))
+            for _ in range(200):
+                winner = game_manager.play_turn()
+                for player in config.players:
+                    self.assert_indexed(player)
+                if winner:
+                    break
+
+
+class TestStateEncoder(unittest.TestCase):
+    def setUp(self):
+        config = PlayerFactory()
+        for i in range(4):
+            config.add_player(PlayerType.RANDOM, f"Player{i + 1}")
+        self.game_manager = GameManager(config)
+        self.state = self.game_manager.state
+
+    def reference_state_array(self):
+        # straightforward re-encoding of the whole state, the encoder must always agree with it
+        card_colors = list(CardColor)
+        organ_states = list(OrganState)
+        treatments = list(TreatmentName)
+        color_card_types = [CardType.ORGAN, CardType.MEDICINE, CardType.VIRUS]
+        encoder = self.state.encoder
+        state_array = [0.] * encoder.num_inputs
+        for player_id, player in enumerate(self.state.players):
+            for organ in player.body:
+                state_array[player_id * encoder.body_size + organ_states.index(organ.state) * len(card_colors)
+                            + card_colors.index(organ.color)] = 1.
+        state_array[encoder.player_index + self.state.current_player_index] = 1.
+        for card in self.state.get_current_player().hand:
+            if card.name in treatments:
+                state_array[encoder.treatments_index + treatments.index(card.name)] = 1.
+            else:
+                state_array[encoder.color_cards_index + color_card_types.index(card.type) * len(card_colors)
+                            + card_colors.index(card.color)] = 1.
+        state_array[encoder.deck_index] = len(self.state.deck.cards) / GameConstants.NUM_TOTAL_CARDS
+        state_array[encoder.discard_pile_index] = len(self.state.deck.discard_pile) / GameConstants.NUM_TOTAL_CARDS
+        return list(array('f', state_array))
+
+    def test_encoder_matches_reference_during_game(self):
+        self.assertEqual(len(self.state.get_state_array_for_ai()), neat_config.genome_config.num_inputs)
+        winner = None
+        while not winner:
+            self.assertEqual(list(self.state.get_state_array_for_ai()), self.reference_state_array())
+            winner = self.game_manager.play_turn()
+
+    def test_encoder_tracks_organ_changes(self):
+        player = self.state.get_current_player()
+        organ = Organ(CardColor.WILD)
+        player.add_organ_to_body(organ)
+        self.state.get_state_array_for_ai()
+        organ.add_virus(Virus(CardColor.RED))
+        organ.color = CardColor.RED
+        self.assertEqual(list(self.state.get_state_array_for_ai()), self.reference_state_array())
+
+    def test_encoder_returns_same_buffer_when_unchanged(self):
+        first = self.state.get_state_array_view()
+        self.assertIs(self.state.get_state_array_view(), first)
+
+    def test_state_array_is_a_copy(self):
+        state_array = self.state.get_state_array_for_ai()
+        self.assertIsNot(state_array, self.state.get_state_array_view())
+        before = list(state_array)
+        self.state.get_current_player().add_organ_to_body(Organ(CardColor.WILD))
+        self.assertNotEqual(list(self.state.get_state_array_view()), before)
+        self.assertEqual(list(state_array), before)
+
+
+class TestNEATPlayerActivationCache(unittest.TestCase):
+    def setUp(self):
+        genome = neat_config.genome_type(0)
+        genome.configure_new(neat_config.genome_config)
+        config = PlayerFactory()
+        self.player = config.add_player(PlayerType.NEAT_AI, "Player1", genome=genome)
+        for i in range(3):  # the network is trained for four players
+            config.add_player(PlayerType.RANDOM, f"Player{i + 2}")
+        self.state = GameManager(config).state
+        self.state.current_player_index = 0
+        self.net_activate = mock.Mock(wraps=self.player.net.activate)
+        self.player.net.activate = self.net_activate
+
+    def test_one_activation_per_decision_point(self):
+        self.state.complete_hand(self.player)
+        self.player.decide_action(self.state)
+        self.player.decide_card_to_play_index(self.state)
+        self.player.decide_cards_to_discard_indices(self.state)
+        self.player.decide_opponent(self.state, None)
+        self.player.decide_organ_color(self.state)
+        self.assertEqual(self.net_activate.call_count, 1)
+
+    def test_state_change_triggers_new_activation(self):
+        self.state.complete_hand(self.player)
+        self.player.decide_action(self.state)
+        self.player.discard_card(self.state, 0)
+        self.player.decide_action(self.state)
+        self.assertEqual(self.net_activate.call_count, 2)
+
+
+class TestCompactGameState(unittest.TestCase):
+    def setUp(self):
+        self.state = compact.CompactGameState(2)
+        self.state.current_player_index = 0
+        self.state.deck.clear()
+
+    def organ_slot(self, player_index, color):
+        return player_index * compact.NUM_COLORS + list(CardColor).index(color)
+
+    def play(self, player_index, code, *args):
+        self.state.current_player_index = player_index
+        self.state.hands[player_index].append(code)
+        move = (compact.PLAY, len(self.state.hands[player_index]) - 1, *args)
+        self.assertIn(move, self.state.legal_moves())
+        self.state.apply_move(move)
+
+    def count_cards(self):
+        state = self.state
+        num_attached = {compact.INFECTED: 1, compact.HEALTHY: 0, compact.VACCINATED: 1, compact.IMMUNISED: 2}
+        num_cards = len(state.deck) + len(state.discard_pile) + sum(len(hand) for hand in state.hands)
+        return num_cards + sum(1 + num_attached[organ_state] for organ_state in state.states if organ_state)
+
+    def test_initial_setup(self):
+        state = compact.CompactGameState(2)
+        self.assertEqual(len(state.deck), 68)
+        self.assertFalse(any(state.states))
+
+    def test_play_medicine_on_vaccinated_organ(self):
+        red = list(CardColor).index(CardColor.RED)
+        self.play(0, compact.face_code(compact.ORGAN, CardColor.RED))
+        self.play(0, compact.face_code(compact.MEDICINE, CardColor.RED), red)
+        self.play(0, compact.face_code(compact.MEDICINE, CardColor.WILD), red)
+        self.assertEqual(self.state.states[self.organ_slot(0, CardColor.RED)], OrganState.IMMUNISED)
+        self.assertFalse([move for move in self.state.legal_plays() if len(move) == 3])
+
+    def test_play_colored_medicine_on_wild_organ(self):
+        wild = list(CardColor).index(CardColor.WILD)
+        self.play(0, compact.face_code(compact.ORGAN, CardColor.WILD))
+        self.play(0, compact.face_code(compact.MEDICINE, CardColor.RED), wild)
+        i = self.organ_slot(0, CardColor.WILD)
+        self.assertEqual(self.state.states[i], OrganState.VACCINATED)
+        self.assertEqual(self.state.colors[i], list(CardColor).index(CardColor.RED))
+
+    def test_play_virus_on_infected_organ(self):
+        red = list(CardColor).index(CardColor.RED)
+        self.play(0, compact.face_code(compact.ORGAN, CardColor.RED))
+        self.play(1, compact.face_code(compact.VIRUS, CardColor.RED), 0, red)
+        self.play(1, compact.face_code(compact.VIRUS, CardColor.WILD), 0, red)
+        self.assertFalse(any(self.state.states))
+        self.assertEqual(len(self.state.discard_pile), 3)
+
+    def test_play_virus_on_vaccinated_wild_organ(self):
+        wild = list(CardColor).index(CardColor.WILD)
+        self.play(0, compact.face_code(compact.ORGAN, CardColor.WILD))
+        self.play(0, compact.face_code(compact.MEDICINE, CardColor.BLUE), wild)
+        self.play(1, compact.face_code(compact.VIRUS, CardColor.BLUE), 0, wild)
+        i = self.organ_slot(0, CardColor.WILD)
+        self.assertEqual(self.state.states[i], OrganState.HEALTHY)
+        self.assertEqual(self.state.colors[i], wild)
+        self.assertEqual(len(self.state.discard_pile), 2)
+
+    def test_virus_cannot_recolor_wild_organ_to_existing_color(self):
+        self.play(0, compact.face_code(compact.ORGAN, CardColor.RED))
+        self.play(0, compact.face_code(compact.ORGAN, CardColor.WILD))
+        self.state.current_player_index = 1
+        self.state.hands[1].append(compact.face_code(compact.VIRUS, CardColor.RED))
+        targets = {move[3] for move in self.state.legal_plays()}
+        self.assertEqual(targets, {list(CardColor).index(CardColor.RED)})
+
+    def test_medicine_cannot_recolor_wild_organ_to_existing_color(self):
+        red = list(CardColor).index(CardColor.RED)
+        self.play(0, compact.face_code(compact.ORGAN, CardColor.RED))
+        self.play(0, compact.face_code(compact.ORGAN, CardColor.WILD))
+        self.state.hands[0].append(compact.face_code(compact.MEDICINE, CardColor.RED))
+        self.assertEqual({move[2] for move in self.state.legal_plays()}, {red})
+
+    def test_transplant_needs_free_slots(self):
+        wild = list(CardColor).index(CardColor.WILD)
+        self.play(0, compact.face_code(compact.ORGAN, CardColor.RED))
+        self.play(0, compact.face_code(compact.ORGAN, CardColor.WILD))
+        self.play(1, compact.face_code(compact.ORGAN, CardColor.WILD))
+        self.play(1, compact.face_code(compact.MEDICINE, CardColor.BLUE), wild)
+        self.state.current_player_index = 0
+        self.state.hands[0].append(compact.treatment_code(TreatmentName.TRANSPLANT))
+        # the blue wild organ of player 1 cannot go to the occupied wild slot of player 0, except swapped with it
+        self.assertEqual([move[2:] for move in self.state.legal_plays() if len(move) == 5], [(1, wild, wild)])
+
+    def test_random_games_keep_colors_unique(self):
+        for seed in range(200):
+            random.seed(seed)
+            state = compact.CompactGameState(2 + seed % 5)
+            for _ in range(2000):
+                player_index = state.current_player_index
+                if state.hands[player_index]:
+                    state.apply_move(random.choice(state.legal_moves()))
+                    for player in range(state.num_players):
+                        colors = [state.colors[i] for i in range(player * compact.NUM_COLORS,
+                                                                 (player + 1) * compact.NUM_COLORS) if state.states[i]]
+                        self.assertEqual(len(colors), len(set(colors)))
+                    if state.check_win_condition(player_index):
+                        break
+                state.complete_hand(player_index)
+                state.next_player()
+
+    def test_play_contagion_treatment(self):
+        red = list(CardColor).index(CardColor.RED)
+        self.play(0, compact.face_code(compact.ORGAN, CardColor.RED))
+        self.play(1, compact.face_code(compact.ORGAN, CardColor.RED))
+        self.play(1, compact.face_code(compact.VIRUS, CardColor.RED), 0, red)
+        self.play(0, compact.treatment_code(TreatmentName.CONTAGION), ((red, 1, red),))
+        self.assertEqual(self.state.states[self.organ_slot(0, CardColor.RED)], OrganState.HEALTHY)
+        self.assertEqual(self.state.states[self.organ_slot(1, CardColor.RED)], OrganState.INFECTED)
+
+    def test_play_transplant_treatment(self):
+        red = list(CardColor).index(CardColor.RED)
+        blue = list(CardColor).index(CardColor.BLUE)
+        self.play(0, compact.face_code(compact.ORGAN, CardColor.RED))
+        self.play(1, compact.face_code(compact.ORGAN, CardColor.BLUE))
+        self.play(1, compact.treatment_code(TreatmentName.TRANSPLANT), 0, red, blue)
+        self.assertEqual(self.state.states[self.organ_slot(0, CardColor.BLUE)], OrganState.HEALTHY)
+        self.assertEqual(self.state.states[self.organ_slot(1, CardColor.RED)], OrganState.HEALTHY)
+        self.assertFalse(self.state.states[self.organ_slot(0, CardColor.RED)])
+
+    def test_transplant_swaps_organs_of_the_same_color(self):
+        red = list(CardColor).index(CardColor.RED)
+        self.play(0, compact.face_code(compact.ORGAN, CardColor.RED))
+        self.play(1, compact.face_code(compact.ORGAN, CardColor.RED))
+        self.play(1, compact.face_code(compact.MEDICINE, CardColor.RED), red)
+        self.play(0, compact.treatment_code(TreatmentName.TRANSPLANT), 1, red, red)
+        self.assertEqual(self.state.states[self.organ_slot(0, CardColor.RED)], OrganState.VACCINATED)
+        self.assertEqual(self.state.states[self.organ_slot(1, CardColor.RED)], OrganState.HEALTHY)
+        self.assertEqual(self.count_cards(), 4)
+
+    def test_play_medical_error_treatment(self):
+        for color in (CardColor.RED, CardColor.BLUE, CardColor.YELLOW):
+            self.play(0, compact.face_code(compact.ORGAN, color))
+        self.play(1, compact.treatment_code(TreatmentName.MEDICAL_ERROR), 0)
+        self.assertEqual(sum(1 for organ_state in self.state.states[:compact.NUM_COLORS] if organ_state), 0)
+        self.assertEqual(sum(1 for organ_state in self.state.states[compact.NUM_COLORS:] if organ_state), 3)
+
+    def test_play_latex_glove_treatment(self):
+        self.state.hands[0] += bytes([compact.face_code(compact.ORGAN, CardColor.RED)] * 2)
+        self.play(1, compact.treatment_code(TreatmentName.LATEX_GLOVE))
+        self.assertFalse(self.state.hands[0])
+        self.assertEqual(len(self.state.discard_pile), 3)
+
+    def test_compact_game_keeps_all_cards(self):
+        config = PlayerFactory()
+        for i in range(4):
+            config.add_player(PlayerType.RANDOM, f"Player{i + 1}")
+        game_manager = GameManager(config, engine=EngineType.COMPACT)
+        self.state = game_manager.state
+        winner = None
+        while not winner:
+            winner = game_manager.play_compact_turn()
+            self.assertEqual(self.count_cards(), 68)
+        self.assertTrue(self.state.check_win_condition(config.players.index(winner)))
+
+    def test_compact_engine_rejects_unsupported_players(self):
+        config = PlayerFactory()
+        config.add_player(PlayerType.RANDOM, "Player1")
+        config.add_player(PlayerType.STRATEGY_BASED_AI, "Player2")
+        with self.assertRaises(ValueError):
+            GameManager(config, engine=EngineType.COMPACT)
+
+
+class TestBatchRunner(unittest.TestCase):
+    def test_run_batch_counts_every_game(self):
+        result = run_batch([PlayerType.RANDOM, PlayerType.RANDOM, PlayerType.RANDOM], 20, num_workers=1)
+        self.assertEqual(result.num_games + result.num_errors, 20)
+        self.assertEqual(sum(result.wins), result.num_games)
+        self.assertGreaterEqual(result.total_turns, result.num_games * result.min_turns)
+
+    def test_play_games_publishes_to_global_subscribers(self):
+        events, on_move = EventBus(), mock.Mock()
+        presenter = CLIPresenter()
+        presenter.subscribe(events)
+        events.subscribe(EventType.MOVE, on_move)
+        with mock.patch('game.batch_runner.events', events), mock.patch('game.game_manager.default_events', events), \
+                mock.patch.object(presenter, 'print_separator') as on_turn_start, mock.patch('builtins.print'):
+            result = play_games([PlayerType.RANDOM] * 2, 0, 1, base_seed=0)
+        self.assertEqual(result.num_games, 1)
+        self.assertEqual(on_turn_start.call_count, result.total_turns)
+        on_move.assert_called()
+
+    def test_run_batch_is_reproducible_across_workers(self):
+        seating = [PlayerType.RANDOM, PlayerType.RANDOM]
+        serial = run_batch(seating, 12, num_workers=1, base_seed=7, engine=EngineType.COMPACT)
+        parallel = run_batch(seating, 12, num_workers=2, base_seed=7, engine=EngineType.COMPACT, chunk_size=5)
+        self.assertEqual(serial.wins, parallel.wins)
+        self.assertEqual(serial.total_turns, parallel.total_turns)
+
+    def test_only_the_turn_limit_counts_as_an_error(self):
+        seating = [PlayerType.RANDOM, PlayerType.RANDOM]
+        with mock.patch.object(GameConstants, 'MAX_TURNS', 2):
+            result = play_games(seating, 0, 3, base_seed=0)
+            self.assertEqual((result.num_games, result.num_errors), (0, 3))
+            with self.assertRaises(TurnLimitError):
+                GameManager(self.create_factory(seating), rng=game_rng(0, 0)).run()
+        with mock.patch('players.random_player.RandomPlayer.take_turn', side_effect=ValueError("engine bug")), \
+                self.assertRaises(ValueError):
+            play_games(seating, 0, 1, base_seed=0)
+
+    @staticmethod
+    def create_factory(seating):
+        player_factory = PlayerFactory()
+        for seat, player_type in enumerate(seating):
+            player_factory.add_player(player_type, f"Player{seat + 1}")
+        return player_factory
+
+
+class TestGameRng(unittest.TestCase):
+    def play(self, seating, game_index, base_seed=5, engine=EngineType.OBJECT):
+        config = PlayerFactory()
+        for seat, player_type in enumerate(seating):
+            config.add_player(player_type, f"{player_type}#{seat + 1}")
+        game_manager = GameManager(config, engine=engine, rng=game_rng(base_seed, game_index))
+        winner = game_manager.run()
+        return config.players.index(winner), game_manager.num_turns
+
+    def test_games_are_reproducible(self):
+        object_seating = [PlayerType.STRATEGY_BASED_AI, PlayerType.RANDOM, PlayerType.RANDOM]
+        for engine, seating in ((EngineType.OBJECT, object_seating), (EngineType.COMPACT, [PlayerType.RANDOM] * 4)):
+            results = [self.play(seating, game_index, engine=engine) for game_index in range(6)]
+            self.assertEqual(results, [self.play(seating, game_index, engine=engine) for game_index in range(6)])
+            self.assertGreater(len(set(results)), 1)
+
+    def test_global_random_is_not_used(self):
+        state = random.getstate()
+        self.play([PlayerType.RANDOM] * 4, 0)
+        self.assertEqual(state, random.getstate())
+
+    def test_single_game_replays_like_in_batch(self):
+        seating = [PlayerType.RANDOM] * 3
+        batch = run_batch(seating, 5, num_workers=1, base_seed=2)
+        total_turns = 0
+        for game_index in range(5):
+            single = run_batch(seating, 1, num_workers=1, base_seed=2, first_game=game_index)
+            self.assertEqual(single.total_turns, self.play(seating, game_index, base_seed=2)[1])
+            total_turns += single.total_turns
+        self.assertEqual(batch.total_turns, total_turns)
+
+
+class TestParallelGenomeEvaluator(unittest.TestCase):
+    def create_genomes(self, num_genomes):
+        genomes = []
+        for key in range(num_genomes):
+            genome = neat_config.genome_type(key)
+            genome.configure_new(neat_config.genome_config)
+            genomes.append((key, genome))
+        return genomes
+
+    def evaluate(self, genomes, **kwargs):
+        with ParallelGenomeEvaluator(neat_config, base_seed=3, **kwargs) as evaluator:
+            evaluator(genomes, neat_config)
+        return [genome.fitness for _, genome in genomes]
+
+    def test_parallel_fitness_matches_serial(self):
+        genomes = self.create_genomes(6)
+        serial = self.evaluate(genomes, num_workers=1)
+        parallel = self.evaluate(genomes, num_workers=2, batch_size=2)
+        self.assertEqual(serial, parallel)
+
+    @mock.patch.object(GameConstants, 'MAX_TURNS', 300)  # fresh genomes rarely finish a game against each other
+    def test_tournament_assigns_fitness_to_every_genome(self):
+        genomes = self.create_genomes(9)
+        fitnesses = self.evaluate(genomes, num_workers=1, tournament=True)
+        self.assertEqual(len(fitnesses), 9)
+        self.assertTrue(all(fitness is not None for fitness in fitnesses))
+        self.assertEqual(fitnesses, self.evaluate(genomes, num_workers=2, tournament=True))
+
+
+class TestCompiledNetwork(unittest.TestCase):
+    def create_genome(self, key, num_mutations):
+        random.seed(key)
+        genome = neat_config.genome_type(key)
+        genome.configure_new(neat_config.genome_config)
+        for _ in range(num_mutations):
+            genome.mutate(neat_config.genome_config)
+        return genome
+
+    def test_outputs_match_feed_forward_network(self):
+        for key in range(5):
+            genome = self.create_genome(key, 40)
+            reference = neat.nn.FeedForwardNetwork.create(genome, neat_config)
+            net = CompiledNetwork.create(genome, neat_config)
+            batch = [[random.random() for _ in range(net.num_inputs)] for _ in range(8)]
+
+            outputs = net.activate_batch(batch)
+            for inputs, output_arr in zip(batch, outputs):
+                expected = reference.activate(inputs)
+                for value, expected_value in zip(output_arr, expected):
+                    self.assertAlmostEqual(value, expected_value)
+                for value, expected_value in zip(net.activate(inputs), expected):
+                    self.assertAlmostEqual(value, expected_value)
+
+    def test_unsupported_aggregation(self):
+        genome = self.create_genome(0, 0)
+        next(iter(genome.nodes.values())).aggregation = 'max'
+        with self.assertRaises(ValueError):
+            CompiledNetwork.create(genome, neat_config)
+
+    def test_lockstep_games_match_serial_games(self):
+        genome = self.create_genome(1, 10)
+        seeds = [f"lockstep:{i}" for i in range(4)]
+        serial = []
+        for seed in seeds:
+            serial.append(eval_genome(genome, neat_config, seed))
+        self.assertAlmostEqual(eval_genome_games(genome, neat_config, seeds), sum(serial) / len(seeds))
+
+
+class TestISMCTS(unittest.TestCase):
+    def create_game(self, player_types, game_index, engine=EngineType.OBJECT, **kwargs):
+        config = PlayerFactory()
+        for seat, player_type in enumerate(player_types):
+            player_kwargs = kwargs if player_type == PlayerType.ISMCTS_AI else {}
+            config.add_player(player_type, f"{player_type}#{seat + 1}", **player_kwargs)
+        return GameManager(config, engine=engine, rng=game_rng(3, game_index))
+
+    def test_compact_copy_has_the_same_plays(self):
+        for game_index in range(4):
+            game_manager = self.create_game([PlayerType.RANDOM] * 4, game_index)
+            state = game_manager.state
+            for _ in range(100):
+                player = state.get_current_player()
+                if player.hand:
+                    compact_state = compact.CompactGameState.from_game_state(state)
+                    self.assertEqual(len(compact_state.deck), len(state.deck.cards))
+                    plays = {object_move_key(state, (player, Action.PLAY, card, moves))
+                             for card, moves in state.legal_plays()}
+                    self.assertEqual(plays, {key for key in keyed_moves(compact_state) if key[0] == compact.PLAY})
+                if game_manager.play_turn():
+                    break
+
+    def test_sample_keeps_hidden_cards(self):
+        game_manager = self.create_game([PlayerType.RANDOM] * 3, 0)
+        for _ in range(10):
+            game_manager.play_turn()
+        state = compact.CompactGameState.from_game_state(game_manager.state)
+        information_set = InformationSet(state, random.Random(0))
+        hidden = sorted(state.deck + b"".join(hand for i, hand in enumerate(state.hands)
+                                              if i != state.current_player_index))
+        for _ in range(5):
+            sample = information_set.sample()
+            self.assertEqual(sample.hands[state.current_player_index], state.hands[state.current_player_index])
+            self.assertEqual([len(hand) for hand in sample.hands], [len(hand) for hand in state.hands])
+            self.assertEqual(sorted(sample.deck + b"".join(hand for i, hand in enumerate(sample.hands)
+                                                           if i != state.current_player_index)), hidden)
+            self.assertEqual(sample.states, state.states)
+
+    def test_games_finish_on_both_engines(self):
+        for engine in EngineType:
+            for game_index in range(2):
+                game_manager = self.create_game([PlayerType.ISMCTS_AI, PlayerType.RANDOM, PlayerType.RANDOM],
+                                                game_index, engine=engine, iterations=20)
+                self.assertIsNotNone(game_manager.run())
+
+    def test_tree_is_reused(self):
+        game_manager = self.create_game([PlayerType.ISMCTS_AI, PlayerType.RANDOM], 1, iterations=50)
+        player = game_manager.state.players[0]
+        reused = []
+        for _ in range(20):
+            if game_manager.state.get_current_player() is player and player.hand:
+                reused.append(player._reused_root(game_manager.state).visits)
+            if game_manager.play_turn():
+                break
+        self.assertTrue(any(reused[1:]))
+
+    def test_time_limit(self):
+        state = compact.CompactGameState(3, random.Random(0))
+        for player_index in range(3):
+            state.complete_hand(player_index)
+        information_set = InformationSet(state, random.Random(0))
+        search = ISMCTS(random.Random(0))
+        with self.assertRaises(ValueError):
+            search.run(Node(-1), information_set.sample)
+        self.assertEqual(search.run(Node(-1), information_set.sample, iterations=7), 7)
+        self.assertGreater(search.run(Node(-1), information_set.sample, time_limit=0.05), 0)
+
+    def test_state_bytes_round_trip(self):
+        game_manager = self.create_game([PlayerType.RANDOM] * 4, 2, engine=EngineType.COMPACT)
+        for _ in range(40):
+            game_manager.play_compact_turn()
+        state = game_manager.state
+        copy = compact.CompactGameState.from_bytes(state.to_bytes())
+        for name in ('num_players', 'current_player_index', 'deck', 'discard_pile', 'hands', 'states', 'colors',
+                     'attached'):
+            self.assertEqual(getattr(copy, name), getattr(state, name))
+
+    def test_root_parallel_search(self):
+        state = compact.CompactGameState(3, random.Random(0))
+        for player_index in range(3):
+            state.complete_hand(player_index)
+        visits, num_iterations = root_parallel_search(state, random.Random(0), 2, 41, None)
+        self.assertEqual(num_iterations, 41)
+        self.assertEqual(sum(visits.values()), 41)
+        self.assertLessEqual(set(visits), set(keyed_moves(state)))
+
+    def test_parallel_games_finish(self):
+        for parallel in SearchParallelism:
+            for engine in EngineType:
+                game_manager = self.create_game([PlayerType.ISMCTS_AI, PlayerType.RANDOM], 0, engine=engine,
+                                                iterations=40, parallel=parallel, num_workers=2, leaf_batch_size=8)
+                self.assertIsNotNone(game_manager.run())
+                self.assertEqual(game_manager.config.players[0].last_iterations, 40)
+
+    def test_unmake_move_truncates_history(self):
+        game_manager = self.create_game([PlayerType.RANDOM] * 2, 0)
+        state = game_manager.state
+        while not state.legal_plays():
+            game_manager.play_turn()
+        history_size = len(state.move_history)
+        card, moves = state.legal_plays()[0]
+        undo_record = state.make_move(state.get_current_player(), card, moves)
+        self.assertEqual(len(state.move_history), history_size + 1)
+        state.unmake_move(undo_record)
+        self.assertEqual(len(state.move_history), history_size)
+
+
+class TestZobristHash(unittest.TestCase):
+    @staticmethod
+    def full_hash(state):
+        zobrist_hash = (sum(DECK_KEYS[card.name] for card in state.deck.cards)
+                        + sum(DISCARD_PILE_KEYS[card.name] for card in state.deck.discard_pile)
+                        + TURN_KEYS[state.current_player_index])
+        for seat, player in enumerate(state.players):
+            player_hash = sum(HAND_KEYS[card.name] for card in player.hand)
+            for organ in player.body:
+                player_hash += ORGAN_KEYS[organ.original_color, organ.state, organ.color]
+                player_hash += sum(ATTACHED_KEYS[organ.original_color, card.name]
+                                   for card in organ.viruses + organ.medicines)
+            zobrist_hash += SEAT_MULTIPLIERS[seat] * player_hash
+        return zobrist_hash & MASK
+
+    def test_incremental_hash_matches_full_hash(self):
+        hashes = set()
+        for game_index in range(6):
+            config = PlayerFactory()
+            for i in range(4):
+                config.add_player(PlayerType.STRATEGY_BASED_AI if i % 2 else PlayerType.RANDOM, f"Player{i + 1}")
+            game_manager = GameManager(config, rng=game_rng(4, game_index))
+            state = game_manager.state
+            for _ in range(200):
+                zobrist_hash = state.zobrist_hash
+                self.assertEqual(zobrist_hash, self.full_hash(state))
+                hashes.add(zobrist_hash)
+                player = state.get_current_player()
+                for card, moves in state.legal_plays():
+                    undo_record = state.make_move(player, card, moves)
+                    self.assertEqual(state.zobrist_hash, self.full_hash(state))
+                    state.unmake_move(undo_record)
+                    self.assertEqual(state.zobrist_hash, zobrist_hash)
+                if game_manager.play_turn():
+                    break
+        self.assertGreater(len(hashes), 150)
+
+    def test_equal_positions_hash_equally(self):
+        states = []
+        for _ in range(2):
+            config = PlayerFactory()
+            player1 = config.add_player(PlayerType.RANDOM, "Player1")
+            player2 = config.add_player(PlayerType.RANDOM, "Player2")
+            state = GameManager(config, rng=game_rng(0, 0)).state
+            states.append(state)
+        # the same cards reached in a different order
+        states[0].players[0].add_card_to_hand(Virus(CardColor.RED))
+        states[0].players[0].add_card_to_hand(Organ(CardColor.BLUE))
+        states[1].players[0].add_card_to_hand(Organ(CardColor.BLUE))
+        states[1].players[0].add_card_to_hand(Virus(CardColor.RED))
+        self.assertEqual(states[0].zobrist_hash, states[1].zobrist_hash)
+
+        organ = Organ(CardColor.WILD)
+        states[0].players[1].add_organ_to_body(organ)
+        self.assertNotEqual(states[0].zobrist_hash, states[1].zobrist_hash)
+        organ.add_virus(Virus(CardColor.GREEN))
+        organ.color = CardColor.GREEN
+        states[1].players[1].add_organ_to_body(Organ(CardColor.WILD))
+        states[1].players[1].body[0].color = CardColor.GREEN
+        states[1].players[1].body[0].add_virus(Virus(CardColor.GREEN))
+        self.assertEqual(states[0].zobrist_hash, states[1].zobrist_hash)
+        # the bodies swapped by a medical error belong to other seats
+        states[1].players[0].body, states[1].players[1].body = states[1].players[1].body, states[1].players[0].body
+        self.assertNotEqual(states[0].zobrist_hash, states[1].zobrist_hash)
+
+
+class TestTranspositionTable(unittest.TestCase):
+    def test_least_recently_used_entry_is_evicted(self):
+        table = TranspositionTable(capacity=2)
+        table.put(1, 'a')
+        table.put(2, 'b')
+        self.assertEqual(table.get(1), 'a')
+        table.put(3, 'c')
+        self.assertNotIn(2, table)
+        self.assertEqual(table.get(2), None)
+        self.assertEqual(len(table), 2)
+        self.assertEqual((table.hits, table.misses, table.evictions), (1, 1, 1))
+        table.put(1, 'd')
+        self.assertEqual(table.get(1), 'd')
+        self.assertEqual(table.evictions, 1)
+
+    def test_capacity_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            TranspositionTable(capacity=0)
+
+
+class TestBenchmarks(unittest.TestCase):
+    def test_microbenchmarks_run(self):
+        for benchmark in get_benchmarks():
+            if not benchmark.name.startswith(('game/', 'memory/')):
+                result = measure(benchmark, repeat=1, min_time=0)
+                self.assertGreater(result['seconds_per_op'], 0)
+
+    def test_game_benchmark_reports_turns(self):
+        benchmark = next(benchmark for benchmark in get_benchmarks() if benchmark.name.startswith('game/Compact'))
+        result = measure(benchmark, repeat=1, min_time=0)
+        self.assertGreater(result['turns_per_second'], result['games_per_second'])
+
+    def test_memory_benchmark_reports_bytes_per_game(self):
+        benchmark = next(benchmark for benchmark in get_benchmarks() if benchmark.name.startswith('memory/'))
+        benchmark.num_ops = 10
+        result = measure_memory(benchmark)
+        self.assertGreater(result['bytes_per_game'], 1000)
+        with mock.patch('builtins.print'):
+            self.assertEqual(compare({'m': result}, {'m': {'bytes_per_game': result['bytes_per_game'] / 2}}, 0.25),
+                             ['m'])
+
+    def test_regressions_past_tolerance(self):
+        baseline = {'a': {'seconds_per_op': 1.}, 'b': {'seconds_per_op': 1.}}
+        results = {'a': {'seconds_per_op': 1.2}, 'b': {'seconds_per_op': 1.3}, 'c': {'seconds_per_op': 5.}}
+        with mock.patch('builtins.print'):
+            self.assertEqual(compare(results, baseline, tolerance=0.25), ['b'])
+
+    def test_stored_tolerance_follows_the_spread_of_the_runs(self):
+        steady = best_of_runs([{'seconds_per_op': 1.05}, {'seconds_per_op': 1.}])
+        noisy = best_of_runs([{'seconds_per_op': 1.}, {'seconds_per_op': 1.4}, {'seconds_per_op': 1.2}])
+        self.assertEqual(steady, {'seconds_per_op': 1., 'tolerance': 0.25})
+        self.assertEqual(noisy, {'seconds_per_op': 1., 'tolerance': 0.8})
+        self.assertEqual(best_of_runs([{'bytes_per_game': 1000.}, {'bytes_per_game': 1001.}]),
+                         {'bytes_per_game': 1000., 'tolerance': 0.05})
+        results = {'steady': {'seconds_per_op': 1.3}, 'noisy': {'seconds_per_op': 1.3}}
+        with mock.patch('builtins.print'):
+            self.assertEqual(compare(results, {'steady': steady, 'noisy': noisy}), ['steady'])
+            self.assertEqual(compare(results, {'steady': steady, 'noisy': noisy}, tolerance=0.2), ['steady', 'noisy'])
+
+
+class TestInstrumentation(unittest.TestCase):
+    def test_counts_calls(self):
+        seating = [PlayerType.STRATEGY_BASED_AI, PlayerType.RANDOM, PlayerType.RANDOM]
+        with Instrumentation() as instrumentation:
+            result = run_batch(seating, 5, num_workers=1, base_seed=3)
+        timers = instrumentation.as_dict()
+        self.assertEqual(timers['GameManager.play_turn']['calls'], result.total_turns)
+        for key in ('StrategyBasedAIPlayer.take_turn', 'BasePlayer.take_turn', 'RandomPlayer.decide_action',
+                    'GameState.complete_hand', 'Organ.play'):
+            self.assertGreater(timers[key]['calls'], 0)
+            self.assertGreater(timers[key]['seconds'], 0)
+        self.assertIn('Organ.play', instrumentation.report())
+
+    def test_disabled_instrumentation_restores_methods(self):
+        originals = [(cls, name, cls.__dict__[name]) for cls, name in instrumented_methods()]
+        self.assertIn((Virus, 'play', Virus.__dict__['play']), originals)
+        complete_hand = GameState.complete_hand
+        instrumentation = Instrumentation()
+        instrumentation.enable()
+        self.assertIsNot(GameState.complete_hand, complete_hand)
+        instrumentation.disable()
+        for cls, name, function in originals:
+            self.assertIs(cls.__dict__[name], function)
+        run_batch([PlayerType.RANDOM] * 2, 1, num_workers=1)
+        self.assertFalse(instrumentation.as_dict())
+
+
+class TestEventBus(unittest.TestCase):
+    def create_game(self, events=None):
+        config = PlayerFactory()
+        config.add_player(PlayerType.STRATEGY_BASED_AI, "Player1")
+        config.add_player(PlayerType.RANDOM, "Player2")
+        return GameManager(config, rng=game_rng(6, 0), events=events)
+
+    def test_payload_is_built_only_for_subscribers(self):
+        events = EventBus()
+        build_payload = mock.Mock(return_value='payload')
+        events.emit_lazy(EventType.STATE, build_payload, 1)
+        build_payload.assert_not_called()
+
+        callback = mock.Mock()
+        events.subscribe(EventType.STATE, callback)
+        events.emit_lazy(EventType.STATE, build_payload, 1)
+        build_payload.assert_called_once_with(1)
+        callback.assert_called_once_with('payload')
+
+        events.unsubscribe(EventType.STATE, callback)
+        self.assertFalse(events.has_subscribers(EventType.STATE))
+        events.emit_lazy(EventType.STATE, build_payload, 1)
+        build_payload.assert_called_once()
+
+    def test_headless_game_composes_no_state_info(self):
+        game_manager = self.create_game(EventBus())
+        BlankPresenter().subscribe(game_manager.events)
+        with mock.patch.object(GameManager, '_compose_state_info') as compose_state_info:
+            game_manager.run()
+        compose_state_info.assert_not_called()
+
+    def test_card_play_status_only_for_real_plays(self):
+        events = EventBus()
+        game_manager = self.create_game(events)
+        statuses, cards = [], []
+        events.subscribe(EventType.CARD_PLAY_STATUS, statuses.append)
+        events.subscribe(EventType.CARD, cards.append)
+        game_manager.run()
+        num_plays = sum(1 for _, action, _, _ in game_manager.state.move_history if action == Action.PLAY)
+        # the strategy player simulates its candidate plays with make_move, none of them is reported
+        self.assertEqual(len(statuses), len(cards))
+        self.assertEqual(statuses.count(True), num_plays)
+
+    def test_subscribers_receive_game_events(self):
+        events = EventBus()
+        received = []
+        for event_type in EventType:
+            events.subscribe(event_type, lambda payload, event_type=event_type: received.append((event_type, payload)))
+        game_manager = self.create_game(events)
+        winner = game_manager.run()
+
+        self.assertEqual(received[0], (EventType.GAME_START, None))
+        self.assertEqual(received[-1], (EventType.GAME_OVER, winner))
+        turn_starts = [payload for event_type, payload in received if event_type == EventType.TURN_START]
+        self.assertEqual(len(turn_starts), game_manager.num_turns)
+        states = [payload for event_type, payload in received if event_type == EventType.STATE]
+        self.assertEqual(len(states), game_manager.num_turns + 1)
+        self.assertEqual(len(states[0]['state_array']), game_manager.state.encoder.num_inputs)
+        self.assertIn(EventType.DECISION, {event_type for event_type, _ in received})
+
+    def test_cli_presenter_prints_games(self):
+        events = EventBus()
+        CLIPresenter().subscribe(events)
+        with mock.patch('builtins.print') as print_mock:
+            self.create_game(events).run()
+        self.assertIn(mock.call("GAME OVER"), print_mock.call_args_list)
+
+
+
+class TestGameRecord(unittest.TestCase):
+    SEATING = [PlayerType.STRATEGY_BASED_AI, PlayerType.RULE_BASED_AI, PlayerType.RANDOM, PlayerType.RANDOM]
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_moves_round_trip(self):
+        moves = [(compact.PLAY, 2), (compact.PLAY, 0, 3), (compact.PLAY, 1, 2, 4), (compact.PLAY, 0, 1, 3, 2),
+                 (compact.PLAY, 1, ((0, 1, 2), (3, 2, 4))), (compact.DISCARD, (0, 2)), (compact.DISCARD, (1,)), None]
+        data = b''.join(encode_move(move) for move in moves)
+        self.assertEqual(len(data), 20)
+        self.assertEqual(list(decode_moves(data)), moves)
+
+    def test_recorded_games_replay(self):
+        result = play_games(self.SEATING, 0, 30, base_seed=4, record_dir=self.directory.name)
+        play_games([PlayerType.RANDOM] * 3, 30, 20, base_seed=4, engine=EngineType.COMPACT,
+                   record_dir=self.directory.name)
+
+        with GameRecordReader(self.directory.name) as records:
+            self.assertEqual(len(records), 50)
+            self.assertEqual([record.game_index for record in records], list(range(50)))
+            self.assertEqual(sum(records[i].num_turns for i in range(30)), result.total_turns)
+            for record in records:
+                final_state = record.replay()
+                winner = final_state.players[record.winner_seat] if record.engine == EngineType.OBJECT \
+                    else record.winner_seat
+                self.assertTrue(final_state.check_win_condition(winner))
+            self.assertEqual(records[-1].engine, EngineType.COMPACT)
+            self.assertEqual(records[-1].num_players, 3)
+
+    def test_replay_matches_played_game(self):
+        def create_game():
+            player_factory = PlayerFactory()
+            for seat, player_type in enumerate(self.SEATING):
+                player_factory.add_player(player_type, f"Player{seat + 1}")
+            return GameManager(player_factory, rng=game_rng(8, 3))
+
+        initial = create_game().state.zobrist_hash
+        game_manager = create_game()
+        game_manager.run()
+        played = game_manager.state.zobrist_hash
+
+        play_games(self.SEATING, 3, 1, base_seed=8, record_dir=self.directory.name)
+        with GameRecordReader(self.directory.name) as records:
+            self.assertEqual(records[0].replay().zobrist_hash, played)
+            self.assertEqual(records.replay(0, num_turns=0).zobrist_hash, initial)
+
+    def test_writer_shards(self):
+        record = GameRecord(1, 0, EngineType.OBJECT, 2, 0, 3, bytes([0, 0, 0]))
+        with GameRecordWriter(self.directory.name, shard_size=100) as writer:
+            for game_index in range(10):
+                record.game_index = game_index
+                writer.write(record)
+        with GameRecordWriter(self.directory.name, shard_size=100) as writer:
+            writer.write(record)
+        shards = [name for name in os.listdir(self.directory.name) if name.endswith('.vgr')]
+        self.assertEqual(len(shards), 4)  # four records fill a shard, the second writer starts a new one
+
+        with GameRecordReader(self.directory.name) as records:
+            self.assertEqual(len(records), 11)
+            self.assertEqual([record.game_index for record in records], list(range(10)) + [9])
+            self.assertEqual(records[-1].moves_data, bytes([0, 0, 0]))
+            with self.assertRaises(IndexError):
+                records[11]
+
+
+
+class TestResultsSink(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_rows_of_played_games(self):
+        seating = [PlayerType.STRATEGY_BASED_AI, PlayerType.RULE_BASED_AI, PlayerType.RANDOM]
+        result = play_games(seating, 0, 40, base_seed=2, results_dir=self.directory.name)
+        compact_result = play_games([PlayerType.RANDOM] * 2, 0, 10, base_seed=2, engine=EngineType.COMPACT,
+                                    results_dir=self.directory.name)
+
+        table = ResultsTable(self.directory.name)
+        self.assertEqual(len(table), 50)
+        self.assertEqual(list(table.win_counts()[:3]), [a + b for a, b in zip(result.wins, compact_result.wins + [0])])
+        num_turns = table.column('num_turns')
+        self.assertEqual(num_turns.sum(), result.total_turns + compact_result.total_turns)
+        seats = table.column('seating')
+        self.assertEqual(seats.shape, (50, GameConstants.MAX_PLAYERS))
+        self.assertEqual(list(seats[0, 3:]), [EMPTY_SEAT] * (GameConstants.MAX_PLAYERS - 3))
+        cards_played = table.column('cards_played')
+        self.assertEqual(cards_played.shape, (50, len(PLAYED_CARD_KINDS)))
+        # every game needs at least four organs on the table
+        self.assertTrue((cards_played[:, 0] >= GameConstants.NUM_HEALTHY_ORGANS_TO_WIN).all())
+        self.assertTrue((table.column('duration') > 0).all())
+        self.assertEqual(sorted(table.column('game_index')[:40]), list(range(40)))
+
+    def test_chunks(self):
+        with ResultsSink(self.directory.name, chunk_rows=4) as sink:
+            for game_index in range(10):
+                sink.add(0, game_index, [PlayerType.RANDOM] * 2, game_index % 2, 20, [4, 0, 0, 0, 0, 0, 0, 0], 1, 0.5)
+            self.assertEqual(len(ResultsTable(self.directory.name)), 8)  # the last two rows are still buffered
+
+        table = ResultsTable(self.directory.name)
+        self.assertEqual(table.chunk_lengths, [4, 4, 2])
+        self.assertEqual(list(table.column('game_index')), list(range(10)))
+        self.assertEqual(list(table.win_counts()[:2]), [5, 5])
+        chunk = next(table.chunks(['winner_seat']))
+        self.assertEqual(list(chunk), ['winner_seat'])
+        self.assertIsInstance(chunk['winner_seat'], np.memmap)
+
+
+
+class TestTournament(unittest.TestCase):
+    def test_elo_update_keeps_rating_sum(self):
+        elo = EloRatings(4)
+        elo.update([0, 1, 2], 1)
+        self.assertGreater(elo.ratings[1], 1500)
+        self.assertEqual(elo.ratings[0], elo.ratings[2])
+        self.assertEqual(elo.ratings[3], 1500)
+        self.assertAlmostEqual(sum(elo.ratings), 4 * 1500)
+
+    def test_sprt(self):
+        sprt = SPRT(0.4, 0.6)
+        for _ in range(7):
+            self.assertIsNone(sprt.update(True))
+        self.assertTrue(sprt.update(True))
+        self.assertTrue(sprt.update(False))  # decisions are final
+        sprt = SPRT(0.4, 0.6)
+        self.assertIsNone(sprt.update(True))
+        while sprt.decision is None:
+            sprt.update(False)
+        self.assertFalse(sprt.decision)
+
+    def test_pairing_of_equal_entrants_finds_no_difference(self):
+        pairing = Pairing(0, 1)
+        while not pairing.decided:
+            pairing.add_win(sum(pairing.wins) % 2)  # p = 0.5
+        self.assertIsNone(pairing.stronger)
+        self.assertEqual(pairing.decided_after, sum(pairing.wins))
+        pairing = Pairing(0, 1)
+        while not pairing.decided:
+            pairing.add_win(1 if sum(pairing.wins) % 3 else 0)  # p = 1/3
+        self.assertEqual(pairing.stronger, 1)
+
+    def test_match_rotates_seats_with_the_same_deck(self):
+        entrants = [Entrant("rule", PlayerType.RULE_BASED_AI), Entrant("random", PlayerType.RANDOM),
+                    Entrant("strategy", PlayerType.STRATEGY_BASED_AI)]
+        winners = play_match(entrants, 5, 0)
+        self.assertEqual(len(winners), 3)
+        self.assertEqual(winners, play_match(entrants, 5, 0))
+        self.assertTrue(all(0 <= winner < 3 for winner in winners))
+
+    def test_tournament_stops_decided_pairs(self):
+        entrants = [Entrant("random", PlayerType.RANDOM), Entrant("rule", PlayerType.RULE_BASED_AI),
+                    Entrant("strategy", PlayerType.STRATEGY_BASED_AI)]
+        tournament = Tournament(entrants, table_size=2, max_matches=400, num_workers=1, base_seed=1).run()
+        self.assertLess(tournament.num_matches, 400)
+        self.assertTrue(all(pairing.stronger is not None for pairing in tournament.pairings.values()))
+        self.assertEqual(tournament.pairings[0, 1].stronger, 1)
+        self.assertEqual(tournament.standings()[-1][0], "random")
+        self.assertEqual(sum(tournament.wins) + tournament.num_errors, tournament.num_matches * 2)
+
+    def test_random_tables_respect_match_budget(self):
+        entrants = [Entrant(f"random{i}", PlayerType.RANDOM) for i in range(4)]
+        tournament = Tournament(entrants, table_size=3, mode=TableMode.RANDOM, max_matches=10, num_workers=1).run()
+        self.assertEqual(tournament.num_matches, 10)
+        self.assertEqual(sum(tournament.games), 10 * 3 * 3)
+        self.assertIn("random0 vs random1", tournament.report())
+
+
+
+class TestDeckPool(unittest.TestCase):
+    def test_decks_share_immutable_cards(self):
+        deck1, deck2 = Deck(random.Random(0)), Deck(random.Random(1))
+        self.assertEqual(len(deck1.cards), GameConstants.NUM_TOTAL_CARDS)
+        self.assertEqual(len({id(card) for card in deck1.cards}), GameConstants.NUM_TOTAL_CARDS)
+        self.assertEqual({id(card) for card in deck1.cards} & {id(card) for card in deck2.cards},
+                         {id(card) for card in SHARED_CARDS})
+        self.assertTrue(all(card.type != CardType.ORGAN for card in SHARED_CARDS))
+        self.assertIs(Virus(CardColor.RED).name, Virus(CardColor.RED).name)
+
+    def test_reset_deck_matches_new_deck(self):
+        pool = DeckPool()
+        for seed in range(3):
+            config = PlayerFactory()
+            config.add_player(PlayerType.RANDOM, "Player1")
+            config.add_player(PlayerType.RANDOM, "Player2")
+            game_manager = GameManager(config, rng=game_rng(seed, 0), deck_pool=pool)
+            deck = game_manager.state.deck
+            self.assertEqual([card.name for card in deck.cards], [card.name for card in Deck(game_rng(seed, 0)).cards])
+            self.assertEqual(deck.zobrist_hash, Deck(game_rng(seed, 0)).zobrist_hash)
+            self.assertTrue(all(organ.state == OrganState.HEALTHY and not organ.viruses and not organ.medicines
+                                and organ.color == organ.original_color and organ.owner is None
+                                for organ in deck.organs))
+            game_manager.run()
+            game_manager.release()
+            game_manager.release()  # released once only
+            self.assertEqual(len(pool._decks), 1)
+
+    def test_pooled_batch_is_reproducible(self):
+        seating = [PlayerType.STRATEGY_BASED_AI, PlayerType.RANDOM, PlayerType.RANDOM]
+        pooled = play_games(seating, 0, 20, base_seed=6)
+        single = [play_games(seating, game_index, 1, base_seed=6) for game_index in range(20)]
+        self.assertEqual(pooled.wins, [sum(result.wins[seat] for result in single) for seat in range(3)])
+        self.assertEqual(pooled.total_turns, sum(result.total_turns for result in single))
+
+
+
+class TestSlottedModels(unittest.TestCase):
+    def test_models_have_no_instance_dict(self):
+        player = PlayerFactory().create_player(PlayerType.RANDOM, "Player1")
+        instances = [Organ(CardColor.RED), Virus(CardColor.RED), Medicine(CardColor.WILD), Contagion(), Transplant(),
+                     OrganThief(), MedicalError(), LatexGlove(), Move(), player]
+        for instance in instances:
+            self.assertFalse(hasattr(instance, '__dict__'), type(instance).__name__)
+        with self.assertRaises(AttributeError):
+            Move().extra = 1
+
+    def test_subclasses_can_add_attributes(self):
+        player = PlayerFactory().create_player(PlayerType.NEAT_AI, "Player1", genome=neat_config.genome_type(0),
+                                               config=neat_config)
+        player.score += 5
+        self.assertEqual(player.get_score(), 5)
+
+
+class TestOrganTransitions(unittest.TestCase):
+    def setUp(self):
+        player_factory = PlayerFactory()
+        self.player1 = player_factory.add_player(PlayerType.RANDOM, "Player1")
+        self.player2 = player_factory.add_player(PlayerType.RANDOM, "Player2")
+        self.state = GameManager(player_factory, rng=game_rng(0, 0)).state
+        self.discard_pile = self.state.deck.discard_pile
+        self.discard_pile.clear()
+
+    def add_organ(self, color):
+        organ = Organ(color)
+        self.player2.add_organ_to_body(organ)
+        return organ
+
+    def play_virus(self, virus, organ):
+        return virus.play(self.state, self.player1, Move(opponent=self.player2, opponent_organ=organ))
+
+    def test_table_covers_every_state_kind_and_color(self):
+        for state in OrganState:
+            for kind in (VIRUS, MEDICINE):
+                for wild in (False, True):
+                    transition = TRANSITIONS[state][kind][wild]
+                    self.assertEqual(transition is None, state == OrganState.IMMUNISED, (state, kind, wild))
+
+    def test_wild_organ_takes_color_and_turns_wild_again(self):
+        organ = self.add_organ(CardColor.WILD)
+        medicine, virus = Medicine(CardColor.RED), Virus(CardColor.RED)
+        self.assertFalse(medicine.play(self.state, self.player2, Move(player_organ=organ)))
+        self.assertEqual((organ.state, organ.color, organ.medicines), (OrganState.VACCINATED, CardColor.RED, [medicine]))
+        self.assertIs(self.player2.get_organ_by_color(CardColor.RED), organ)
+        body_hash = self.player2.body_hash
+        self.assertFalse(self.play_virus(virus, organ))
+        self.assertEqual((organ.state, organ.color, organ.medicines), (OrganState.HEALTHY, CardColor.WILD, []))
+        self.assertEqual(self.discard_pile, [medicine, virus])
+        self.assertNotEqual(self.player2.body_hash, body_hash)
+        self.assertEqual(self.player2.body_hash, organ.zobrist_hash)
+
+    def test_virus_on_infected_organ_destroys_it(self):
+        organ = self.add_organ(CardColor.BLUE)
+        attached, played = Virus(CardColor.BLUE), Virus(CardColor.WILD)
+        self.play_virus(attached, organ)
+        self.assertEqual(organ.state, OrganState.INFECTED)
+        self.assertFalse(self.play_virus(played, organ))
+        self.assertEqual(self.player2.body, [])
+        self.assertIsNone(organ.owner)
+        self.assertEqual(self.discard_pile, [attached, organ, played])
+        self.assertEqual((organ.state, organ.viruses), (OrganState.HEALTHY, []))
+
+    def test_contagion_moves_virus_between_organs(self):
+        source = Organ(CardColor.GREEN)
+        self.player1.add_organ_to_body(source)
+        virus, contagion = Virus(CardColor.GREEN), Contagion()
+        source.add_virus(virus)
+        target = self.add_organ(CardColor.WILD)
+        move = Move(opponent=self.player2, player_organ=source, opponent_organ=target)
+        self.player1.add_card_to_hand(contagion)
+        self.assertEqual(self.player1.play_card(self.state, contagion, [move]), 1)
+        self.assertEqual((source.state, source.viruses), (OrganState.HEALTHY, []))
+        self.assertEqual((target.state, target.color, target.viruses), (OrganState.INFECTED, CardColor.GREEN, [virus]))
+        self.assertEqual(self.discard_pile, [contagion])
+
+    def test_immunised_organ_rejects_plays(self):
+        organ = self.add_organ(CardColor.YELLOW)
+        organ.add_medicine(Medicine(CardColor.YELLOW))
+        organ.add_medicine(Medicine(CardColor.WILD))
+        self.assertEqual(organ.state, OrganState.IMMUNISED)
+        self.assertTrue(self.play_virus(Virus(CardColor.YELLOW), organ))
+        self.assertTrue(Medicine(CardColor.YELLOW).play(self.state, self.player2, Move(player_organ=organ)))
+        self.assertEqual((organ.state, len(organ.medicines), self.discard_pile), (OrganState.IMMUNISED, 2, []))
+        with self.assertRaises(ValueError):
+            organ.add_virus(Virus(CardColor.YELLOW))
+
+    def test_contagion_turns_wild_source_wild_again(self):
+        source = Organ(CardColor.WILD)
+        self.player1.add_organ_to_body(source)
+        virus, contagion = Virus(CardColor.RED), Contagion()
+        self.assertFalse(virus.play(self.state, self.player2, Move(opponent=self.player1, opponent_organ=source)))
+        self.assertEqual(source.color, CardColor.RED)
+        target = self.add_organ(CardColor.RED)
+        self.player1.add_card_to_hand(contagion)
+        move = Move(opponent=self.player2, player_organ=source, opponent_organ=target)
+        self.assertEqual(self.player1.play_card(self.state, contagion, [move]), 1)
+        self.assertEqual((source.state, source.color), (OrganState.HEALTHY, CardColor.WILD))
+        self.assertIs(self.player1.get_organ_by_color(CardColor.WILD), source)
+
+    def test_contagion_with_several_transfers_is_discarded_once(self):
+        sources = [Organ(CardColor.RED), Organ(CardColor.BLUE)]
+        targets = [self.add_organ(CardColor.RED), self.add_organ(CardColor.BLUE)]
+        for organ in sources:
+            self.player1.add_organ_to_body(organ)
+            organ.add_virus(Virus(organ.color))
+        contagion = Contagion()
+        self.player1.add_card_to_hand(contagion)
+        moves = [Move(opponent=self.player2, player_organ=source, opponent_organ=target)
+                 for source, target in zip(sources, targets)]
+        self.assertEqual(self.player1.play_card(self.state, contagion, moves), 2)
+        self.assertEqual(self.discard_pile, [contagion])
+        self.assertEqual([organ.state for organ in targets], [OrganState.INFECTED] * 2)
+
+    def test_destroyed_wild_organ_is_discarded_wild(self):
+        organ = self.add_organ(CardColor.WILD)
+        self.assertFalse(self.play_virus(Virus(CardColor.GREEN), organ))
+        self.assertEqual(organ.color, CardColor.GREEN)
+        self.assertFalse(self.play_virus(Virus(CardColor.GREEN), organ))
+        self.assertEqual(self.player2.body, [])
+        self.assertEqual(organ.color, CardColor.WILD)
+
+
+class TestEngineAgreement(unittest.TestCase):
+    """Replays the moves of object engine games on ``CompactGameState`` copies and compares both engines."""
+
+    @staticmethod
+    def fields(state):
+        return (bytes(state.deck), bytes(state.discard_pile), [bytes(hand) for hand in state.hands],
+                bytes(state.states), bytes(state.colors), bytes(state.attached))
+
+    def play_game(self, game_id):
+        player_types = [PlayerType.RANDOM, PlayerType.RULE_BASED_AI, PlayerType.STRATEGY_BASED_AI]
+        player_factory = PlayerFactory()
+        for seat in range(2 + game_id % 4):
+            player_factory.add_player(player_types[(game_id + seat) % 3], f"Player{seat + 1}")
+        events = EventBus()
+        game = GameManager(player_factory, rng=game_rng(3, game_id), events=events)
+        replay = {}
+
+        def on_turn_start(player):
+            replay['state'] = compact.CompactGameState.from_game_state(game.state)
+
+        def on_move(move):
+            state = replay['state']
+            if move is not None:
+                if move[0] == compact.PLAY:
+                    played = move
+                    if state.hands[state.current_player_index][move[1]] == compact.CONTAGION:
+                        # a contagion may move several viruses at once, legal_plays lists its single transfers
+                        played = move[:2] + (move[2][:1],)
+                    self.assertIn(played, state.legal_plays(), (game_id, move))
+                state.apply_move(move)
+                replay['num_moves'] = replay.get('num_moves', 0) + 1
+            after = compact.CompactGameState.from_game_state(game.state)
+            self.assertEqual(self.fields(after), self.fields(state), (game_id, move))
+
+        events.subscribe(EventType.TURN_START, on_turn_start)
+        events.subscribe(EventType.MOVE, on_move)
+        game.run()
+        return replay['num_moves']
+
+    def test_engines_agree_on_every_move(self):
+        for game_id in range(60):
+            self.assertGreater(self.play_game(game_id), 0)
+
+
+class TestRunMany(unittest.TestCase):
+    def create_factory(self, seating):
+        player_factory = PlayerFactory()
+        for seat, player_type in enumerate(seating):
+            player_factory.add_player(player_type, f"{player_type}#{seat + 1}")
+        return player_factory
+
+    def run_one_by_one(self, seating, num_games, engine):
+        outcomes = []
+        for game_index in range(5, 5 + num_games):
+            player_factory = self.create_factory(seating)
+            game = GameManager(player_factory, engine=engine, rng=game_rng(2, game_index))
+            outcomes.append((player_factory.players.index(game.run()), game.num_turns))
+        return outcomes
+
+    def assert_same_games(self, seating, engine, num_games=12):
+        outcomes = GameManager.run_many(self.create_factory(seating), num_games, base_seed=2, first_game=5,
+                                        engine=engine)
+        self.assertEqual(len(outcomes), num_games)
+        self.assertEqual(list(zip(outcomes.winner_seats, outcomes.num_turns)),
+                         self.run_one_by_one(seating, num_games, engine))
+        self.assertEqual(sum(outcomes.wins()), num_games)
+        self.assertEqual(outcomes.num_errors, 0)
+
+    def test_plays_the_games_of_run(self):
+        self.assert_same_games([PlayerType.RANDOM] * 4, EngineType.OBJECT)
+        self.assert_same_games([PlayerType.STRATEGY_BASED_AI, PlayerType.RULE_BASED_AI, PlayerType.RANDOM],
+                               EngineType.OBJECT)
+        self.assert_same_games([PlayerType.RANDOM] * 3, EngineType.COMPACT)
+
+    def test_publishes_no_events(self):
+        events = EventBus()
+        callback = mock.Mock()
+        for event_type in EventType:
+            events.subscribe(event_type, callback)
+        with mock.patch('game.game_manager.default_events', events):
+            GameManager.run_many(self.create_factory([PlayerType.RANDOM] * 2), 3)
+        callback.assert_not_called()
+
+    def test_headless_run_plays_the_same_game(self):
+        seating = [PlayerType.STRATEGY_BASED_AI, PlayerType.RANDOM]
+        events, callback = EventBus(), mock.Mock()
+        # the players still publish their decisions, the game manager publishes nothing
+        for event_type in (EventType.GAME_START, EventType.TURN_START, EventType.STATE, EventType.MOVE,
+                           EventType.GAME_OVER):
+            events.subscribe(event_type, callback)
+        headless = GameManager(self.create_factory(seating), rng=game_rng(4, 1), events=events)
+        winner = headless.run(headless=True)
+        callback.assert_not_called()
+        game = GameManager(self.create_factory(seating), rng=game_rng(4, 1), events=EventBus())
+        self.assertEqual(game.run().name, winner.name)
+        self.assertEqual(game.num_turns, headless.num_turns)
+
+    def test_failed_games_are_counted(self):
+        player_factory = self.create_factory([PlayerType.RANDOM] * 2)
+        with mock.patch.object(GameConstants, 'MAX_TURNS', 5):
+            outcomes = GameManager.run_many(player_factory, 4)
+        self.assertEqual(list(outcomes.winner_seats), [-1] * 4)
+        self.assertEqual(outcomes.num_errors, 4)
+        self.assertEqual(outcomes.wins(), [0, 0])
+
+    def test_reset_starts_a_new_game_in_place(self):
+        player_factory = self.create_factory([PlayerType.RANDOM] * 2)
+        game = GameManager(player_factory, rng=game_rng(0, 0))
+        state, deck = game.state, game.state.deck
+        game.run()
+        game.reset(game_rng(0, 1))
+        self.assertIs(game.state, state)
+        self.assertIs(game.state.deck, deck)
+        self.assertEqual(game.num_turns, 0)
+        self.assertEqual(state.move_history, [])
+        self.assertEqual(len(deck.cards), GameConstants.NUM_TOTAL_CARDS)
+        fresh_factory = self.create_factory([PlayerType.RANDOM] * 2)
+        fresh = GameManager(fresh_factory, rng=game_rng(0, 1))
+        self.assertEqual([card.name for card in deck.cards], [card.name for card in fresh.state.deck.cards])
+        self.assertEqual(state.current_player_index, fresh.state.current_player_index)
+        for player, fresh_player in zip(player_factory.players, fresh_factory.players):
+            self.assertEqual((player.hand, player.body, player.move_history, player.body_hash, player.hand_hash),
+                             ([], [], [], 0, 0))
+            self.assertIs(player.rng, game.rng)
+        self.assertEqual(player_factory.players.index(game.run()), fresh_factory.players.index(fresh.run()))
+        self.assertEqual(game.num_turns, fresh.num_turns)
+
+
+class TestVectorGameState(unittest.TestCase):
+    def compact_key(self, state):
+        return (bytes(state.deck), bytes(state.discard_pile), [bytes(hand) for hand in state.hands],
+                bytes(state.states), bytes(state.colors), bytes(state.attached), state.current_player_index)
+
+    def test_games_follow_the_compact_engine(self):
+        for num_players in (2, 4, 6):
+            state = VectorGameState(24, num_players, np.random.default_rng(num_players), play_probability=0.7)
+            while not state.finished.all():
+                games = np.flatnonzero(~state.finished)
+                before = {game: state.to_compact(game) for game in games}
+                moves = {}
+                for game in games:
+                    legal = state.legal_plays(game)
+                    self.assertEqual(sorted(map(repr, legal)), sorted(map(repr, before[game].legal_plays())))
+                    moves[game] = legal
+                state.step()
+                for game in games:
+                    compact, player = before[game], before[game].current_player_index
+                    action = state.last_actions[game]
+                    if action != NO_MOVE:
+                        move = self.move_of(state, compact, action)
+                        if action < state.num_play_actions:
+                            self.assertIn(move, moves[game])
+                        compact.apply_move(move)
+                        if compact.check_win_condition(player):
+                            self.assertEqual(state.winners[game], player)
+                            self.assertTrue(state.finished[game])
+                            continue
+                    compact.complete_hand(player)
+                    compact.next_player()
+                    self.assertEqual(self.compact_key(compact), self.compact_key(state.to_compact(game)))
+
+    def move_of(self, state, compact, action):
+        # the move of the action in the position before the step
+        single = VectorGameState(1, state.num_players)
+        single.current_players[0] = compact.current_player_index
+        for player, hand in enumerate(compact.hands):
+            single.hands[0, player, :len(hand)] = list(hand)
+        return single.move_tuple(0, action)
+
+    def test_pick_plays_draws_legal_plays(self):
+        state = VectorGameState(200, 3, np.random.default_rng(1), play_probability=1.0)
+        for _ in range(20):
+            state.step()
+        games = np.flatnonzero(~state.finished)
+        mask = state.legal_play_mask(games)
+        actions = state.pick_plays(games)
+        self.assertTrue(np.array_equal(actions >= 0, mask.any(axis=1)))
+        playing = np.flatnonzero(actions >= 0)
+        self.assertTrue(mask[playing, actions[playing]].all())
+
+    def test_always_discarding_seat(self):
+        state = VectorGameState(50, 2, np.random.default_rng(2), play_probability=[1.0, 0.0])
+        while not state.finished.all():
+            games = np.flatnonzero(~state.finished)
+            discarding = games[state.current_players[games] == 1]
+            state.step()
+            actions = state.last_actions[discarding]  # NO_MOVE in the first turn, before the first hand is drawn
+            self.assertTrue(((actions > state.num_play_actions) | (actions == NO_MOVE)).all())
+        self.assertTrue((state.winners != 1).all())
+
+    def test_simulate_plays_every_game(self):
+        result = simulate(3, 100, seed=0, batch_size=16)
+        self.assertEqual(result.num_games + result.num_errors, 100)
+        self.assertEqual(result.wins.sum(), result.num_games)
+        self.assertGreater(result.mean_turns, 0)
+        again = simulate(3, 100, seed=0, batch_size=16)
+        self.assertTrue(np.array_equal(result.wins, again.wins))
+        self.assertEqual(result.total_turns, again.total_turns)
+
+
+class TestDataset(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_records_of_played_games(self):
+        seating = [PlayerType.STRATEGY_BASED_AI, PlayerType.RANDOM, PlayerType.RULE_BASED_AI]
+        result = play_games(seating, 0, 20, base_seed=1, dataset_dir=self.directory.name)
+        dataset = Dataset(self.directory.name)
+        self.assertEqual(dataset.num_games, 20)
+        self.assertEqual(dataset.num_players, 3)
+        self.assertEqual(dataset[0].dtype, record_dtype(3))
+        wins = [0, 0, 0]
+        for game, records in dataset.games():
+            self.assertEqual(set(records['game_index']), {game['game_index']})
+            self.assertTrue((records['winner_seat'] == game['winner_seat']).all())
+            if game['winner_seat'] >= 0:
+                wins[game['winner_seat']] += 1
+                self.assertEqual(records['seat'][-1], game['winner_seat'])  # the winning move ends the game
+                self.assertEqual(sorted(set(dataset.outcomes(records))), [-1, 1])
+        self.assertEqual(wins, result.wins)
+
+        records = dataset.game(0)
+        legal = dataset.legal_masks(records)
+        num_play_actions = num_actions(3) - 8
+        self.assertFalse(legal[:, num_play_actions].any())  # discarding nothing
+        self.assertTrue(legal[:, num_play_actions + 1].all())
+        for _, game_records in dataset.games():  # every accepted play is one of the legal actions of its record
+            played = game_records['action'] != PASS
+            actions = game_records['action'][played]
+            self.assertTrue(dataset.legal_masks(game_records)[np.flatnonzero(played), actions].all())
+
+        # the observations are the ones the players saw before their moves
+        observations = []
+        events = EventBus()
+        game = GameManager(self.create_factory(seating), rng=game_rng(1, 0), events=events)
+        events.subscribe(EventType.TURN_START, lambda player: player.hand and observations.append(
+            list(game.state.get_state_array_for_ai())))
+        game.run()
+        self.assertEqual(records['observation'].tolist(), observations)
+
+    def create_factory(self, seating):
+        player_factory = PlayerFactory()
+        for seat, player_type in enumerate(seating):
+            player_factory.add_player(player_type, f"{player_type}#{seat + 1}")
+        return player_factory
+
+    def test_shards(self):
+        dtype = record_dtype(2)
+        with DatasetWriter(self.directory.name, shard_rows=10) as writer:
+            for game_index, num_records in enumerate([4, 4, 4, 12, 3]):
+                records = np.zeros(num_records, dtype)
+                records['game_index'] = game_index
+                records['turn'] = np.arange(num_records)
+                writer.write(records, 0, game_index, game_index % 2)
+            self.assertEqual(len(Dataset(self.directory.name)), 24)  # the last game is still buffered
+
+        dataset = Dataset(self.directory.name)
+        self.assertEqual([len(records) for records in dataset.shards()], [8, 4, 12, 3])
+        self.assertEqual((len(dataset), dataset.num_games, dataset.num_players), (27, 5, 2))
+        self.assertEqual([int(dataset.game(i)['turn'][-1]) for i in range(5)], [3, 3, 3, 11, 2])
+        self.assertEqual([int(game['winner_seat']) for game, _ in dataset.games()], [0, 1, 0, 1, 0])
+        self.assertEqual(int(dataset[-1]['game_index']), 4)
+        self.assertEqual(int(dataset[8]['game_index']), 2)
+        self.assertIsInstance(next(dataset.shards()), np.memmap)
+        with self.assertRaises(IndexError):
+            dataset[27]
+
+
 if __name__ == '__main__':
     unittest.main()